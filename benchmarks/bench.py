@@ -0,0 +1,321 @@
+#!/usr/bin/env python
+"""Scaling benchmarks of the main paths of `brb`.
+
+For each case (kind of referential values and inputs, number of rules,
+antecedents and consequents, and batch size, see `synthetic`), times the
+stages in `STAGES` over a synthetic rule base, and measures their peak memory
+through `tracemalloc`. Time is measured without tracing the allocations, as
+tracing slows them down, and peak memory in a separate, traced, call.
+
+Results are stored as JSON, along with the commit and the environment they
+were measured on, so that the results of two commits can be compared:
+
+    $ python benchmarks/bench.py run --rules 10,1000,100000 -o new.json
+    $ python benchmarks/bench.py compare old.json new.json
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List
+
+import click
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# pylint: disable=wrong-import-position
+from brb import RuleBaseModel
+from brb.er import analytical_er
+from synthetic import KINDS, generate_rules, generate_inputs, get_A, get_U, \
+                      get_D
+
+# version of the results format, increased on incompatible changes
+FORMAT_VERSION = 1
+
+STAGES = ('add_rules_from_df', 'expand_rules', 'compile', 'run',
+          'matching_degree', 'er', 'run_batch')
+
+# parameters that identify a case
+CASE_PARAMS = ('kind', 'n_rules', 'n_antecedents', 'n_consequents',
+               'batch_size')
+
+
+def get_commit() -> Dict[str, object]:
+    """Commit of the repository, `None` if not available.
+    """
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=ROOT, stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL, check=True, universal_newlines=True
+        ).stdout.strip()
+        status = subprocess.run(
+            ['git', 'status', '--porcelain', '--untracked-files=no'],
+            cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            check=True, universal_newlines=True
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return {'commit': None, 'dirty': None}
+
+    return {'commit': commit, 'dirty': bool(status.strip())}
+
+def get_environment() -> Dict[str, object]:
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+def measure(
+        func: Callable,
+        setup: Callable = None,
+        repeat: int = 3
+    ) -> Dict[str, float]:
+    """Measures the time and peak memory of `func`.
+
+    Args:
+        func: Function to be measured, which takes the arguments returned by
+        `setup`.
+        setup: Prepares the arguments of each call, outside of the
+        measurements. If `None`, `func` takes no arguments.
+        repeat: Number of timed calls.
+
+    Returns:
+        measurements: Fastest ('seconds') and mean ('mean_seconds') time of
+        the calls and peak memory (in bytes) allocated by a call
+        ('peak_memory').
+    """
+    times = list()
+    for _ in range(repeat):
+        args = setup() if setup is not None else ()
+
+        start = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - start)
+
+    args = setup() if setup is not None else ()
+    tracemalloc.start()
+    try:
+        func(*args)
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {'seconds': min(times), 'mean_seconds': float(np.mean(times)),
+            'peak_memory': peak_memory}
+
+def run_case(
+        kind: str,
+        n_rules: int,
+        n_antecedents: int,
+        n_consequents: int,
+        batch_size: int,
+        n_values: int = 5,
+        missing: float = 0.1,
+        stages: List[str] = STAGES,
+        repeat: int = 3,
+        max_expanded: int = 100000
+    ) -> List[Dict[str, object]]:
+    """Benchmarks the stages over one synthetic rule base.
+
+    Returns:
+        results: One record per stage, with the case parameters, the
+        measurements (see `measure`) and the number of items (rules or
+        inputs) the stage went through.
+    """
+    U, D = get_U(n_antecedents), get_D(n_consequents)
+    rules_df = generate_rules(n_rules, n_antecedents, n_consequents,
+                              kind=kind, n_values=n_values, missing=missing)
+    inputs = generate_inputs(batch_size, n_antecedents, kind=kind,
+                             n_values=n_values)
+
+    model = RuleBaseModel(U=U, D=D)
+    model.add_rules_from_df(rules_df)
+    compiled_model = model.compile()
+
+    # a single chunk of the batch inference (see `run_batch`)
+    chunk = inputs[:compiled_model.get_chunk_size(2 ** 28)]
+    trace = compiled_model.trace(chunk)
+    belief_degrees = compiled_model.get_rows_values(compiled_model.beta) \
+                     * trace.completeness[..., np.newaxis]
+
+    def new_model():
+        return (RuleBaseModel(U=U, D=D), )
+
+    def match(inputs):
+        refs_matchings, attr_completeness = \
+            compiled_model.get_refs_matchings(inputs)
+        compiled_model.get_matching_degrees(
+            compiled_model.get_antecedents_matchings(
+                refs_matchings,
+                attr_completeness.shape[0]
+            )
+        )
+
+    # each stage is a function, its arguments' setup and its number of items
+    benchmarks = {
+        'add_rules_from_df': (lambda model: model.add_rules_from_df(rules_df),
+                              new_model, n_rules),
+        'expand_rules': (lambda: model.expand_rules(get_A(n_antecedents, kind,
+                                                          n_values)),
+                         None, n_rules),
+        'compile': (model.compile, None, n_rules),
+        'run': (lambda: [model.run(X) for X in inputs[:10]], None,
+                min(batch_size, 10)),
+        'matching_degree': (lambda: match(chunk), None, len(chunk)),
+        'er': (lambda: analytical_er(trace.activation_weights,
+                                     belief_degrees), None, len(chunk)),
+        'run_batch': (lambda: model.run_batch(inputs), None, batch_size),
+    }
+
+    # expanded rule bases grow exponentially with the missing antecedents
+    n_expanded = np.sum(n_values ** rules_df[U].isna().sum(axis=1))
+    if n_expanded > max_expanded:
+        benchmarks.pop('expand_rules')
+
+    case = {'kind': kind, 'n_rules': n_rules, 'n_antecedents': n_antecedents,
+            'n_consequents': n_consequents, 'batch_size': batch_size}
+
+    results = list()
+    for stage in stages:
+        if stage not in benchmarks:
+            continue
+
+        func, setup, n_items = benchmarks[stage]
+        results.append(dict(case, stage=stage, n_items=n_items,
+                            **measure(func, setup, repeat=repeat)))
+
+    return results
+
+def _int_list(ctx, param, value) -> List[int]:
+    return [int(float(v)) for v in value.split(',')]
+
+def _str_list(ctx, param, value) -> List[str]:
+    return value.split(',')
+
+@click.group()
+def main():
+    """Scaling benchmarks of the main paths of `brb`.
+    """
+
+@main.command()
+@click.option('--kinds', default=','.join(KINDS), callback=_str_list,
+              help='Kinds of referential values and inputs.')
+@click.option('--rules', default='10,100,1000,10000', callback=_int_list,
+              help='Numbers of rules, e.g., 10,1e6.')
+@click.option('--antecedents', default='4', callback=_int_list,
+              help='Numbers of antecedents.')
+@click.option('--consequents', default='3', callback=_int_list,
+              help='Numbers of consequents.')
+@click.option('--batch-sizes', default='1,100', callback=_int_list,
+              help='Numbers of inputs of the batch inference.')
+@click.option('--n-values', type=click.INT, default=5,
+              help='Number of referential values of each antecedent.')
+@click.option('--missing', type=click.FLOAT, default=0.1,
+              help='Probability of an antecedent not being referred by a '
+                   'rule.')
+@click.option('--stages', default=','.join(STAGES), callback=_str_list,
+              help='Stages to be measured.')
+@click.option('--repeat', type=click.INT, default=3,
+              help='Number of timed calls of each stage.')
+@click.option('--max-expanded', type=click.INT, default=100000,
+              help='Maximum number of rules of the expanded rule bases.')
+@click.option('-o', '--output', type=click.Path(), default=None,
+              help='Results file, `bench-<commit>.json` by default.')
+def run(kinds, rules, antecedents, consequents, batch_sizes, n_values,
+        missing, stages, repeat, max_expanded, output):
+    """Runs the benchmarks over the grid of cases.
+    """
+    for stage in stages:
+        assert stage in STAGES, 'unknown stage `{}`'.format(stage)
+
+    commit = get_commit()
+    report = dict(format_version=FORMAT_VERSION,
+                  timestamp=datetime.now().isoformat(), **commit,
+                  environment=get_environment(), results=list())
+
+    for kind in kinds:
+        for n_rules in rules:
+            for n_antecedents in antecedents:
+                for n_consequents in consequents:
+                    for batch_size in batch_sizes:
+                        click.echo('{} rules={} antecedents={} consequents={} '
+                                   'batch={}'.format(kind, n_rules,
+                                                     n_antecedents,
+                                                     n_consequents,
+                                                     batch_size), err=True)
+
+                        for result in run_case(
+                                kind, n_rules, n_antecedents, n_consequents,
+                                batch_size, n_values=n_values,
+                                missing=missing, stages=stages,
+                                repeat=repeat, max_expanded=max_expanded):
+                            click.echo('    {:<20} {:>10.4f} s {:>10.1f} MiB'
+                                       .format(result['stage'],
+                                               result['seconds'],
+                                               result['peak_memory'] / 2**20),
+                                       err=True)
+                            report['results'].append(result)
+
+    if output is None:
+        output = 'bench-{}.json'.format((commit['commit'] or 'unknown')[:12])
+
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=1)
+
+    click.echo('Results written to {}'.format(output), err=True)
+
+@main.command()
+@click.argument('baseline', type=click.File('r'))
+@click.argument('contender', type=click.File('r'))
+@click.option('--threshold', type=click.FLOAT, default=1.2,
+              help='Ratio (contender / baseline) over which a stage is '
+                   'reported as a regression.')
+def compare(baseline, contender, threshold):
+    """Compares the results of two runs, case by case.
+
+    Exits with status 1 if any stage is slower (or takes more memory) than
+    the threshold allows.
+    """
+    baseline, contender = json.load(baseline), json.load(contender)
+    for report in (baseline, contender):
+        assert report['format_version'] == FORMAT_VERSION
+
+    def key(result):
+        return tuple(result[param] for param in CASE_PARAMS) \
+               + (result['stage'], )
+
+    baseline_results = {key(result): result for result in baseline['results']}
+
+    click.echo('{} -> {}'.format(baseline['commit'], contender['commit']))
+
+    regressions = 0
+    for result in contender['results']:
+        if key(result) not in baseline_results:
+            continue
+        baseline_result = baseline_results[key(result)]
+
+        time_ratio = result['seconds'] / max(baseline_result['seconds'], 1e-9)
+        memory_ratio = result['peak_memory'] \
+                       / max(baseline_result['peak_memory'], 1)
+
+        regression = time_ratio > threshold or memory_ratio > threshold
+        regressions += regression
+
+        click.echo('{:<60} time x{:<8.2f} memory x{:<8.2f}{}'.format(
+            ' '.join(str(v) for v in key(result)), time_ratio, memory_ratio,
+            ' REGRESSION' if regression else ''
+        ))
+
+    sys.exit(1 if regressions > 0 else 0)
+
+if __name__ == "__main__":
+    main()  # pylint: disable=no-value-for-parameter
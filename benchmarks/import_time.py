@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+"""Import time budget of the `brb` package.
+
+Measures the cumulative time of `import brb` through `python -X importtime`,
+in fresh interpreters, and checks it against a budget. Heavy, optional
+dependencies (pandas, scipy, click) must not be imported by `import brb`, but
+only by the paths that use them.
+
+Use it as:
+    $ python benchmarks/import_time.py --budget 0.3
+"""
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+import click
+
+# modules that must not be imported by `import brb`
+LAZY_MODULES = ('pandas', 'scipy', 'click')
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure_import(module: str = 'brb') -> Tuple[Dict[str, int], List[str]]:
+    """Imports `module` in a fresh interpreter.
+
+    Returns:
+        cumulative: Cumulative import time (in microseconds) of each imported
+        module.
+        imported: Modules imported, in order.
+    """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [ROOT] + ([env['PYTHONPATH']] if 'PYTHONPATH' in env else [])
+    )
+
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+        env=env,
+        cwd=ROOT,
+        stderr=subprocess.PIPE,
+        check=True,
+        universal_newlines=True
+    )
+
+    cumulative = dict()
+    imported = list()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+
+        # 'import time: <self> | <cumulative> | <indented name>'
+        _, cumulative_time, name = line.split('|')
+        name = name.strip()
+        cumulative[name] = int(cumulative_time)
+        imported.append(name)
+
+    return cumulative, imported
+
+@click.command()
+@click.option('--budget', type=click.FLOAT, default=0.5,
+              help='Maximum import time (in seconds).')
+@click.option('--repeat', type=click.INT, default=5,
+              help='Number of measurements, the fastest one is kept.')
+@click.option('--top', type=click.INT, default=10,
+              help='Number of slowest imports shown.')
+def main(budget, repeat, top):
+    """Checks the import time of `brb` against a budget.
+    """
+    measurements = [measure_import('brb') for _ in range(repeat)]
+    cumulative, imported = min(measurements,
+                               key=lambda m: m[0]['brb'])
+
+    print('import brb: {:.1f} ms (budget: {:.1f} ms)'.format(
+        cumulative['brb'] / 1e3, budget * 1e3
+    ))
+    slowest = sorted(cumulative, key=cumulative.get, reverse=True)
+    for name in slowest[1:top + 1]:
+        print('  {:>8.1f} ms  {}'.format(cumulative[name] / 1e3, name))
+
+    failed = False
+    for name in LAZY_MODULES:
+        if any(module.split('.')[0] == name for module in imported):
+            print('`{}` must be imported lazily'.format(name))
+            failed = True
+
+    if cumulative['brb'] > budget * 1e6:
+        print('import time over budget')
+        failed = True
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()  # pylint: disable=no-value-for-parameter
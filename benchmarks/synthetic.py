@@ -0,0 +1,129 @@
+"""Synthetic rule bases and inputs for the benchmarks.
+
+Rule bases are tables (as read by `RuleBaseModel.add_rules_from_df`) with
+random referential values, drawn from a fixed set of referential values per
+antecedent, and random belief degrees. The kind of referential values and
+inputs is one of `KINDS`:
+
+    categorical: Referential values 'v0', 'v1', ... and crisp categorical
+    inputs.
+    numeric: Integer referential values and crisp numeric inputs.
+    interval: Real-valued interval referential values ('0.0:1.0', ...), which
+    partition the real line, and interval inputs.
+    distribution: Categorical referential values and inputs given as
+    uncertain distributions over them.
+"""
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from brb import AttributeInput
+
+KINDS = ('categorical', 'numeric', 'interval', 'distribution')
+
+
+def get_referential_values(kind: str, n_values: int) -> List:
+    """Referential values of each antecedent.
+    """
+    if kind in ('categorical', 'distribution'):
+        return ['v{}'.format(j) for j in range(n_values)]
+    elif kind == 'numeric':
+        return list(range(n_values))
+    elif kind == 'interval':
+        return ['{:.1f}:{:.1f}'.format(j, j + 1) for j in range(n_values)]
+
+    raise ValueError('Unknown kind `{}`'.format(kind))
+
+def get_U(n_antecedents: int) -> List[str]:
+    return ['A_{}'.format(i) for i in range(n_antecedents)]
+
+def get_D(n_consequents: int) -> List[str]:
+    return ['D_{}'.format(j) for j in range(n_consequents)]
+
+def generate_rules(
+        n_rules: int,
+        n_antecedents: int,
+        n_consequents: int,
+        kind: str = 'categorical',
+        n_values: int = 5,
+        missing: float = 0.0,
+        seed: int = 0
+    ) -> pd.DataFrame:
+    """Generates a random rules table.
+
+    Args:
+        n_rules: Number of rules.
+        n_antecedents: Number of antecedents.
+        n_consequents: Number of consequents.
+        kind: Kind of the referential values, one of `KINDS`.
+        n_values: Number of referential values of each antecedent.
+        missing: Probability of each antecedent not being referred by a rule.
+        Rules refer to at least one antecedent.
+        seed: Seed of the random generator.
+
+    Returns:
+        rules_df: One row per rule, with one column per antecedent and
+        consequent.
+    """
+    rng = np.random.default_rng(seed)
+    A_values = np.array(get_referential_values(kind, n_values), dtype=object)
+
+    rules_df = pd.DataFrame({
+        U_i: A_values[rng.integers(0, n_values, n_rules)]
+        for U_i in get_U(n_antecedents)
+    })
+    if missing > 0:
+        mask = rng.random(rules_df.shape) < missing
+        # every rule refers to at least one antecedent
+        empty = np.flatnonzero(mask.all(axis=1))
+        mask[empty, rng.integers(0, n_antecedents, len(empty))] = False
+        rules_df = rules_df.mask(mask)
+
+    beta = rng.dirichlet(np.ones(n_consequents), n_rules)
+    for j, D_j in enumerate(get_D(n_consequents)):
+        rules_df[D_j] = beta[:, j]
+
+    return rules_df
+
+def generate_inputs(
+        n_inputs: int,
+        n_antecedents: int,
+        kind: str = 'categorical',
+        n_values: int = 5,
+        seed: int = 0
+    ) -> List[AttributeInput]:
+    """Generates random inputs for the rules of `generate_rules`.
+    """
+    rng = np.random.default_rng(seed)
+    U = get_U(n_antecedents)
+    A_values = get_referential_values(kind, n_values)
+
+    inputs = list()
+    for _ in range(n_inputs):
+        attr_input = dict()
+        for U_i in U:
+            if kind == 'categorical':
+                attr_input[U_i] = A_values[rng.integers(n_values)]
+            elif kind == 'numeric':
+                attr_input[U_i] = int(rng.integers(n_values))
+            elif kind == 'interval':
+                start = rng.uniform(0, n_values - 1)
+                attr_input[U_i] = '{:.3f}:{:.3f}'.format(
+                    start, start + rng.uniform(0.1, 1)
+                )
+            elif kind == 'distribution':
+                attr_input[U_i] = dict(zip(
+                    A_values,
+                    rng.dirichlet(np.ones(n_values)).tolist()
+                ))
+
+        inputs.append(AttributeInput(attr_input))
+
+    return inputs
+
+def get_A(n_antecedents: int, kind: str, n_values: int) -> Dict[str, List]:
+    """Referential values of all antecedents, as required by `expand_rules`.
+    """
+    return {U_i: get_referential_values(kind, n_values)
+            for U_i in get_U(n_antecedents)}
@@ -5,10 +5,12 @@ form to data types suitable for the model to process. These formats include
 support for uncertainty and incompleteness, and also for intervals.
 """
 from ast import literal_eval
-from typing import Dict, Any, List, Union
+from typing import Dict, Any, List, Tuple, Union
 
 from interval import interval, inf
 
+from . import profiling
+
 
 def str2interval(value: str) -> Union[interval, set]:
     """Converts a string to an integer or real-valued interval.
@@ -61,29 +63,130 @@ def str2interval(value: str) -> Union[interval, set]:
     return value_interval
 
 def is_numeric(a) -> bool:  # pylint: disable=missing-function-docstring
+    if isinstance(a, (int, float)):
+        return True
+
     try:
         float(a)
         return True
     except:
         return False
 
+# kinds of referential values, see `referential_kind`
+NUMERIC = 'numeric'
+CATEGORICAL = 'categorical'
+INTERVAL = 'interval'
+SET = 'set'
+DISTRIBUTION = 'distribution'
+
+def referential_kind(value) -> Union[str, None]:
+    """Classifies a (prepared) referential value.
+
+    Returns:
+        kind: One of `NUMERIC`, `CATEGORICAL` (strings), `INTERVAL`
+        (real-valued intervals), `SET` (integer intervals) or `DISTRIBUTION`
+        (uncertain distributions, as dictionaries). `None` if the value does
+        not fit any of them.
+    """
+    if is_numeric(value):
+        return NUMERIC
+    elif isinstance(value, str):
+        return CATEGORICAL
+    elif isinstance(value, interval):
+        return INTERVAL
+    elif isinstance(value, set):
+        return SET
+    elif isinstance(value, dict):
+        return DISTRIBUTION
+
+    return None
+
 class AttributeInput():
     """An input to the BRB system.
 
     Consists of a set of antecedent attribute values and degrees of belief.
+    Each value is coerced to a data type suitable for the model (see
+    `prep_referential_value`) only once, on its first access. If `prepared` is
+    `True`, the values are understood as already in the data types that the
+    model handles and are used as they are, e.g., strings are always
+    categorical values.
 
     Attributes:
         attr_input: X. Relates antecedent attributes with values and belief
         degrees. Must follow same order of reference values as in the model.
     """
 
-    def __init__(self, attr_input: Dict[str, Dict[Any, float]]):
+    def __init__(
+            self,
+            attr_input: Dict[str, Dict[Any, float]],
+            prepared: bool = False
+        ):
         self.attr_input = attr_input
 
+        # maps attributes to their (raw, prepared value, kind)
+        self._prepared = dict()
+        if prepared:
+            self._prepared = {U_i: (X_i, X_i, referential_kind(X_i))
+                              for U_i, X_i in attr_input.items()}
+
     def __getitem__(self, key):
         """Prepares the object's value before returning.
         """
-        return self.prep_referential_value(self.attr_input[key])
+        return self.get_prepared(key)[0]
+
+    def get_prepared(self, key) -> Tuple[Any, Union[str, None]]:
+        """Returns the prepared value of an attribute and its kind.
+
+        See `prep_referential_value` and `referential_kind`.
+        """
+        X_i = self.attr_input[key]
+
+        try:
+            raw_X_i, _X_i, kind = self._prepared[key]
+
+            # `attr_input` might have been modified since preparation
+            if raw_X_i is X_i:
+                return _X_i, kind
+        except KeyError:
+            pass
+
+        _X_i = self.prep_referential_value(X_i)
+        kind = referential_kind(_X_i)
+        self._prepared[key] = (X_i, _X_i, kind)
+
+        return _X_i, kind
+
+    def set_value(self, key, value: Any = None):
+        """Replaces the value of an attribute, dropping its prepared value.
+
+        Args:
+            key: Attribute.
+            value: New value. If `None`, the attribute is removed.
+        """
+        self._prepared.pop(key, None)
+
+        if value is None:
+            self.attr_input.pop(key, None)
+        else:
+            self.attr_input[key] = value
+
+    def copy(self, keys: List[str] = None) -> 'AttributeInput':
+        """Returns a copy of the input, e.g., to change some of its values.
+
+        The values already prepared are shared, thus not prepared again.
+
+        Args:
+            keys: Attributes kept in the copy. If `None`, all of them.
+        """
+        if keys is None:
+            keys = self.attr_input.keys()
+
+        X = AttributeInput({key: self.attr_input[key] for key in keys
+                            if key in self.attr_input})
+        X._prepared = {key: self._prepared[key] for key in X.attr_input
+                       if key in self._prepared}
+
+        return X
 
     @staticmethod
     def prep_referential_value(X_i):
@@ -95,6 +198,12 @@ class AttributeInput():
             (categorical value), or a dictionary, which is understood as an
             uncertain distribution over categorical or numerical values.
         """
+        profiling.count('parse_calls')
+
+        if not isinstance(X_i, str):
+            # already in pythonic form
+            return X_i
+
         try:
             # TODO: rewrite code based on `literal_eval` application on the
             # input
@@ -144,11 +253,14 @@ class AttributeInput():
         sum_completeness = 0.0
         for A_i in A:
             try:
-                if isinstance(self[A_i], dict):
-                    sum_completeness += sum(self[A_i].values())
-                else:
-                    sum_completeness += 1.0
+                _X_i = self[A_i]
             except KeyError:
                 sum_completeness += 0.0
+                continue
+
+            if isinstance(_X_i, dict):
+                sum_completeness += sum(_X_i.values())
+            else:
+                sum_completeness += 1.0
 
         return sum_completeness / len(A)
@@ -27,14 +27,31 @@ approach.
     >>> model.run(X)
     [0.15517241379310348, 0.8448275862068964]
 """
-from copy import copy
-from typing import List, Any
+from typing import List, Any, Callable, Dict, Iterator, Sequence, Tuple, \
+                   Union, TYPE_CHECKING
 
 import numpy as np
-import pandas as pd
 
 from .attr_input import AttributeInput
-from .rule import Rule
+from .cache import ResultCache, get_input_key
+from .compiled import CompiledRuleBaseModel, MAX_MEMORY
+from .grid import iter_grid
+from .index import RuleIndex
+from .matching_degree import is_registered
+from .profiling import Profiler, RunProfile
+from .rule import Rule, WILDCARD, assert_parameters, parse_disjunctive
+from .snapshot import read_snapshot, save_model
+from .store import RuleStore
+from .trace import InferenceTrace
+from .train import fit, get_targets, PARAMETERS
+from .utility import get_utilities, top_k
+
+# pandas (and multiprocessing) are only imported by the paths that use them,
+# as they dominate the import time of the package
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from .sharded import ShardedRuleBaseModel
 
 class RuleBaseModel():
     """Parameters for the model.
@@ -46,9 +63,42 @@ class RuleBaseModel():
         U: Antecendent attributes' names.
         D: Consequent referential values.
         F: ?
-        rules: List of rules.
+        A: Dictionary indexed by `self.U` that contains all possible
+        referential values for the antecedents. Required for rules with
+        "don't care" (`rule.WILDCARD`) antecedents.
+        rules: Rules, stored as arrays and accessed as views (see
+        `store.RuleStore`).
+        utilities: u(D). Utility of each consequent referential value, in the
+        same order as `D`. Required for the utility-based evaluation (see
+        `get_utilities`).
+        log_space: If `True`, the analytical ER algorithm is accumulated in log
+        space, which is numerically safe for rule bases with a very large
+        number of rules (see `er.log_analytical_er`).
+        missing_as_wildcard: If `True`, antecedents missing from the rules
+        added to the model are understood as "don't care" (`rule.WILDCARD`)
+        ones, i.e., the rules are evaluated as if expanded through
+        `expand_rules`. Otherwise, the rules do not depend on them.
+        parse_disjunctive: If `True`, the string referential values of the
+        rules added to the model may be disjunctive ones, e.g., in rules
+        tables: '*' is the "don't care" value and 'l|m' is an OR-set (see
+        `rule.parse_disjunctive`). Otherwise, strings are referential values
+        as they are, and disjunctive values are only given as `rule.AnyOf`.
+        profiler: If not `None`, profiles `run` and `run_batch` (see
+        `enable_profiling`).
+        cache: If not `None`, caches the output of `run` for repeated inputs
+        (see `enable_cache`).
     """
-    def __init__(self, U: List[str], D: List[Any], F=None):
+    def __init__(
+            self,
+            U: List[str],
+            D: List[Any],
+            F=None,
+            A: Dict[str, Sequence[Any]] = None,
+            log_space: bool = False,
+            utilities: Sequence[float] = None,
+            missing_as_wildcard: bool = False,
+            parse_disjunctive: bool = False
+        ):
         # no repeated elements for U
         assert len(U) == len(set(U))
         self.U = U
@@ -57,13 +107,41 @@ class RuleBaseModel():
         self.D = D
         self.F = F
 
-        self.rules = list()
+        if A is not None:
+            # referential values must be related to an attribute
+            assert set(A.keys()).issubset(set(U))
+            A = {U_i: list(A_i) for U_i, A_i in A.items()}
+        self.A = A
+
+        self.log_space = log_space
+        self.missing_as_wildcard = missing_as_wildcard
+        self.parse_disjunctive = parse_disjunctive
+
+        # there must be a utility for each consequent
+        assert utilities is None or len(utilities) == len(D)
+        self.utilities = utilities
+
+        self.rules = RuleStore(self.U, self.D)
+
+        # compiled version of the model, used for batch inference, and the
+        # version of the rules it was compiled from (see `get_version`)
+        self._compiled = None
+        self._compiled_version = None
+
+        # referential values => rules, see `get_candidate_rules`, and the
+        # version of the rules it was built from (see `get_version`)
+        self._index = RuleIndex(self.U)
+        self._index_version = self.get_version()
+
+        self.profiler = None
+        self.cache = None
 
     def add_rule(self, new_rule: Rule):
         """Adds a new rule to the model.
 
         Verifies if the given rule agrees with the model settings and adds it
-        to `.rules`.
+        to `.rules`. The rule becomes a view of its row (see `Rule.bind`),
+        thus changing it changes the model.
         """
         # all reference values must be related to an attribute
         assert set(new_rule.A_values.keys()).issubset(set(self.U))
@@ -73,16 +151,183 @@ class RuleBaseModel():
         # consequent values must agree in shape with the model's consequents
         assert len(new_rule.beta) == len(self.D)
 
+        # same checks as the rules tables, see `loader.get_rules_columns`
+        assert_parameters(new_rule.beta, new_rule.theta,
+                          list(new_rule.delta.values()))
+
+        self._append_rule(new_rule)
+
+    def _append_rule(self, new_rule: Rule):
+        """Adds an already verified rule to the model.
+        """
+        rule = new_rule
+
+        A_values = new_rule.A_values
+        if self.parse_disjunctive:
+            A_values = {U_i: parse_disjunctive(A_i)
+                        for U_i, A_i in A_values.items()}
+        if self.missing_as_wildcard and len(A_values) < len(self.U):
+            A_values = {U_i: A_values.get(U_i, WILDCARD) for U_i in self.U}
+
+        if A_values != new_rule.A_values:
+            new_rule = Rule(
+                A_values=A_values,
+                beta=new_rule.beta,
+                delta=new_rule.delta,
+                theta=new_rule.theta,
+                matching_degree=new_rule.matching_degree
+            )
+
+        # rules must refer to at least one antecedent
+        assert len(new_rule.A_values) > 0, \
+            'rules must refer to at least one antecedent'
+
+        # referential values of "don't care" antecedents must be known
+        for U_i, alternatives in new_rule.disjunctive.items():
+            if alternatives is None:
+                assert self.A is not None and U_i in self.A.keys(), \
+                    'referential values of `{}` must be provided'.format(U_i)
+
+        index_outdated = self._index_version != self.get_version()
+
         self.rules.append(new_rule)
+        if isinstance(self.rules, RuleStore):
+            # the given rule, not its disjunctive version, if any
+            rule.bind(self.rules, len(self.rules) - 1)
+
+        self._compiled = None
+
+        if not index_outdated:
+            self._index.add_rule(new_rule)
+            self._index_version = self.get_version()
+
+    def add_rules_from_columns(
+            self,
+            columns: Dict[str, np.ndarray],
+            matching_degree: str = 'arithmetic'
+        ):
+        """Adds the rules of a (validated) rules table, given by columns.
+
+        The columns are verified at once, instead of rule by rule. If the
+        model was compiled, the new rules are encoded straight into the
+        compiled model's arrays (see `loader.compile_columns`).
+
+        Args:
+            columns: As returned by `loader.get_rules_columns`. Antecedents
+            must follow `self.U` and consequents `self.D`.
+            matching_degree: Matching degree of the new rules.
+        """
+        # pylint: disable=import-outside-toplevel
+        from .loader import compile_columns, has_disjunctive_values
+
+        # the columns must agree in shape with the model
+        assert columns['A'].shape[1] == len(self.U)
+        assert columns['beta'].shape == (columns['A'].shape[0], len(self.D))
+
+        n_rules = len(self.rules)
+        compiled_model = self._compiled
+        if n_rules > 0 and self._compiled_version != self.get_version():
+            compiled_model = None
+
+        if self.parse_disjunctive:
+            columns = dict(columns, A=np.frompyfunc(parse_disjunctive, 1, 1)(
+                columns['A']
+            ))
+
+        A, missing = columns['A'], columns['missing']
+        if isinstance(self.rules, RuleStore):
+            self._extend_store(A, missing, columns['beta'], columns['delta'],
+                               columns['theta'], matching_degree)
+        else:
+            for n in range(A.shape[0]):
+                A_values = dict()
+                delta = dict()
+                for i, U_i in enumerate(self.U):
+                    if not missing[n, i]:
+                        A_values[U_i] = A[n, i]
+                        delta[U_i] = columns['delta'][n, i]
+
+                self._append_rule(Rule(A_values=A_values,
+                                       beta=columns['beta'][n].tolist(),
+                                       delta=delta,
+                                       theta=float(columns['theta'][n]),
+                                       matching_degree=matching_degree))
+
+        # disjunctive rules are compiled from the rules when needed
+        if (self.missing_as_wildcard and missing.any()) \
+                or has_disjunctive_values(columns) \
+                or not is_registered(matching_degree):
+            return
+
+        new_compiled_model = compile_columns(self.U, self.D, columns,
+                                             matching_degree=matching_degree,
+                                             log_space=self.log_space)
+        if n_rules == 0:
+            self._set_compiled(new_compiled_model)
+        elif compiled_model is not None:
+            self._set_compiled(CompiledRuleBaseModel.concatenate(
+                [compiled_model, new_compiled_model]
+            ))
+
+    def _extend_store(
+            self,
+            A: np.ndarray,
+            missing: np.ndarray,
+            beta: np.ndarray,
+            delta: np.ndarray,
+            theta: np.ndarray,
+            matching_degree: str
+        ):
+        """Adds the rules of a rules table straight into `self.rules`.
+
+        Same as `_append_rule` for each rule, but encoded at once (see
+        `RuleStore.extend_columns`). The rules are indexed when first needed
+        (see `get_candidate_rules`).
+        """
+        if self.missing_as_wildcard and missing.any():
+            # "don't care" antecedents get the average of the other weights,
+            # as in `Rule.delta`
+            n_given = np.sum(~missing, axis=1, keepdims=True)
+            mean_delta = np.sum(np.where(missing, 0, delta), axis=1,
+                                keepdims=True) / np.maximum(n_given, 1)
+            delta = np.where(missing, np.where(n_given > 0, mean_delta, 1),
+                             delta)
+
+            A = np.where(missing, WILDCARD, A)
+            missing = np.zeros_like(missing)
+
+        # rules must refer to at least one antecedent
+        assert not missing.all(axis=1).any(), \
+            'rules must refer to at least one antecedent'
+
+        n_rules = len(self.rules)
+        self.rules.extend_columns(A, missing, beta, delta, theta,
+                                  matching_degree)
+
+        self._compiled = None
+
+        # referential values of "don't care" antecedents must be known
+        unknown = [
+            U_i for U_i, wildcard
+            in self.rules.get_disjunctive(slice(n_rules, None)).items()
+            if wildcard and (self.A is None or U_i not in self.A.keys())
+        ]
+        if unknown:
+            del self.rules[n_rules:]
+        assert not unknown, \
+            'referential values of `{}` must be provided'.format(unknown)
 
     def add_rules_from_df(
             self,
-            rules_df: pd.DataFrame,
+            rules_df: 'pd.DataFrame',
             thetas: str = None,
             delta_cols: List[str] = None,
         ):
         """Adds rules from pandas.DataFrame object. Columns must agree to model.
 
+        The table is validated and encoded column by column (see
+        `add_rules_from_columns`).
+
         Args:
             rules_df: Rules dataframe. Each row must be a rule. The columns must
             be the antecedents, consequents and rule weights (optional).
@@ -91,27 +336,49 @@ class RuleBaseModel():
             delta_cols: Columns from `rules_df` containing the attribute
             weights for each rule.
         """
-        # TODO: add deltas input support
-        antecedents_df = rules_df[self.U]
-        consequents_df = rules_df[self.D]
-
-        A_ks = np.matrix(antecedents_df.values)
-        betas = np.matrix(consequents_df.values)
-
-        if thetas is not None:
-            thetas = rules_df[thetas].values
+        from .loader import get_rules_columns  # pylint: disable=import-outside-toplevel
 
-        deltas = None
         # only valid if there are 1:1 weights to attributes
-        if delta_cols is not None and len(delta_cols) == len(self.U):
-            deltas = np.matrix(rules_df[delta_cols].values)
+        if delta_cols is not None and len(delta_cols) != len(self.U):
+            delta_cols = None
 
-        self.add_rules_from_matrix(
-            A_ks=A_ks,
-            betas=betas,
+        self.add_rules_from_columns(get_rules_columns(
+            rules_df,
+            self.U,
+            self.D,
             thetas=thetas,
-            deltas=deltas
-        )
+            delta_cols=delta_cols
+        ))
+
+    def load_rules(
+            self,
+            source: Union[str, 'pd.DataFrame'],
+            thetas: str = None,
+            delta_cols: List[str] = None,
+            chunksize: int = 100000,
+            **kwargs
+        ) -> int:
+        """Adds the rules of a csv, Parquet or Feather table, chunk by chunk.
+
+        See `loader.load_rules`.
+
+        Args:
+            source: Either the path to the table or a `pd.DataFrame`. Columns
+            must agree to model.
+            thetas: Rules weights column. If `None` (default value), same
+            weight (1.0) is given to all rules.
+            delta_cols: Columns containing the attribute weights for each
+            rule, in the same order as `self.U`.
+            chunksize: Maximum number of rows read at once.
+            kwargs: Passed to the `pandas` reading function.
+
+        Returns:
+            n_rules: Number of rules added.
+        """
+        from .loader import load_rules  # pylint: disable=import-outside-toplevel
+
+        return load_rules(self, source, thetas=thetas, delta_cols=delta_cols,
+                          chunksize=chunksize, **kwargs)
 
     def add_rules_from_matrix(
             self,
@@ -134,6 +401,8 @@ class RuleBaseModel():
             thetas: Rules weights. If `None` (default value), same weight is
             given for all rules (1).
         """
+        import pandas as pd  # pylint: disable=import-outside-toplevel
+
         # TODO: add support for uncertainty and incompleteness in the rule
         # definition for both antecedents and consequents
 
@@ -177,15 +446,82 @@ class RuleBaseModel():
             self.add_rule(Rule(A_values=A_values, beta=rule_beta, delta=delta,
                                theta=theta))
 
-    # TODO: add get_ function that returns the full rules matrix (all
-    # combination of antecedent attributes' values) as a boilerplate for
-    # defining the full set of rules.
+    def get_rules_grid(
+            self,
+            A: dict,
+            chunk_size: int = 10000
+        ) -> Iterator['pd.DataFrame']:
+        """Generates the full rules matrix, as a boilerplate for the rules.
 
-    # TODO: add interface for "tunable" parameters
+        The matrix contains all combinations of the antecedents' referential
+        values, one per row, and empty (NaN) consequents' belief degrees to
+        be filled. It is generated lazily, in chunks, so memory is bounded by
+        `chunk_size` no matter the number of combinations. The filled matrix
+        can be loaded through `add_rules_from_df` or `csv2BRB`.
+
+        Args:
+            A: Dictionary indexed by `self.U` that contains all possible
+            referential values for the antecedents.
+            chunk_size: Maximum number of rows of each chunk.
+
+        Yields:
+            rules_df: Chunk of the matrix, with one column for each antecedent
+            and consequent. The index is the position of the row in the whole
+            matrix.
+        """
+        import pandas as pd  # pylint: disable=import-outside-toplevel
+
+        # referential values must be provided for all antecedents
+        assert set(self.U) == set(A.keys())
+
+        A_values = [list(A[U_i]) for U_i in self.U]
+
+        start = 0
+        for rows in iter_grid(A_values, chunk_size=chunk_size):
+            rules_df = pd.DataFrame(rows, columns=self.U,
+                                    index=pd.RangeIndex(start,
+                                                        start + len(rows)))
+            for D_j in self.D:
+                rules_df[D_j] = np.nan
+
+            start += len(rows)
+
+            yield rules_df
+
+    def rules_grid_to_csv(
+            self,
+            A: dict,
+            csv_filepath: str,
+            chunk_size: int = 10000
+        ) -> int:
+        """Streams the full rules matrix (see `get_rules_grid`) to a csv file.
+
+        Args:
+            A: Dictionary indexed by `self.U` that contains all possible
+            referential values for the antecedents.
+            csv_filepath: Path of the csv file, overwritten if it exists.
+            chunk_size: Maximum number of rows kept in memory.
+
+        Returns:
+            n_rows: Number of rows written, besides the header.
+        """
+        n_rows = 0
+        for rules_df in self.get_rules_grid(A, chunk_size=chunk_size):
+            rules_df.to_csv(csv_filepath, mode='w' if n_rows == 0 else 'a',
+                            header=n_rows == 0, index=False)
+            n_rows += len(rules_df)
+
+        return n_rows
 
     def expand_rules(self, A: dict) -> List[Rule]:
         """Expands rules with empty antecedents to cover all possibilities.
 
+        Note that the same results are achieved, without creating new rules,
+        through "don't care" antecedents (see `missing_as_wildcard`).
+
+        The rules are expanded as arrays (see `RuleStore.expand`), and
+        returned as views over the expanded rows.
+
         Args:
             A: Dictinary indexed by `self.U` that contains all possible
             referential values for the antecedents.
@@ -196,22 +532,252 @@ class RuleBaseModel():
         # referential values must be provided for all antecedents
         assert set(self.U) == set(A.keys())
 
-        # no previous antecedent => all rules are complete
-        complete_rules = self.rules
-        for U_i in self.U:
-            # for the current antecedent, we don't know which rules are complete
-            _rules = complete_rules
-            complete_rules = list()
+        rules = self.rules
+        if not isinstance(rules, RuleStore):
+            rules = RuleStore.from_rules(self.U, self.D, rules)
+
+        return list(rules.expand(A))
+
+    def compile(self) -> CompiledRuleBaseModel:
+        """Freezes the rule base into dense arrays for faster inference.
+
+        Rules added to the model after compilation are not reflected in the
+        compiled model.
+
+        Returns:
+            compiled_model: Array-based version of the model, whose `run`
+            gives the same results as `self.run`.
+        """
+        if isinstance(self.rules, RuleStore):
+            return self.rules.compile(log_space=self.log_space, A=self.A)
+
+        return CompiledRuleBaseModel.from_rules(self.U, self.D, self.rules,
+                                                log_space=self.log_space,
+                                                A=self.A)
+
+    def fit(
+            self,
+            inputs: Union[Sequence[AttributeInput], 'pd.DataFrame'],
+            targets,
+            params: Sequence[str] = PARAMETERS,
+            max_iter: int = 100,
+            tol: float = None,
+            max_memory: int = MAX_MEMORY
+        ):
+        """Learns the rules' parameters from labeled data.
+
+        Minimizes the mean squared error between `self.run` and the targets
+        over the whole dataset, with analytical gradients (see `train`). The
+        trained belief degrees sum to 1 for each rule, while the rule weights
+        and attribute weights lie in [0, 1]. Only the attribute weights of
+        rules with 'arithmetic', 'geometric' or registered matching degrees
+        with gradient are trained.
+
+        Args:
+            inputs: Either a sequence of `AttributeInput` or a `pd.DataFrame`
+            with one column per antecedent in `self.U`.
+            targets: Either the expected belief degrees, shape (N, |D|), or the
+            expected consequent referential value of each input.
+            params: Parameters to be trained, any of 'beta', 'theta' and
+            'delta'.
+            max_iter: Maximum number of iterations of the optimizer.
+            tol: Tolerance for termination (see `scipy.optimize.minimize`).
+            max_memory: Memory budget (in bytes) for the intermediate arrays.
+
+        Returns:
+            result: Optimization result, as returned by
+            `scipy.optimize.minimize`, whose `fun` is the final loss.
+        """
+        compiled_model = self.compile()
+
+        result = fit(compiled_model, inputs, get_targets(targets, self.D),
+                     params=params, max_iter=max_iter, tol=tol,
+                     max_memory=max_memory)
+
+        if isinstance(self.rules, RuleStore):
+            self.rules.set_parameters(np.arange(len(self.rules)),
+                                      theta=compiled_model.theta,
+                                      beta=compiled_model.beta,
+                                      delta=compiled_model.delta)
+        else:
+            for k, rule in enumerate(self.rules):
+                rule.theta = float(compiled_model.theta[k])
+                rule.beta = compiled_model.beta[k].tolist()
+                rule.delta = {U_i: float(compiled_model.delta[k, i])
+                              for i, U_i in enumerate(self.U)
+                              if U_i in rule.A_values.keys()}
+
+        self._set_compiled(compiled_model)
+
+        return result
+
+    def shard(self, n_shards: int = None) -> 'ShardedRuleBaseModel':
+        """Partitions the rule base across worker processes.
+
+        Rules added to the model after sharding are not reflected in the
+        sharded model, which must be closed (see `ShardedRuleBaseModel.close`)
+        to stop its workers.
+
+        Args:
+            n_shards: Number of shards (and worker processes). If `None`, one
+            per CPU.
+
+        Returns:
+            sharded_model: Sharded version of the model, whose `run` gives the
+            same results as `self.run`.
+        """
+        from .sharded import ShardedRuleBaseModel  # pylint: disable=import-outside-toplevel
+
+        return ShardedRuleBaseModel(self.U, self.D, self.rules,
+                                    n_shards=n_shards,
+                                    log_space=self.log_space,
+                                    A=self.A)
+
+    def save(self, path: str):
+        """Saves the model as a binary snapshot directory.
+
+        See `snapshot`. Rules whose matching degree is an arbitrary function
+        cannot be saved, unless registered (see
+        `matching_degree.register_matching_degree`).
+
+        Args:
+            path: Path of the snapshot directory, created if it does not
+            exist.
+        """
+        save_model(self, path)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> 'RuleBaseModel':
+        """Loads a model saved by `save`.
+
+        The compiled model and the index of the rules are loaded as well,
+        thus `run` and `run_batch` are available right away, and the rules
+        are only created when accessed. Custom
+        matching degree functions must be registered before loading.
+
+        Args:
+            path: Path of the snapshot directory.
+            mmap: If `True`, the arrays are memory-mapped (read-only), so
+            that the processes that load the same snapshot share them.
+
+        Returns:
+            model: Loaded model.
+        """
+        settings, rules, compiled_model, index = read_snapshot(path,
+                                                              mmap=mmap)
+
+        model = cls(**settings)
+        model.rules = rules
+        model._set_compiled(compiled_model)
+        model._index = index
+        model._index_version = model.get_version()
+
+        return model
+
+    def get_compiled(self) -> CompiledRuleBaseModel:
+        """Returns the compiled model, compiling it if outdated.
+
+        Unlike `compile`, the same compiled model is returned (e.g., the one
+        used by `run_batch`) while the rules do not change (see
+        `get_version`), thus it must not be changed.
+        """
+        if self._compiled is None \
+                or self._compiled_version != self.get_version():
+            self._set_compiled(self.compile())
+
+        return self._compiled
+
+    def _set_compiled(self, compiled_model: CompiledRuleBaseModel):
+        """Keeps a compiled model of the current rules, see `get_compiled`.
+        """
+        self._compiled = compiled_model
+        self._compiled_version = self.get_version()
+
+    def get_candidate_rules(self, X: AttributeInput) -> List[int]:
+        """Returns the rules that may be activated by `X`.
+
+        Rules that are not returned have matching degree 0, thus activation
+        weight 0, which does not affect the analytical ER algorithm.
+
+        Returns:
+            candidates: Sorted indexes of the rules in `self.rules`.
+        """
+        # the rules were changed without `add_rule`, e.g., through views
+        version = self.get_version()
+        if self._index_version != version:
+            if isinstance(self.rules, RuleStore):
+                self._index = RuleIndex.from_store(self.rules)
+            else:
+                self._index = RuleIndex(self.U)
+                for rule in self.rules:
+                    self._index.add_rule(rule)
+            self._index_version = version
+
+        # input for all the antecedents used by the rules must be provided
+        for U_i in self._index.U_used:
+            assert U_i in X.attr_input.keys()
+
+        return self._index.get_candidates(X)
+
+    def enable_profiling(
+            self,
+            callback: Callable[[Dict[str, Dict]], None] = None
+        ) -> Profiler:
+        """Profiles the stages of `run` and `run_batch` (see `profiling`).
+
+        Each call of `run_batch` is profiled as one run, over all the rows of
+        the compiled model (see `CompiledRuleBaseModel.run_batch`).
 
-            for rule in _rules:
-                if U_i not in rule.A_values.keys():
-                    A_i = A[U_i]
+        Args:
+            callback: If not `None`, called after each run with its stage
+            timings and counters (see `Profiler.snapshot`).
 
-                    complete_rules += rule.expand_antecedent(U_i, A_i)
-                else:
-                    complete_rules.append(copy(rule))
+        Returns:
+            profiler: Profiler of the model, whose `snapshot` accumulates all
+            the profiled runs.
+        """
+        self.profiler = Profiler(callback=callback)
 
-        return complete_rules
+        return self.profiler
+
+    def disable_profiling(self):
+        """Stops profiling `run` and `run_batch`, see `enable_profiling`.
+        """
+        self.profiler = None
+
+    def enable_cache(self, max_size: int = 1024) -> ResultCache:
+        """Caches the output of `run` for repeated inputs (see `cache`).
+
+        Inputs are identified by their prepared values, and the cached
+        outputs are dropped whenever the rules change (see `get_version`).
+        Inputs with values that have no hashable form are not cached.
+
+        Args:
+            max_size: Maximum number of cached outputs, the least recently
+            used ones being evicted first.
+
+        Returns:
+            cache: Cache of the model, e.g., for its statistics (see
+            `ResultCache.stats`).
+        """
+        self.cache = ResultCache(max_size=max_size)
+
+        return self.cache
+
+    def disable_cache(self):
+        """Stops caching the output of `run`, see `enable_cache`.
+        """
+        self.cache = None
+
+    def get_version(self) -> Tuple:
+        """Identifies the state of the rule base that `run` depends on.
+
+        The version changes whenever rules are added, removed or changed
+        (e.g., by `fit`), as long as `rules` is a `store.RuleStore`.
+        Otherwise, only additions and removals are noticed.
+        """
+        return (id(self.rules), getattr(self.rules, 'version', None),
+                len(self.rules), self.log_space, self.missing_as_wildcard)
 
     def run(self, X: AttributeInput):
         """Infer the output based on the RIMER approach.
@@ -225,76 +791,235 @@ class RuleBaseModel():
         belief degrees. Finally, the final belief degrees are calculated from
         the analytical ER algorithm.
 
+        Only the rules that may be activated by the input are evaluated (see
+        `get_candidate_rules`), as the others do not affect the result.
+        Disjunctive rules are evaluated as their expanded form (see
+        `Rule.expand`). If a cache is enabled (see `enable_cache`), repeated
+        inputs take the output of their first run.
+
         Args:
             X: Attribute's data to be fed to the rules.
         """
+        if self.cache is None:
+            return list(self.run_trace(X).belief_degrees)
+
+        key = get_input_key(X)
+        if key is None:
+            return list(self.run_trace(X).belief_degrees)
+
+        self.cache.set_version(self.get_version())
+        belief_degrees = self.cache.get(key)
+        if belief_degrees is None:
+            belief_degrees = tuple(self.run_trace(X).belief_degrees)
+            self.cache.put(key, belief_degrees)
+
+        return list(belief_degrees)
+
+    def run_trace(self, X: AttributeInput) -> InferenceTrace:
+        """Infer the output, keeping the intermediates of the inference.
+
+        Same as `run`, but the matching degrees, activation weights,
+        completeness factors and ER productories of the evaluated rules are
+        returned along with the belief degrees, e.g., to explain the result
+        (see `InferenceTrace.get_top_rules`) without computing them again.
+
+        Args:
+            X: Attribute's data to be fed to the rules.
+
+        Returns:
+            trace: Belief degrees and intermediates. Its rows are the rules
+            that may be activated by the input (see `get_candidate_rules`).
+        """
+        if self.profiler is not None:
+            with self.profiler.start_run() as profile:
+                return self._run_trace(X, profile)
+
+        return self._run_trace(X)
+
+    def _run_trace(
+            self,
+            X: AttributeInput,
+            profile: RunProfile = None
+        ) -> InferenceTrace:
+        """Same as `run_trace`, timing its stages if `profile` is given.
+        """
         # input for all valid antecedents must be provided
         for U_i in X.attr_input.keys():
             assert U_i in self.U
 
+        if profile is not None:
+            # otherwise, the input is prepared on demand while matching
+            for U_i in X.attr_input.keys():
+                X.get_prepared(U_i)
+            profile.lap('parse')
+
         # 2. matching degree
         # alphas[k] = \alpha_k = matching degree of k-th rule
-        alphas = [rule.get_matching_degree(X) for rule in self.rules]
+        rules = list()
+        alphas = list()
+        completeness = list()
+        for k in self.get_candidate_rules(X):
+            rule = self.rules[k]
+
+            if rule.disjunctive:
+                rule_alphas = rule.get_matching_degrees(X, self.A)
+            else:
+                rule_alphas = [rule.get_matching_degree(X)]
+
+            # each rule of the expanded form is combined on its own
+            rules += len(rule_alphas) * [k, ]
+            alphas += rule_alphas
+            completeness += len(rule_alphas) \
+                            * [X.get_completeness(rule.A_values.keys())]
+
+        rules = np.array(rules, dtype=np.int64)
+        alphas = np.array(alphas, dtype=float)
+
+        if profile is not None:
+            profile.count('rules_evaluated', len(rules))
+            profile.count('rules_activated', int(np.count_nonzero(alphas)))
+            profile.lap('matching')
 
         # 3. activation weight
         # implementation based on eq. (7) of "Belief rule-base inference
         # methodology using the evidential reasoning Approach-RIMER", by
         # _Yang et al._
+        theta, beta = self._get_parameters(rules)
+        theta_alphas = theta * alphas
 
         # total_theta_alpha is the sum on the denominator of said equation
-        total_theta_alpha = sum([rule.theta*alpha_k for rule, alpha_k
-                                 in zip(self.rules, alphas)])
+        total_theta_alpha = np.sum(theta_alphas)
         total_theta_alpha = total_theta_alpha if total_theta_alpha != 0 else 1
 
         # activation_weights[k] = w_k = activation weight of the k-th rule
-        activation_weights = [rule.theta * alpha_k / total_theta_alpha
-                              for rule, alpha_k in zip(self.rules, alphas)]
+        activation_weights = theta_alphas / total_theta_alpha
 
-        # 4. degrees of belief
+        if profile is not None:
+            profile.lap('activation')
+
+        # 4. degrees of belief and 5. analytical ER algorithm
         # use normalized belief degrees to compensate for incompleteness
-        belief_degrees = [rule.get_belief_degrees_complete(X) for rule
-                          in self.rules]
-
-        # 5. analytical ER algorithm
-
-        # sum of all belief degrees over the rules
-        total_belief_degrees = [sum(beta_k) for beta_k in belief_degrees]
-
-        # left_prods is the productory that appears both in the left-side
-        # of the numerator of eq. (4) and in \mu. Note that this depends on j
-        left_prods = list()
-        # map is a transposition of belief_degrees
-        for rules_beta_j in map(list, zip(*belief_degrees)):
-            left_prods.append(np.prod(
-                [weight_k * rules_beta_jk + 1 - weight_k * total_belief_degrees_k  # pylint: disable=line-too-long
-                 for weight_k, rules_beta_jk, total_belief_degrees_k
-                 in zip(activation_weights, rules_beta_j, total_belief_degrees)]
-            ))
-        # the productory that appears in the right side of the numerator of eq.
-        # (4) and in \mu
-        right_prod = np.prod(
-            [1 - weight_k * total_belief_degrees_k
-             for weight_k, total_belief_degrees_k
-             in zip(activation_weights, total_belief_degrees)]
+        trace = InferenceTrace(
+            self.D,
+            rules,
+            matching_degrees=alphas,
+            activation_weights=activation_weights,
+            completeness=np.array(completeness, dtype=float),
+            beta=beta,
+            log_space=self.log_space
         )
-        mu = 1 / (sum(left_prods) - (len(self.D) - 1) * right_prod)
 
-        # eq. (4)
-        belief_degrees = [mu * (left_prod - right_prod) / (1 - mu * \
-                          np.prod([1 - weight_k for weight_k
-                                   in activation_weights]))
-                          for left_prod in left_prods]
-        # TODO: `brb.py:307: RuntimeWarning: invalid value encountered in
-        # double_scalars` while running test.py
+        if profile is not None:
+            profile.lap('er')
+
+        return trace
+
+    def _get_parameters(
+            self,
+            rules: np.ndarray
+        ) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the rules' weights, shape (K,), and belief degrees, shape
+        (K, |D|), of the given rules.
+        """
+        if isinstance(self.rules, RuleStore):
+            arrays = self.rules.arrays
+
+            return arrays['theta'][rules], arrays['beta'][rules]
+
+        theta = np.array([self.rules[k].theta for k in rules], dtype=float)
+        beta = np.reshape([self.rules[k].beta for k in rules],
+                          (len(rules), len(self.D)))
+
+        return theta, beta
 
-        # handles the case where there is 0 certainty, i.e., completely 0 input
-        if all(np.isnan(belief_degrees)):
-            belief_degrees = [mu * (left_prod - right_prod) for left_prod
-                              in left_prods]
+    def run_batch(
+            self,
+            inputs: Union[Sequence[AttributeInput], 'pd.DataFrame'],
+            max_memory: int = MAX_MEMORY
+        ) -> np.ndarray:
+        """Infer the output for many inputs at once.
 
-        # TODO: add utility calculation
+        The matching degrees, activation weights and the analytical ER
+        algorithm are computed over the whole batch at once, through the
+        compiled model (see `compile`). The batch is processed in chunks so
+        that the intermediate arrays do not exceed `max_memory`.
 
-        return belief_degrees
+        Args:
+            inputs: Either a sequence of `AttributeInput` or a `pd.DataFrame`
+            with one column per antecedent in `self.U`.
+            max_memory: Memory budget (in bytes) for the intermediate arrays.
+
+        Returns:
+            belief_degrees: Resulting belief degrees, shape (N, |D|). The i-th
+            row is the same as `self.run(inputs[i])`.
+        """
+        compiled_model = self.get_compiled()
+
+        # the whole batch is profiled as one run
+        if self.profiler is not None:
+            with self.profiler.start_run() as profile:
+                return compiled_model.run_batch(inputs, max_memory=max_memory,
+                                                profile=profile)
+
+        return compiled_model.run_batch(inputs, max_memory=max_memory)
+
+    def get_utilities(
+            self,
+            inputs: Union[Sequence[AttributeInput], 'pd.DataFrame'],
+            max_memory: int = MAX_MEMORY
+        ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Computes the utility of the inferred output for many inputs.
+
+        The unassigned belief mass of each output bounds its utility, see
+        `utility.get_utilities`.
+
+        Args:
+            inputs: Either a sequence of `AttributeInput` or a `pd.DataFrame`
+            with one column per antecedent in `self.U`.
+            max_memory: Memory budget (in bytes) for the intermediate arrays.
+
+        Returns:
+            expected_utility: Average of the utility bounds, shape (N,).
+            min_utility: Lower bound of the utility, shape (N,).
+            max_utility: Upper bound of the utility, shape (N,).
+        """
+        assert self.utilities is not None, 'utilities were not provided'
+
+        belief_degrees = self.run_batch(inputs, max_memory=max_memory)
+
+        return get_utilities(belief_degrees, self.utilities)
+
+    def rank(
+            self,
+            inputs: Union[Sequence[AttributeInput], 'pd.DataFrame'],
+            k: int,
+            by: str = 'expected',
+            max_memory: int = MAX_MEMORY
+        ) -> Tuple[np.ndarray, np.ndarray]:
+        """Ranks the inputs (alternatives) by the utility of their output.
+
+        Args:
+            inputs: Either a sequence of `AttributeInput` or a `pd.DataFrame`
+            with one column per antecedent in `self.U`.
+            k: Number of alternatives to return.
+            by: Utility used for the ranking, either 'expected', 'min' (i.e.,
+            pessimistic) or 'max' (i.e., optimistic).
+            max_memory: Memory budget (in bytes) for the intermediate arrays.
+
+        Returns:
+            positions: Positions, in `inputs`, of the `k` alternatives of
+            greatest utility, best first.
+            utilities: Their utility.
+        """
+        by_utilities = ['expected', 'min', 'max']
+        assert by in by_utilities
+
+        utilities = self.get_utilities(inputs, max_memory=max_memory)[
+            by_utilities.index(by)
+        ]
+        positions = top_k(utilities, k)
+
+        return positions, utilities[positions]
 
 def match_prefix(s: str, p: str):
     """Checks wether `p` is a prefix of `s`.
@@ -312,6 +1037,8 @@ def csv2BRB(
         consequents_prefix: str,
         deltas_prefix: str = None,
         thetas: str = None,
+        chunksize: int = 100000,
+        parse_disjunctive: bool = False
     ) -> RuleBaseModel:
     """Converts csv table to a belief rule base (RuleBaseModel).
 
@@ -336,14 +1063,18 @@ def csv2BRB(
         attributes for every rule.
         thetas: Column name of the rules weights. If `None` (default), will
         assign equal weight (1.0) to all rules.
+        chunksize: Maximum number of rows of the table read at once.
+        parse_disjunctive: If `True`, referential values such as '*' and
+        'l|m' are disjunctive ones (see `RuleBaseModel.parse_disjunctive`).
 
     Returns:
         model: Belief Rule Base containing all the rules defined in the csv
         file.
     """
-    df_rules = pd.read_csv(csv_filepath)
+    import pandas as pd  # pylint: disable=import-outside-toplevel
 
-    cols = df_rules.columns
+    # only the header is read upfront, the rules are read in chunks
+    cols = pd.read_csv(csv_filepath, nrows=0).columns
 
     antecedent_cols = list()
     consequent_cols = list()
@@ -357,8 +1088,14 @@ def csv2BRB(
             if match_prefix(col, deltas_prefix):
                 delta_cols.append(col)
 
-    model = RuleBaseModel(U=antecedent_cols, D=consequent_cols)
+    model = RuleBaseModel(U=antecedent_cols, D=consequent_cols,
+                          parse_disjunctive=parse_disjunctive)
+
+    # only valid if there are 1:1 weights to attributes
+    if len(delta_cols) != len(antecedent_cols):
+        delta_cols = None
 
-    model.add_rules_from_df(df_rules, thetas=thetas, delta_cols=delta_cols)
+    model.load_rules(csv_filepath, thetas=thetas, delta_cols=delta_cols,
+                     chunksize=chunksize)
 
     return model
@@ -0,0 +1,141 @@
+"""Cache of the inferred outputs for repeated inputs.
+
+Inputs are identified by a canonical, hashable form of their prepared values
+(see `AttributeInput.get_prepared` and `get_input_key`), so that inputs that
+the model sees as the same, e.g., '2' and 2, or distributions given in
+different orders, share their output.
+
+    Typical usage example:
+
+    >>> cache = model.enable_cache(max_size=1024)
+    >>> model.run(X)
+    >>> model.run(AttributeInput(dict(X.attr_input)))  # cached
+    >>> cache.stats()
+    {'hits': 1, 'misses': 1, 'evictions': 0, 'size': 1, 'max_size': 1024,
+     'hit_rate': 0.5}
+"""
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Tuple, Union
+
+from .attr_input import AttributeInput, INTERVAL, SET, DISTRIBUTION
+
+
+def _get_value_key(X_i: Any, kind: Union[str, None]) -> Hashable:
+    """Canonical form of a prepared value, given its kind.
+
+    Raises:
+        TypeError: If the value has no hashable form.
+    """
+    if kind == INTERVAL:
+        return tuple(tuple(component) for component in X_i)
+    elif kind == SET:
+        return frozenset(X_i)
+    elif kind == DISTRIBUTION:
+        items = [(_get_value_key(value, None), belief)
+                 for value, belief in X_i.items()]
+        # referential values of different types are not comparable
+        return tuple(sorted(items, key=repr))
+
+    hash(X_i)
+
+    return X_i
+
+def get_input_key(X: AttributeInput) -> Union[Tuple, None]:
+    """Canonical, hashable form of an input.
+
+    Returns:
+        key: Sorted (antecedent, kind, value) items of the prepared input
+        (see `AttributeInput.get_prepared`), `None` if any of its values has
+        no hashable form.
+    """
+    items = list()
+    for U_i in X.attr_input.keys():
+        X_i, kind = X.get_prepared(U_i)
+        try:
+            items.append((U_i, kind, _get_value_key(X_i, kind)))
+        except TypeError:
+            return None
+
+    return tuple(sorted(items, key=lambda item: item[0]))
+
+class ResultCache():
+    """Size-bounded cache with least recently used (LRU) eviction.
+
+    Entries are tied to a version of the model they were computed for (see
+    `RuleBaseModel.get_version`), and dropped when the version changes. A
+    cache is not thread-safe: concurrent runs must use different caches.
+
+    Attributes:
+        max_size: Maximum number of entries.
+        version: Version of the model that the entries were computed for.
+        hits: Number of lookups that found their entry.
+        misses: Number of lookups that did not.
+        evictions: Number of entries dropped to make room for others.
+    """
+    def __init__(self, max_size: int = 1024):
+        assert max_size > 0
+        self.max_size = max_size
+
+        self.version = None
+        self._entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        """Drops all the entries, keeping the statistics.
+        """
+        self._entries.clear()
+
+    def set_version(self, version: Hashable):
+        """Drops all the entries if they were computed for another version.
+        """
+        if version != self.version:
+            self._entries.clear()
+            self.version = version
+
+    def get(self, key: Hashable) -> Any:
+        """Returns the value of an entry, `None` if there is none.
+        """
+        try:
+            value = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+
+        return value
+
+    def put(self, key: Hashable, value: Any):
+        """Adds an entry, evicting the least recently used one if full.
+        """
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        """Returns the statistics of the cache.
+
+        Returns:
+            stats: Number of hits, misses, evictions, current and maximum
+            number of entries and ratio of lookups that hit.
+        """
+        lookups = self.hits + self.misses
+
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hit_rate': self.hits / lookups if lookups > 0 else 0.0,
+        }
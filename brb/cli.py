@@ -1,24 +1,102 @@
 #!/usr/bin/env python
 """Command-line interface for BRB model creation and execution.
 
+The rules are either defined in a csv file or given by a model snapshot
+directory (see `RuleBaseModel.save`).
+
 While setup is not ready, use it as:
     $ python -m brb.cli rules_file.csv
+
+to evaluate one input, given interactively, or as:
+    $ python -m brb.cli batch rules_file.csv inputs.csv -o results.jsonl
+
+to evaluate the inputs of a csv or JSON lines file (or of the standard
+input), in a streaming fashion.
 """
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Iterator, List, Tuple, Union
 
 import click
+import numpy as np
 
 from interval import interval, inf
 
-from .brb import csv2BRB
+from .brb import RuleBaseModel, csv2BRB
 from .attr_input import AttributeInput
+from .compiled import CompiledRuleBaseModel, MAX_MEMORY
+
+# input and output formats of the batch mode
+CSV = 'csv'
+JSONL = 'jsonl'
+
+# extensions of JSON lines files, any other is understood as csv
+JSONL_EXTENSIONS = ('.jsonl', '.ndjson', '.json')
+
+# number of chunks queued per worker, which bounds the memory in use
+QUEUED_CHUNKS = 2
+
+# compiled model of each worker process, see `_init_worker`
+_WORKER_MODEL = None
 
 
-@click.command()
-@click.argument('rules', type=click.Path(exists=True))
-@click.option('--antecedent-prefix', type=click.STRING, default='A_')
-@click.option('--consequent-prefix', type=click.STRING, default='D_')
-@click.option('--deltas-prefix', type=click.STRING, default=None)
-def main(rules, antecedent_prefix, consequent_prefix, deltas_prefix):
+class _DefaultGroup(click.Group):
+    """Group that runs `interactive` if no command is given.
+
+    Keeps the original usage, `brb.cli rules_file.csv`, working.
+    """
+    def parse_args(self, ctx, args):
+        if args and args[0] not in self.commands \
+                and not args[0].startswith('-'):
+            args = ['interactive'] + list(args)
+
+        return super().parse_args(ctx, args)
+
+def _model_options(func):
+    """Arguments and options that define the model.
+    """
+    func = click.option('--deltas-prefix', type=click.STRING,
+                        default=None)(func)
+    func = click.option('--consequent-prefix', type=click.STRING,
+                        default='D_')(func)
+    func = click.option('--antecedent-prefix', type=click.STRING,
+                        default='A_')(func)
+    func = click.argument('rules', type=click.Path(exists=True))(func)
+
+    return func
+
+def load_model(
+        rules: str,
+        antecedent_prefix: str = 'A_',
+        consequent_prefix: str = 'D_',
+        deltas_prefix: str = None
+    ) -> RuleBaseModel:
+    """Loads a model from a csv file (see `csv2BRB`) or a snapshot directory.
+    """
+    if os.path.isdir(rules):
+        return RuleBaseModel.load(rules)
+
+    return csv2BRB(
+        rules,
+        antecedents_prefix=antecedent_prefix,
+        consequents_prefix=consequent_prefix,
+        deltas_prefix=deltas_prefix
+    )
+
+@click.group(cls=_DefaultGroup)
+def main():
+    """Creates a BRB model from rules and evaluates inputs over it.
+    """
+
+@main.command()
+@_model_options
+def interactive(rules, antecedent_prefix, consequent_prefix, deltas_prefix):
     """Creates a BRB model from rules defined in a csv file.
 
     The script expects the csv file to have a header, below which each row must
@@ -30,12 +108,8 @@ def main(rules, antecedent_prefix, consequent_prefix, deltas_prefix):
     _main(rules, antecedent_prefix, consequent_prefix, deltas_prefix)
 
 def _main(rules, antecedent_prefix, consequent_prefix, deltas_prefix):
-    model = csv2BRB(
-        rules,
-        antecedents_prefix=antecedent_prefix,
-        consequents_prefix=consequent_prefix,
-        deltas_prefix=deltas_prefix
-    )
+    model = load_model(rules, antecedent_prefix, consequent_prefix,
+                       deltas_prefix)
     print('Model created')
 
     # TODO: print instructions
@@ -76,20 +150,410 @@ def _main(rules, antecedent_prefix, consequent_prefix, deltas_prefix):
 
     X = AttributeInput(attr_input)
 
-    belief_degrees = model.run(X)
+    # the activations are kept from the inference, not computed again
+    trace = model.run_trace(X)
 
     # Display rules and its activations with the results
     print('\nActivated Rules:')
 
-    matching_degrees = [rule.get_matching_degree(X) for rule in model.rules]
-
-    for rule, matching_degree in zip(model.rules, matching_degrees):
-        if matching_degree > 0:
-            print("[Matching Degree: {}] {}".format(matching_degree, rule))
+    rules, activation_weights = trace.get_rules_activations()
+    for k, activation_weight in zip(rules, activation_weights):
+        if activation_weight > 0:
+            print("[Activation Weight: {}] {}".format(activation_weight,
+                                                      model.rules[k]))
 
     print('\nResult:')
-    for D_j, beta_j in zip(model.D, belief_degrees):
+    for D_j, beta_j in zip(model.D, trace.belief_degrees):
         print('\t{}: {}'.format(D_j, beta_j))
 
+def _to_builtin(value: Any) -> Any:
+    """Converts NumPy scalars into JSON-serializable values.
+    """
+    return value.item() if isinstance(value, np.generic) else value
+
+def get_format(filename: str, given_format: str = None) -> str:
+    """Infers the format of a file from its extension, `CSV` by default.
+    """
+    if given_format is not None:
+        return given_format
+
+    if os.path.splitext(filename)[1].lower() in JSONL_EXTENSIONS:
+        return JSONL
+
+    return CSV
+
+def read_inputs(
+        f,
+        input_format: str,
+        U: List[str],
+        chunk_size: int,
+        id_column: str = None
+    ) -> Iterator[Tuple[List[Any], Any, Union[List[str], None]]]:
+    """Reads the inputs of a csv or JSON lines file, chunk by chunk.
+
+    Columns (or keys) that are not antecedents are ignored, besides the
+    inputs' identifiers. JSON lines that are not JSON objects are reported as
+    errors of their input, without interrupting the others.
+
+    Args:
+        f: Opened file.
+        input_format: Either `CSV` or `JSONL`.
+        U: Antecedents of the model.
+        chunk_size: Maximum number of inputs of each chunk.
+        id_column: Column (or key) of the inputs' identifiers.
+
+    Yields:
+        ids: Identifier of each input of the chunk, `None` if `id_column` is
+        not given.
+        inputs: Chunk of inputs, either a `pandas.DataFrame` (from csv) or a
+        list of `AttributeInput` (from JSON lines), `None` for the inputs that
+        could not be read.
+        errors: Error message of each input that could not be read, `None`
+        for the others. `None` if all of them were read.
+    """
+    if input_format == CSV:
+        import pandas as pd  # pylint: disable=import-outside-toplevel
+
+        for inputs in pd.read_csv(f, chunksize=chunk_size):
+            ids = [None] * inputs.shape[0] if id_column is None \
+                  else inputs[id_column].tolist()
+
+            yield ids, inputs, None
+
+        return
+
+    U_set = set(U)
+    n_line = 0
+    while True:
+        lines = list(islice(f, chunk_size))
+        if not lines:
+            break
+
+        ids = list()
+        inputs = list()
+        errors = list()
+        for line in lines:
+            n_line += 1
+            if not line.strip():
+                continue
+
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                record = 'line {}: invalid JSON ({})'.format(n_line, e)
+            else:
+                if not isinstance(record, dict):
+                    record = 'line {}: not a JSON object'.format(n_line)
+
+            if isinstance(record, str):  # error message
+                ids.append(None)
+                inputs.append(None)
+                errors.append(record)
+                continue
+
+            ids.append(record.get(id_column) if id_column is not None
+                       else None)
+            inputs.append(AttributeInput({U_i: X_i for U_i, X_i
+                                          in record.items() if U_i in U_set}))
+            errors.append(None)
+
+        yield ids, inputs, errors if any(errors) else None
+
+def _score(
+        compiled_model: CompiledRuleBaseModel,
+        inputs,
+        explain: int,
+        max_memory: int
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Evaluates a chunk of inputs, keeping the most activated rules.
+    """
+    n_inputs = len(inputs)
+    belief_degrees = np.empty((n_inputs, len(compiled_model.D)))
+    rules = np.full((n_inputs, explain), -1, dtype=np.int64)
+    rules_weights = np.zeros((n_inputs, explain))
+
+    for chunk, trace in compiled_model.iter_run_batch(inputs,
+                                                      max_memory=max_memory):
+        belief_degrees[chunk] = trace.belief_degrees
+
+        if explain > 0:
+            top_rules, top_weights = trace.get_top_rules(explain)
+
+            rules[chunk, :top_rules.shape[1]] = top_rules
+            rules_weights[chunk, :top_rules.shape[1]] = top_weights
+
+    return belief_degrees, rules, rules_weights
+
+def score_chunk(
+        compiled_model: CompiledRuleBaseModel,
+        inputs,
+        explain: int = 0,
+        max_memory: int = MAX_MEMORY,
+        read_errors: List[str] = None
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[str]]:
+    """Evaluates a chunk of inputs, isolating the ones that fail.
+
+    Args:
+        compiled_model: Model used for the inference.
+        inputs: Either a sequence of `AttributeInput` or a `pandas.DataFrame`
+        with one column per antecedent.
+        explain: Number of most activated rules kept for each input.
+        max_memory: Memory budget (in bytes) for the intermediate arrays.
+        read_errors: If not `None`, error message of each input that could
+        not be read (see `read_inputs`), which is not evaluated.
+
+    Returns:
+        belief_degrees: Resulting belief degrees, shape (N, |D|).
+        rules: Most activated rules of each input, most activated first,
+        shape (N, explain). Padded with -1 if there are less rules.
+        rules_weights: Activation weights of `rules`, shape (N, explain).
+        errors: Error message of each input, `None` if successful.
+    """
+    if read_errors is not None:
+        valid = [n for n, error in enumerate(read_errors) if error is None]
+        valid_results = score_chunk(compiled_model,
+                                    [inputs[n] for n in valid], explain,
+                                    max_memory)
+
+        belief_degrees = np.full((len(inputs), len(compiled_model.D)), np.nan)
+        rules = np.full((len(inputs), explain), -1, dtype=np.int64)
+        rules_weights = np.zeros((len(inputs), explain))
+        errors = list(read_errors)
+        belief_degrees[valid], rules[valid], rules_weights[valid] = \
+            valid_results[:3]
+        for n, error in zip(valid, valid_results[3]):
+            errors[n] = error
+
+        return belief_degrees, rules, rules_weights, errors
+
+    try:
+        return _score(compiled_model, inputs, explain, max_memory) \
+               + (len(inputs) * [None], )
+    except Exception:  # at least one bad input, evaluated one by one
+        pass
+
+    belief_degrees = np.full((len(inputs), len(compiled_model.D)), np.nan)
+    rules = np.full((len(inputs), explain), -1, dtype=np.int64)
+    rules_weights = np.zeros((len(inputs), explain))
+    errors = list()
+    for n in range(len(inputs)):
+        if hasattr(inputs, 'iloc'):  # pandas.DataFrame
+            X = inputs.iloc[[n]]
+        else:
+            X = [inputs[n]]
+
+        try:
+            belief_degrees[n], rules[n], rules_weights[n] = [
+                result[0] for result
+                in _score(compiled_model, X, explain, max_memory)
+            ]
+            errors.append(None)
+        except Exception as e:
+            errors.append(repr(e))
+
+    return belief_degrees, rules, rules_weights, errors
+
+def _init_worker(compiled_model: CompiledRuleBaseModel):
+    global _WORKER_MODEL  # pylint: disable=global-statement
+    _WORKER_MODEL = compiled_model
+
+def _score_chunk_worker(inputs, explain: int, max_memory: int,
+                        read_errors: List[str]):
+    return score_chunk(_WORKER_MODEL, inputs, explain, max_memory,
+                       read_errors)
+
+def score_chunks(
+        compiled_model: CompiledRuleBaseModel,
+        chunks: Iterator[Tuple[List[Any], Any]],
+        explain: int = 0,
+        max_memory: int = MAX_MEMORY,
+        workers: int = 1
+    ) -> Iterator[Tuple[List[Any], Tuple]]:
+    """Evaluates chunks of inputs, in order, over worker processes.
+
+    At most `QUEUED_CHUNKS` chunks per worker are read ahead, so memory is
+    bounded no matter the number of inputs.
+
+    Args:
+        compiled_model: Model used for the inference.
+        chunks: As yielded by `read_inputs`.
+        explain: Number of most activated rules kept for each input.
+        max_memory: Memory budget (in bytes) for the intermediate arrays of
+        each worker.
+        workers: Number of worker processes. If 1, the chunks are evaluated
+        in the current process.
+
+    Yields:
+        ids: Identifier of each input of the chunk.
+        results: As returned by `score_chunk`.
+    """
+    if workers <= 1:
+        for ids, inputs, read_errors in chunks:
+            yield ids, score_chunk(compiled_model, inputs, explain,
+                                   max_memory, read_errors)
+
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(compiled_model, )) as executor:
+        pending = deque()
+        for ids, inputs, read_errors in chunks:
+            pending.append((ids, executor.submit(_score_chunk_worker, inputs,
+                                                 explain, max_memory,
+                                                 read_errors)))
+
+            if len(pending) >= QUEUED_CHUNKS * workers:
+                ids, future = pending.popleft()
+                yield ids, future.result()
+
+        while pending:
+            ids, future = pending.popleft()
+            yield ids, future.result()
+
+class ResultsWriter():
+    """Writes the results of the batch mode as csv or JSON lines.
+
+    Csv rows have the input's identifier (if any), one column per consequent,
+    the activated rules (if any, as a JSON list of pairs of rule index and
+    activation weight) and the error message (if any). JSON lines have the
+    same content, under the 'id', 'belief_degrees', 'activated_rules' and
+    'error' keys.
+
+    Attributes:
+        f: Opened file.
+        output_format: Either `CSV` or `JSONL`.
+        D: Consequent referential values.
+        with_ids: Whether the inputs' identifiers are written.
+        explain: Whether the activated rules are written.
+    """
+    def __init__(
+            self,
+            f,
+            output_format: str,
+            D: List[Any],
+            with_ids: bool = False,
+            explain: bool = False
+        ):
+        self.f = f
+        self.output_format = output_format
+        self.D = [str(D_j) for D_j in D]
+        self.with_ids = with_ids
+        self.explain = explain
+
+        if output_format == CSV:
+            self._csv_writer = csv.writer(f)
+            self._csv_writer.writerow(
+                (['id'] if with_ids else []) + self.D
+                + (['activated_rules'] if explain else []) + ['error']
+            )
+
+    def write(
+            self,
+            ids: List[Any],
+            belief_degrees: np.ndarray,
+            rules: np.ndarray,
+            rules_weights: np.ndarray,
+            errors: List[str]
+        ):
+        """Writes the results of a chunk, as returned by `score_chunk`.
+        """
+        for n, error in enumerate(errors):
+            activated_rules = [
+                (int(k), float(weight)) for k, weight
+                in zip(rules[n], rules_weights[n]) if k >= 0 and weight > 0
+            ]
+
+            if self.output_format == CSV:
+                row = [_to_builtin(ids[n])] if self.with_ids else []
+                row += [''] * len(self.D) if error is not None \
+                       else belief_degrees[n].tolist()
+                if self.explain:
+                    row.append(json.dumps(activated_rules))
+                row.append('' if error is None else error)
+
+                self._csv_writer.writerow(row)
+                continue
+
+            record = dict()
+            if self.with_ids:
+                record['id'] = _to_builtin(ids[n])
+            if error is None:
+                record['belief_degrees'] = dict(zip(self.D,
+                                                    belief_degrees[n].tolist()))
+            else:
+                record['belief_degrees'] = None
+                record['error'] = error
+            if self.explain:
+                record['activated_rules'] = [
+                    {'rule': k, 'activation_weight': weight}
+                    for k, weight in activated_rules
+                ]
+
+            self.f.write(json.dumps(record) + '\n')
+
+@main.command()
+@_model_options
+@click.argument('inputs', type=click.File('r'), default='-')
+@click.option('-o', '--output', type=click.File('w'), default='-',
+              help='Output file, the standard output by default.')
+@click.option('--input-format', type=click.Choice([CSV, JSONL]),
+              default=None, help='Inferred from the extension by default.')
+@click.option('--output-format', type=click.Choice([CSV, JSONL]),
+              default=None, help='Inferred from the extension by default.')
+@click.option('--id-column', type=click.STRING, default=None,
+              help='Column (or key) of the inputs identifiers, written to the '
+                   'output.')
+@click.option('--explain', type=click.INT, default=0,
+              help='Number of most activated rules written for each input.')
+@click.option('--chunk-size', type=click.INT, default=10000,
+              help='Number of inputs read (and evaluated) at once.')
+@click.option('--workers', type=click.INT, default=1,
+              help='Number of worker processes.')
+@click.option('--max-memory', type=click.INT, default=MAX_MEMORY,
+              help='Memory budget (in bytes) for the intermediate arrays of '
+                   'each worker.')
+def batch(rules, antecedent_prefix, consequent_prefix, deltas_prefix, inputs,
+          output, input_format, output_format, id_column, explain, chunk_size,
+          workers, max_memory):
+    """Evaluates the inputs of a csv or JSON lines file.
+
+    Inputs are read from INPUTS (the standard input by default), one per row
+    (or line), with one column (or key) per antecedent, and processed in
+    chunks. Each result is written as a row (or line) of the output, in the
+    same order as the inputs. Inputs that cannot be evaluated are reported in
+    the 'error' column (or key), without interrupting the others.
+    """
+    assert chunk_size > 0 and workers > 0 and explain >= 0
+
+    model = load_model(rules, antecedent_prefix, consequent_prefix,
+                       deltas_prefix)
+    compiled_model = model.get_compiled()
+
+    input_format = get_format(inputs.name, input_format)
+    output_format = get_format(output.name, output_format)
+
+    writer = ResultsWriter(output, output_format, model.D,
+                           with_ids=id_column is not None,
+                           explain=explain > 0)
+
+    start = time.perf_counter()
+    n_inputs = 0
+    n_errors = 0
+    chunks = read_inputs(inputs, input_format, model.U, chunk_size,
+                         id_column=id_column)
+    for ids, results in score_chunks(compiled_model, chunks, explain=explain,
+                                     max_memory=max_memory, workers=workers):
+        writer.write(ids, *results)
+
+        n_inputs += len(ids)
+        n_errors += sum(error is not None for error in results[-1])
+
+    click.echo('Evaluated {} inputs ({} errors) in {:.2f} s'.format(
+        n_inputs, n_errors, time.perf_counter() - start
+    ), err=True)
+
+    if n_errors > 0 and n_errors == n_inputs:
+        sys.exit(1)
+
 if __name__ == "__main__":
     main()  # pylint: disable=no-value-for-parameter
@@ -0,0 +1,815 @@
+"""Array-based inference for belief rule bases.
+
+`RuleBaseModel.compile` freezes the rules of a model into dense NumPy arrays,
+so the matching degrees, activation weights and analytical ER algorithm of
+`RuleBaseModel.run` are computed as array operations instead of Python loops
+over the rules.
+
+    Typical usage example:
+
+    >>> compiled_model = model.compile()
+    >>> compiled_model.run(X)
+    >>> compiled_model.run_batch([X_1, X_2, X_3])
+"""
+from itertools import product
+from typing import List, Dict, Tuple, Any, Iterator
+
+import numpy as np
+
+from .attr_input import AttributeInput
+from .index import ReferentialValueIndex
+from .matching_degree import get_matching_degree, is_registered
+from .profiling import RunProfile
+from .rule import Rule
+from .trace import InferenceTrace
+
+# code of the rules whose matching degree function is not registered
+CALLABLE = -1
+
+# default memory budget (in bytes) for the intermediate arrays of the batch
+# inference
+MAX_MEMORY = 2 ** 28
+
+
+def _hashable(value: Any) -> Any:
+    """Returns a hashable version of a referential value.
+    """
+    if isinstance(value, set):
+        return frozenset(value)
+
+    return value
+
+class CompiledRuleBaseModel():
+    r"""Frozen, array-based version of a `RuleBaseModel`.
+
+    The antecedents' referential values are encoded as integer codes, so that
+    each distinct referential value is matched against the input only once per
+    query, no matter how many rules use it.
+
+    Attributes:
+        U: Antecedent attributes' names.
+        D: Consequent referential values.
+        A_refs: For each antecedent, list of the distinct referential values
+        (as in the rules' definition) used by the rules.
+        A_codes: Encoded antecedents' referential values, one row for each
+        rule of the expanded form of the rules, shape (K, |U|).
+        `A_codes[k, i]` indexes `A_refs[i]`, -1 meaning that the k-th row
+        does not refer to the i-th antecedent.
+        theta: \theta. Rules' weights, shape (R,).
+        beta: \bar{\beta}. Rules' belief degrees, shape (R, |D|).
+        delta: \delta. Attribute weights of the rules, shape (R, |U|).
+        Attributes not referred by a rule have weight 0.
+        matching_degrees: Names of the (registered) matching degree functions
+        used by the rules, see `matching_degree.register_matching_degree`.
+        matching_degree: Encoded matching degree function of each rule, shape
+        (R,). Indexes `matching_degrees`, `CALLABLE` meaning that the rule's
+        matching degree is a function that was not registered, which is called
+        once per row and per input.
+        log_space: Whether the analytical ER algorithm is computed in log
+        space (see `er.log_analytical_er`).
+        rules_ids: Rule that originated each row of `A_codes`, shape (K,).
+        Disjunctive rules (see `Rule.disjunctive`) are compiled into one row
+        for each rule of their expanded form. `None` if rows and rules are the
+        same. The parameters of the rules are not repeated over their rows,
+        but gathered when evaluated (see `get_rows_values`).
+        n_antecedents: Number of antecedents referred by each row, shape (K,).
+        used: Whether each antecedent is referred by at least one rule, shape
+        (|U|,).
+        n_rules: Number of compiled rules (R).
+    """
+    def __init__(
+            self,
+            U: List[str],
+            D: List[Any],
+            A_refs: List[List[Any]],
+            A_codes: np.ndarray,
+            theta: np.ndarray,
+            beta: np.ndarray,
+            delta: np.ndarray,
+            matching_degrees: List[str],
+            matching_degree: np.ndarray,
+            callables: dict = None,
+            log_space: bool = False,
+            rules_ids: np.ndarray = None,
+            n_antecedents: np.ndarray = None,
+            used: np.ndarray = None
+        ):
+        self.U = list(U)
+        self.D = list(D)
+
+        self.A_refs = A_refs
+        self.A_codes = A_codes
+        self.theta = theta
+        self.beta = beta
+        self.delta = delta
+        self.matching_degrees = matching_degrees
+        self.matching_degree = matching_degree
+
+        self.log_space = log_space
+
+        self.rules_ids = rules_ids
+        self.n_rules = theta.shape[0]
+
+        # rules with arbitrary matching degree functions are evaluated
+        # separately. Maps rule index to (function, delta, antecedents)
+        self._callables = dict() if callables is None else callables
+
+        # referential values are parsed only once, and indexed so that only
+        # the ones that may match an input are tested
+        self._A_refs_index = list()
+        for A_refs_i in A_refs:
+            A_refs_index_i = ReferentialValueIndex()
+            for A_i in A_refs_i:
+                A_refs_index_i.add(A_i)
+
+            self._A_refs_index.append(A_refs_index_i)
+
+        # `n_antecedents` and `used` may be given along with `A_codes` (e.g.,
+        # when loaded, see `snapshot`), so that they are not computed over all
+        # the rows
+        if n_antecedents is None:
+            n_antecedents = np.sum(A_codes >= 0, axis=1)
+
+            # otherwise, their completeness is undefined
+            assert np.all(n_antecedents > 0), \
+                'rules must refer to at least one antecedent'
+        self.n_antecedents = n_antecedents
+
+        if used is None:
+            used = np.any(A_codes >= 0, axis=0)
+        self.used = used
+
+    @classmethod
+    def from_rules(
+            cls,
+            U: List[str],
+            D: List[Any],
+            rules: List[Rule],
+            log_space: bool = False,
+            A: Dict[str, List[Any]] = None
+        ):
+        """Encodes `rules` into the arrays of a compiled model.
+
+        Disjunctive rules (see `Rule.disjunctive`) are encoded as their
+        expanded form, one row of `A_codes` for each combination of their
+        alternatives, while their parameters are encoded once.
+
+        Args:
+            U: Antecedent attributes' names.
+            D: Consequent referential values.
+            rules: Rules to be compiled, all of them must agree with `U` and
+            `D`.
+            log_space: Whether the analytical ER algorithm is computed in log
+            space.
+            A: Dictionary that contains all possible referential values for
+            the antecedents. Required if there are "don't care" antecedents.
+        """
+        n_expansions = [rule.get_n_expansions(A) for rule in rules]
+        n_rows = sum(n_expansions)
+        n_rules = len(rules)
+
+        A_refs = [list() for _ in U]
+        A_refs_codes = [dict() for _ in U]
+        A_codes = np.full((n_rows, len(U)), -1, dtype=np.int32)
+        rules_ids = np.repeat(np.arange(n_rules), n_expansions)
+
+        theta = np.empty(n_rules)
+        beta = np.zeros((n_rules, len(D)))
+        delta = np.zeros((n_rules, len(U)))
+        matching_degrees = list()
+        matching_degree = np.empty(n_rules, dtype=np.int16)
+        callables = dict()
+
+        start = 0
+        for k, rule in enumerate(rules):
+            # codes of the alternatives of each antecedent of the rule
+            rule_codes = list()
+            for i, U_i in enumerate(U):
+                if U_i not in rule.A_values.keys():
+                    continue
+
+                codes_i = list()
+                for A_i in rule.get_alternatives(U_i, A):
+                    A_i_key = _hashable(A_i)
+                    if A_i_key not in A_refs_codes[i].keys():
+                        A_refs_codes[i][A_i_key] = len(A_refs[i])
+                        A_refs[i].append(A_i)
+
+                    codes_i.append(A_refs_codes[i][A_i_key])
+
+                rule_codes.append((i, codes_i))
+
+            rows = slice(start, start + n_expansions[k])
+            start = rows.stop
+
+            # rows of the expanded form, in the order of `itertools.product`
+            if rule_codes:
+                U_idx = [i for i, _ in rule_codes]
+                A_codes[rows][:, U_idx] = np.array(
+                    list(product(*[codes_i for _, codes_i in rule_codes])),
+                    dtype=np.int32
+                ).reshape(-1, len(U_idx))
+
+            theta[k] = rule.theta
+            beta[k] = rule.beta
+
+            if is_registered(rule.matching_degree):
+                if rule.matching_degree not in matching_degrees:
+                    matching_degrees.append(rule.matching_degree)
+                matching_degree[k] = matching_degrees.index(
+                    rule.matching_degree
+                )
+            elif callable(rule.matching_degree):
+                matching_degree[k] = CALLABLE
+                callables[k] = (rule.matching_degree, rule.delta,
+                                list(rule.A_values.keys()))
+            else:
+                raise ValueError('Unknown matching degree `{}`'.format(
+                    rule.matching_degree
+                ))
+
+            for i, U_i in enumerate(U):
+                if U_i in rule.A_values.keys():
+                    delta[k, i] = rule.delta[U_i]
+
+        return cls(
+            U=U,
+            D=D,
+            A_refs=A_refs,
+            A_codes=A_codes,
+            theta=theta,
+            beta=beta,
+            delta=delta,
+            matching_degrees=matching_degrees,
+            matching_degree=matching_degree,
+            callables=callables,
+            log_space=log_space,
+            # otherwise, rows and rules are the same
+            rules_ids=rules_ids if any(n != 1 for n in n_expansions) else None
+        )
+
+    @classmethod
+    def concatenate(cls, compiled_models: List['CompiledRuleBaseModel']):
+        """Concatenates the rules of compiled models over the same `U` and `D`.
+
+        The referential values' codes of each model are remapped to the ones
+        of the concatenated model, without going through the rules.
+
+        Args:
+            compiled_models: Models to be concatenated, in order. Their rules
+            are indexed after the ones of the previous models.
+        """
+        assert len(compiled_models) > 0
+        first = compiled_models[0]
+
+        A_refs = [list() for _ in first.U]
+        A_refs_codes = [dict() for _ in first.U]
+        matching_degrees = list()
+
+        A_codes = list()
+        matching_degree = list()
+        rules_ids = list()
+        callables = dict()
+        n_rules = 0
+        for compiled_model in compiled_models:
+            assert compiled_model.U == first.U and compiled_model.D == first.D
+
+            model_A_codes = compiled_model.A_codes.copy()
+            for i, A_refs_i in enumerate(compiled_model.A_refs):
+                codes_map = np.empty(len(A_refs_i) + 1, dtype=np.int32)
+                codes_map[-1] = -1  # not referred
+                for j, A_i in enumerate(A_refs_i):
+                    A_i_key = _hashable(A_i)
+                    if A_i_key not in A_refs_codes[i].keys():
+                        A_refs_codes[i][A_i_key] = len(A_refs[i])
+                        A_refs[i].append(A_i)
+
+                    codes_map[j] = A_refs_codes[i][A_i_key]
+
+                model_A_codes[:, i] = codes_map[compiled_model.A_codes[:, i]]
+
+            codes_map = np.empty(len(compiled_model.matching_degrees) + 1,
+                                 dtype=np.int16)
+            codes_map[-1] = CALLABLE
+            for code, name in enumerate(compiled_model.matching_degrees):
+                if name not in matching_degrees:
+                    matching_degrees.append(name)
+                codes_map[code] = matching_degrees.index(name)
+
+            A_codes.append(model_A_codes)
+            matching_degree.append(codes_map[compiled_model.matching_degree])
+            rules_ids.append(compiled_model.get_rows_rules() + n_rules)
+            for k, func in compiled_model._callables.items():
+                callables[k + n_rules] = func
+
+            n_rules += compiled_model.n_rules
+
+        # otherwise, rows and rules are the same
+        rows_are_rules = all(compiled_model.rules_ids is None
+                             for compiled_model in compiled_models)
+
+        return cls(
+            U=first.U,
+            D=first.D,
+            A_refs=A_refs,
+            A_codes=np.concatenate(A_codes),
+            theta=np.concatenate([m.theta for m in compiled_models]),
+            beta=np.concatenate([m.beta for m in compiled_models]),
+            delta=np.concatenate([m.delta for m in compiled_models]),
+            matching_degrees=matching_degrees,
+            matching_degree=np.concatenate(matching_degree),
+            callables=callables,
+            log_space=first.log_space,
+            rules_ids=None if rows_are_rules else np.concatenate(rules_ids),
+            n_antecedents=np.concatenate([m.n_antecedents
+                                          for m in compiled_models]),
+            used=np.any([m.used for m in compiled_models], axis=0)
+        )
+
+    def __len__(self):
+        return self.n_rules
+
+    def assert_input(self, X: AttributeInput):
+        """Checks if `X` is proper.
+
+        Guarantees that the input only refers to the model's antecedents and
+        that every antecedent used by the rules is present.
+        """
+        for U_i in X.attr_input.keys():
+            assert U_i in self.U
+
+        for U_i, used_i in zip(self.U, self.used):
+            if used_i:
+                assert U_i in X.attr_input.keys()
+
+    def _get_inputs_columns(self, inputs) -> Tuple[int, Dict[str, list]]:
+        """Arranges the inputs as one column of values per antecedent.
+
+        Args:
+            inputs: Either a sequence of `AttributeInput` or a
+            `pandas.DataFrame` with one column per antecedent. Columns that are
+            not antecedents of the model are ignored.
+
+        Returns:
+            n_inputs: Number of inputs.
+            columns: Maps each antecedent given in the inputs to the list of
+            its values, as pairs of raw (as in `AttributeInput.attr_input`) and
+            prepared (see `AttributeInput.prep_referential_value`) values.
+            `None` means that the antecedent is not given for that input.
+        """
+        if hasattr(inputs, 'columns'):  # pandas.DataFrame
+            n_inputs = inputs.shape[0]
+
+            columns = dict()
+            for U_i in self.U:
+                if U_i not in inputs.columns:
+                    continue
+
+                # each distinct value is prepared only once
+                prepared = dict()
+                columns[U_i] = list()
+                for X_i in inputs[U_i]:
+                    try:
+                        _X_i = prepared[X_i]
+                    except KeyError:
+                        _X_i = AttributeInput.prep_referential_value(X_i)
+                        prepared[X_i] = _X_i
+                    except TypeError:  # unhashable
+                        _X_i = AttributeInput.prep_referential_value(X_i)
+
+                    columns[U_i].append((X_i, _X_i))
+
+            for U_i, used_i in zip(self.U, self.used):
+                if used_i:
+                    assert U_i in columns.keys()
+        else:
+            n_inputs = len(inputs)
+            columns = {U_i: n_inputs * [None, ] for U_i in self.U}
+            for n, X in enumerate(inputs):
+                self.assert_input(X)
+
+                for U_i, X_i in X.attr_input.items():
+                    columns[U_i][n] = (X_i, X[U_i])
+
+        return n_inputs, columns
+
+    def get_refs_matchings(
+            self,
+            inputs,
+            profile: RunProfile = None
+        ) -> Tuple[List[np.ndarray], np.ndarray]:
+        """Matches the inputs to the distinct referential values of the rules.
+
+        Each distinct input value is matched only once to each referential
+        value.
+
+        Args:
+            inputs: Either a sequence of `AttributeInput` or a
+            `pandas.DataFrame` with one column per antecedent.
+            profile: If not `None`, times the preparation of the inputs as
+            the 'parse' stage and their matching as the 'matching' one (see
+            `profiling`).
+
+        Returns:
+            refs_matchings: For each antecedent, matchings of the inputs to
+            each of the referential values in `A_refs`, shape
+            (N, len(A_refs[i]) + 1). The last column is always 0, to be used by
+            rules that do not refer to the antecedent. `None` for antecedents
+            not used by any rule.
+            attr_completeness: Completeness of each antecedent of each input,
+            shape (N, |U|).
+        """
+        n_inputs, columns = self._get_inputs_columns(inputs)
+
+        if profile is not None:
+            profile.lap('parse')
+
+        refs_matchings = list()
+        attr_completeness = np.zeros((n_inputs, len(self.U)))
+        for i, U_i in enumerate(self.U):
+            if U_i not in columns.keys():
+                refs_matchings.append(None)
+                continue
+
+            if self.used[i]:
+                refs_matchings_i = np.zeros((n_inputs, len(self.A_refs[i]) + 1))
+            else:
+                refs_matchings_i = None
+
+            # caches the results for the repeated input values
+            known_values = dict()
+            for n, X_i_values in enumerate(columns[U_i]):
+                if X_i_values is None:
+                    continue
+
+                X_i, _X_i = X_i_values
+                key = _hashable(_X_i)
+                try:
+                    m = known_values.get(key)
+                except TypeError:  # unhashable
+                    m = None
+
+                if m is None:
+                    m = self.match_refs(i, X_i, _X_i)
+
+                    try:
+                        known_values[key] = m
+                    except TypeError:
+                        pass
+
+                refs_matching_i, completeness_i = m
+
+                if refs_matchings_i is not None:
+                    refs_matchings_i[n, :-1] = refs_matching_i
+                attr_completeness[n, i] = completeness_i
+
+            refs_matchings.append(refs_matchings_i)
+
+        if profile is not None:
+            profile.lap('matching')
+
+        return refs_matchings, attr_completeness
+
+    def match_refs(
+            self,
+            i: int,
+            X_i: Any,
+            _X_i: Any
+        ) -> Tuple[np.ndarray, float]:
+        """Matches one input value to the referential values of an antecedent.
+
+        Args:
+            i: Index of the antecedent.
+            X_i: Raw input value.
+            _X_i: Prepared input value.
+
+        Returns:
+            refs_matching_i: Matching to each of the referential values in
+            `A_refs[i]`.
+            completeness_i: Completeness of the input value.
+        """
+        refs_matching_i = np.zeros(len(self.A_refs[i]))
+        for j, match in self._A_refs_index[i].match(_X_i, X_i):
+            refs_matching_i[j] = match
+
+        if isinstance(_X_i, dict):
+            completeness_i = sum(_X_i.values())
+        else:
+            completeness_i = 1.0
+
+        return refs_matching_i, completeness_i
+
+    def get_antecedent_rules(self, i: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Rules that refer to an antecedent.
+
+        Args:
+            i: Index of the antecedent.
+
+        Returns:
+            rules: Sorted rows of the rules that refer to the antecedent.
+            codes: Codes of their referential values (see `A_codes`).
+        """
+        rules = np.flatnonzero(self.A_codes[:, i] >= 0)
+
+        return rules, self.A_codes[rules, i]
+
+    def get_rows_values(
+            self,
+            values: np.ndarray,
+            rows: np.ndarray = None
+        ) -> np.ndarray:
+        """Gathers per-rule values (e.g., `theta`) for the rows of `A_codes`.
+
+        Args:
+            values: Values of each rule, shape (R, ...).
+            rows: If not `None`, the rows whose values are gathered, shape
+            (K',).
+
+        Returns:
+            rows_values: Values of each row, shape (K, ...), or (K', ...) if
+            `rows` is given. `values` itself if rows and rules are the same.
+        """
+        if self.rules_ids is None:
+            return values if rows is None else values[rows]
+
+        return values[self.rules_ids if rows is None else self.rules_ids[rows]]
+
+    def get_rows_rules(self) -> np.ndarray:
+        """Rule of each row of `A_codes` (see `rules_ids`), shape (K,).
+        """
+        if self.rules_ids is None:
+            return np.arange(self.A_codes.shape[0])
+
+        return self.rules_ids
+
+    def get_antecedents_matchings(
+            self,
+            refs_matchings: List[np.ndarray],
+            n_inputs: int
+        ) -> np.ndarray:
+        """Expands the referential values' matchings to the rules.
+
+        Args:
+            refs_matchings: As returned by `get_refs_matchings`.
+            n_inputs: Number of inputs (N).
+
+        Returns:
+            matchings: Matching of each antecedent of each rule, shape
+            (N, K, |U|). Antecedents not referred by a rule have matching 0.
+        """
+        matchings = np.zeros((n_inputs, ) + self.A_codes.shape)
+
+        for i, refs_matchings_i in enumerate(refs_matchings):
+            if refs_matchings_i is not None:
+                matchings[:, :, i] = refs_matchings_i[:, self.A_codes[:, i]]
+
+        return matchings
+
+    def get_matching_degrees(
+            self,
+            matchings: np.ndarray,
+            rows: np.ndarray = None
+        ) -> np.ndarray:
+        r"""Aggregates the antecedents' matchings into the rules' matching degree.
+
+        Args:
+            matchings: Antecedents' matchings, as returned by
+            `get_antecedents_matchings`.
+            rows: If not `None`, the rows that `matchings` refer to, shape
+            (K',), e.g., to update the matching degrees of some rules only.
+
+        Returns:
+            alphas: \alpha. Matching degree of each row for each input, shape
+            (N, K), or (N, K') if `rows` is given.
+        """
+        alphas = np.zeros(matchings.shape[:-1])
+
+        delta = self.get_rows_values(self.delta, rows)
+        matching_degree = self.get_rows_values(self.matching_degree, rows)
+
+        for code, name in enumerate(self.matching_degrees):
+            func = get_matching_degree(name)
+
+            if len(self.matching_degrees) == 1 and not self._callables:
+                # avoids copying the matchings
+                alphas = func(matchings, delta)
+                break
+
+            code_rows = np.flatnonzero(matching_degree == code)
+            alphas[:, code_rows] = func(matchings[:, code_rows],
+                                        delta[code_rows])
+
+        if self._callables:
+            rules = self.get_rows_rules()
+            if rows is not None:
+                rules = rules[rows]
+            for position in np.flatnonzero(matching_degree == CALLABLE):
+                func, delta_k, antecedents = \
+                    self._callables[int(rules[position])]
+
+                U_idx = [self.U.index(U_i) for U_i in antecedents]
+                for n, matchings_n in enumerate(matchings[:, position]):
+                    alphas_i = {U_i: matchings_n[i]
+                                for U_i, i in zip(antecedents, U_idx)}
+                    alphas[n, position] = func(delta_k, alphas_i)
+
+        return alphas
+
+    def get_completeness(self, attr_completeness: np.ndarray) -> np.ndarray:
+        """Returns input completeness over the antecedents of each rule.
+
+        See `AttributeInput.get_completeness`.
+
+        Args:
+            attr_completeness: As returned by `get_refs_matchings`.
+
+        Returns:
+            completeness: Completeness of each input over each rule, shape
+            (N, K).
+        """
+        return (attr_completeness @ (self.A_codes >= 0).T) \
+               / self.n_antecedents
+
+    def get_chunk_size(self, max_memory: int) -> int:
+        """Number of inputs whose intermediate arrays fit into `max_memory`.
+        """
+        n_rules, n_antecedents = self.A_codes.shape
+
+        # matchings (and their weighted version), belief degrees (and the ER
+        # factors) and a few (N, K) arrays
+        input_size = np.dtype(float).itemsize * max(n_rules, 1) * (
+            2 * n_antecedents + 2 * len(self.D) + 4
+        )
+
+        return max(1, int(max_memory // input_size))
+
+    def get_weighted_matchings(
+            self,
+            refs_matchings: List[np.ndarray],
+            attr_completeness: np.ndarray
+        ) -> Tuple[np.ndarray, np.ndarray]:
+        r"""Computes the rules' weighted matching degrees and belief degrees.
+
+        Args:
+            refs_matchings: As returned by `get_refs_matchings`.
+            attr_completeness: As returned by `get_refs_matchings`.
+
+        Returns:
+            theta_alphas: \theta \alpha. Matching degrees weighted by the
+            rules' weights, shape (N, K), i.e., the unnormalized activation
+            weights.
+            belief_degrees: Belief degrees of the rules normalized for the
+            inputs' completeness, shape (N, K, |D|).
+        """
+        # 2. matching degree
+        matchings = self.get_antecedents_matchings(
+            refs_matchings,
+            attr_completeness.shape[0]
+        )
+        alphas = self.get_matching_degrees(matchings)
+
+        # 4. degrees of belief
+        belief_degrees = self.get_rows_values(self.beta) \
+                         * self.get_completeness(attr_completeness)[..., np.newaxis]
+
+        return self.get_rows_values(self.theta) * alphas, belief_degrees
+
+    def _run_chunk(
+            self,
+            refs_matchings: List[np.ndarray],
+            attr_completeness: np.ndarray,
+            profile: RunProfile = None
+        ) -> InferenceTrace:
+        """Runs the inference for a chunk of inputs.
+
+        Times its stages if `profile` is given, as `RuleBaseModel.run`.
+        """
+        # 2. matching degree
+        matchings = self.get_antecedents_matchings(
+            refs_matchings,
+            attr_completeness.shape[0]
+        )
+        alphas = self.get_matching_degrees(matchings)
+        del matchings
+
+        if profile is not None:
+            profile.count('rules_evaluated', alphas.size)
+            profile.count('rules_activated', int(np.count_nonzero(alphas)))
+            profile.lap('matching')
+
+        # 3. activation weight
+        theta_alphas = self.get_rows_values(self.theta) * alphas
+        total_theta_alpha = np.sum(theta_alphas, axis=-1, keepdims=True)
+        total_theta_alpha[total_theta_alpha == 0] = 1
+
+        activation_weights = theta_alphas / total_theta_alpha
+
+        if profile is not None:
+            profile.lap('activation')
+
+        # 4. and 5. degrees of belief and analytical ER algorithm
+        trace = InferenceTrace(
+            self.D,
+            self.get_rows_rules(),
+            matching_degrees=alphas,
+            activation_weights=activation_weights,
+            completeness=self.get_completeness(attr_completeness),
+            beta=self.get_rows_values(self.beta),
+            log_space=self.log_space
+        )
+
+        if profile is not None:
+            profile.lap('er')
+
+        return trace
+
+    def trace(self, inputs) -> InferenceTrace:
+        """Infer the output for many inputs, keeping the intermediates.
+
+        Unlike `run_batch`, the inputs are processed at once, thus the
+        intermediate arrays grow with the number of inputs times the number of
+        rows (see `iter_run_batch` for chunked traces).
+
+        Args:
+            inputs: Either a sequence of `AttributeInput` or a
+            `pandas.DataFrame` with one column per antecedent.
+
+        Returns:
+            trace: Belief degrees and intermediates, with the inputs as
+            leading dimension.
+        """
+        return self._run_chunk(*self.get_refs_matchings(inputs))
+
+    def run(self, X: AttributeInput) -> List[float]:
+        """Infer the output based on the RIMER approach.
+
+        Same as `RuleBaseModel.run`, but computed over the compiled arrays.
+
+        Args:
+            X: Attribute's data to be fed to the rules.
+        """
+        return list(self.run_batch([X])[0])
+
+    def iter_run_batch(
+            self,
+            inputs,
+            max_memory: int = MAX_MEMORY,
+            profile: RunProfile = None
+        ) -> Iterator[Tuple[slice, InferenceTrace]]:
+        """Infer the output for many inputs, chunk by chunk.
+
+        The inputs are processed in chunks, so that the intermediate arrays,
+        whose size grow with the number of inputs times the number of rules,
+        do not exceed `max_memory`.
+
+        Args:
+            inputs: Either a sequence of `AttributeInput` or a
+            `pandas.DataFrame` with one column per antecedent.
+            max_memory: Memory budget (in bytes) for the intermediate arrays.
+            profile: If not `None`, the stages of all the chunks are timed on
+            it, as the stages of `RuleBaseModel.run` (see `profiling`).
+
+        Yields:
+            chunk: Positions of the chunk's inputs.
+            trace: Belief degrees and intermediates of the chunk's inputs.
+        """
+        refs_matchings, attr_completeness = self.get_refs_matchings(inputs,
+                                                                    profile)
+
+        n_inputs = attr_completeness.shape[0]
+        chunk_size = self.get_chunk_size(max_memory)
+
+        for start in range(0, n_inputs, chunk_size):
+            chunk = slice(start, min(start + chunk_size, n_inputs))
+
+            yield chunk, self._run_chunk(
+                [None if refs_matchings_i is None else refs_matchings_i[chunk]
+                 for refs_matchings_i in refs_matchings],
+                attr_completeness[chunk],
+                profile
+            )
+
+    def run_batch(
+            self,
+            inputs,
+            max_memory: int = MAX_MEMORY,
+            profile: RunProfile = None
+        ) -> np.ndarray:
+        """Infer the output for many inputs at once.
+
+        See `iter_run_batch`.
+
+        Args:
+            inputs: Either a sequence of `AttributeInput` or a
+            `pandas.DataFrame` with one column per antecedent.
+            max_memory: Memory budget (in bytes) for the intermediate arrays.
+            profile: If not `None`, times the stages, see `iter_run_batch`.
+
+        Returns:
+            belief_degrees: Resulting belief degrees, shape (N, |D|).
+        """
+        belief_degrees = np.empty((len(inputs), len(self.D)))
+        for chunk, trace in self.iter_run_batch(inputs, max_memory, profile):
+            belief_degrees[chunk] = trace.belief_degrees
+
+        return belief_degrees
@@ -0,0 +1,306 @@
+"""Analytical Evidential Reasoning (ER) algorithm.
+
+Combines the belief degrees of the activated rules into the output belief
+degrees. Two modes are provided: the direct evaluation of the products of the
+analytical ER algorithm, and an equivalent log-space formulation that is safe
+for rule bases with a very large number of (weakly) activated rules, where the
+direct products underflow or cancel out.
+"""
+from typing import Sequence, Tuple
+
+import numpy as np
+
+
+def analytical_er(
+        activation_weights: np.ndarray,
+        belief_degrees: np.ndarray,
+        log_space: bool = False
+    ) -> np.ndarray:
+    r"""Combines the rules through the analytical ER algorithm.
+
+    Implementation based on eq. (4) of "Inference and learning methodology of
+    belief-rule-based expert system for pipeline leak detection" by _Xu et
+    al._, broadcasted over the leading dimensions.
+
+    Args:
+        activation_weights: w. Activation weights of the rules, shape
+        (..., K).
+        belief_degrees: \beta. Belief degrees of the rules, already
+        normalized for the input completeness, shape (..., K, |D|).
+        log_space: If `True`, the products are accumulated in log space (see
+        `log_analytical_er`).
+
+    Returns:
+        belief_degrees: Combined belief degrees, shape (..., |D|).
+    """
+    partials = er_partials(activation_weights, belief_degrees,
+                           log_space=log_space)
+
+    return combine_er_partials(partials, log_space=log_space)
+
+def log_analytical_er(
+        activation_weights: np.ndarray,
+        belief_degrees: np.ndarray
+    ) -> np.ndarray:
+    r"""Analytical ER algorithm accumulated in log space.
+
+    Writing L_j, R and P for the productories of eq. (4) (`left_prods`,
+    `right_prod` and the product of 1 - w_k), and dividing both numerator and
+    denominator by R, the combined belief degrees become
+
+        \beta_j = expm1(a_j) / (\sum_j expm1(a_j) - expm1(-c)),
+
+    in which a_j = log(L_j / R) = \sum_k log1p(w_k \beta_kj / (1 - w_k \beta_k))
+    and c = log(R / P) = \sum_k log1p(-w_k \beta_k) - log1p(-w_k), being
+    \beta_k the total belief degree of the k-th rule. Both are sums of one term
+    per rule, thus they neither underflow nor cancel out, no matter the number
+    of rules.
+
+    Args:
+        activation_weights: w. Activation weights of the rules, shape
+        (..., K).
+        belief_degrees: \beta. Belief degrees of the rules, already
+        normalized for the input completeness, shape (..., K, |D|).
+
+    Returns:
+        belief_degrees: Combined belief degrees, shape (..., |D|).
+    """
+    return analytical_er(activation_weights, belief_degrees, log_space=True)
+
+def er_partials(
+        activation_weights: np.ndarray,
+        belief_degrees: np.ndarray,
+        log_space: bool = False
+    ) -> Tuple[np.ndarray, ...]:
+    r"""Per-rule aggregates of the analytical ER algorithm.
+
+    The analytical ER algorithm only depends on the rules through products
+    (or, in log space, sums) of one factor per rule. Thus, the rules can be
+    split into disjoint groups whose partials are merged (see
+    `merge_er_partials`) into the partials of the whole rule base.
+
+    Args:
+        activation_weights: w. Activation weights of the rules, shape
+        (..., K). Must be normalized over the whole rule base, not only over
+        these rules.
+        belief_degrees: \beta. Belief degrees of the rules, already
+        normalized for the input completeness, shape (..., K, |D|).
+        log_space: Whether the partials are accumulated in log space.
+
+    Returns:
+        partials: `left_prods` (..., |D|), `right_prod` (...) and
+        `complement_prod` (...), i.e., L_j, R and P. In log space, also a
+        (..., |D|), c (...) and whether any rule saturates (...), see
+        `log_analytical_er`.
+    """
+    weighted_total_belief_degrees = activation_weights \
+                                    * np.sum(belief_degrees, axis=-1)
+
+    # left_prods is the productory that appears both in the left-side
+    # of the numerator of eq. (4) and in \mu. Note that this depends on j
+    left_prods = np.prod(
+        activation_weights[..., np.newaxis] * belief_degrees + 1 \
+        - weighted_total_belief_degrees[..., np.newaxis],
+        axis=-2
+    )
+    # the productory that appears in the right side of the numerator of
+    # eq. (4) and in \mu
+    right_prod = np.prod(1 - weighted_total_belief_degrees, axis=-1)
+    complement_prod = np.prod(1 - activation_weights, axis=-1)
+
+    if not log_space:
+        return left_prods, right_prod, complement_prod
+
+    # a rule that is fully activated and complete makes R and P vanish. Its
+    # belief degrees are the result, which the direct evaluation handles.
+    saturated = np.any(weighted_total_belief_degrees >= 1, axis=-1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        a = np.sum(np.log1p(
+            activation_weights[..., np.newaxis] * belief_degrees \
+            / (1 - weighted_total_belief_degrees[..., np.newaxis])
+        ), axis=-2)
+        # a fully activated rule makes P vanish, i.e., c = inf
+        c = np.sum(
+            np.log1p(-weighted_total_belief_degrees) \
+            - np.log1p(-activation_weights),
+            axis=-1
+        )
+
+    return left_prods, right_prod, complement_prod, a, c, saturated
+
+def merge_er_partials(
+        partials: Sequence[Tuple[np.ndarray, ...]],
+        log_space: bool = False
+    ) -> Tuple[np.ndarray, ...]:
+    """Merges the partials of disjoint groups of rules.
+
+    Args:
+        partials: Partials of each group, as returned by `er_partials`.
+        log_space: Whether the partials are accumulated in log space.
+
+    Returns:
+        partials: Partials of the union of the groups.
+    """
+    left_prods, right_prod, complement_prod = [
+        np.prod(np.stack(partial), axis=0)
+        for partial in list(zip(*partials))[:3]
+    ]
+
+    if not log_space:
+        return left_prods, right_prod, complement_prod
+
+    a, c, saturated = list(zip(*partials))[3:]
+
+    return (left_prods, right_prod, complement_prod, np.sum(a, axis=0),
+            np.sum(c, axis=0), np.any(saturated, axis=0))
+
+def combine_er_partials(
+        partials: Tuple[np.ndarray, ...],
+        log_space: bool = False
+    ) -> np.ndarray:
+    """Computes the combined belief degrees from the partials of the rules.
+
+    Args:
+        partials: Partials of the whole rule base, as returned by
+        `er_partials` or `merge_er_partials`.
+        log_space: Whether the partials are accumulated in log space.
+
+    Returns:
+        belief_degrees: Combined belief degrees, shape (..., |D|).
+    """
+    left_prods, right_prod, complement_prod = partials[:3]
+    n_consequents = left_prods.shape[-1]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mu = 1 / (np.sum(left_prods, axis=-1) - (n_consequents - 1) * right_prod)
+
+        unnorm_belief_degrees = mu[..., np.newaxis] \
+                                * (left_prods - right_prod[..., np.newaxis])
+        combined_belief_degrees = unnorm_belief_degrees / (
+            1 - mu * complement_prod
+        )[..., np.newaxis]
+
+    # handles the case where there is 0 certainty, i.e., completely 0 input
+    zero_certainty = np.all(np.isnan(combined_belief_degrees), axis=-1)
+    combined_belief_degrees[zero_certainty] = \
+        unnorm_belief_degrees[zero_certainty]
+
+    if not log_space:
+        return combined_belief_degrees
+
+    a, c, saturated = partials[3:]
+
+    # for large a_j, both numerator and denominator are scaled by exp(-a_max)
+    # to avoid overflowing
+    with np.errstate(invalid='ignore', over='ignore'):
+        a_max = np.max(a, axis=-1, keepdims=True, initial=0.0)
+        scaled = a_max > 1
+        scale = np.where(scaled, np.exp(-a_max), 1.0)
+
+        numerators = np.where(scaled, np.exp(a - a_max) - scale, np.expm1(a))
+        denominator = np.sum(numerators, axis=-1) - np.expm1(-c) * scale[..., 0]
+
+        # 0 certainty, i.e., completely 0 input (or no rule activated),
+        # results in 0 belief degrees.
+        denominator = np.where(denominator == 0, 1.0, denominator)
+
+        log_belief_degrees = numerators / denominator[..., np.newaxis]
+
+    return np.where(saturated[..., np.newaxis], combined_belief_degrees,
+                    log_belief_degrees)
+
+def _exclusive_prods(x: np.ndarray) -> np.ndarray:
+    """Product of all the other elements along the last axis.
+
+    Computed from the cumulative products, so that it is defined even if
+    some elements are 0.
+    """
+    left = np.ones_like(x)
+    left[..., 1:] = np.cumprod(x[..., :-1], axis=-1)
+
+    right = np.ones_like(x)
+    right[..., :-1] = np.cumprod(x[..., :0:-1], axis=-1)[..., ::-1]
+
+    return left * right
+
+def analytical_er_gradients(
+        activation_weights: np.ndarray,
+        belief_degrees: np.ndarray,
+        grad_output: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+    r"""Backpropagates a gradient through the analytical ER algorithm.
+
+    Writing the combined belief degrees as
+    \beta_j = (L_j - R) / (\sum_i L_i - (|D| - 1) R - P) (see
+    `log_analytical_er`), the gradients follow from the ones of the
+    productories, which are products of the other rules' factors. Inputs of 0
+    certainty (0 denominator) have 0 gradient.
+
+    Args:
+        activation_weights: w. Activation weights of the rules, shape
+        (..., K).
+        belief_degrees: \beta. Belief degrees of the rules, already
+        normalized for the input completeness, shape (..., K, |D|).
+        grad_output: Gradient of the loss w.r.t. the combined belief degrees,
+        shape (..., |D|).
+
+    Returns:
+        grad_activation_weights: Gradient of the loss w.r.t. the activation
+        weights, shape (..., K).
+        grad_belief_degrees: Gradient of the loss w.r.t. the belief degrees
+        of the rules, shape (..., K, |D|).
+    """
+    n_consequents = belief_degrees.shape[-1]
+
+    w = activation_weights
+    total_belief_degrees = np.sum(belief_degrees, axis=-1)
+
+    # factors of L_j, R and P
+    left_factors = w[..., np.newaxis] * belief_degrees + 1 \
+                   - (w * total_belief_degrees)[..., np.newaxis]
+    right_factors = 1 - w * total_belief_degrees
+    complement_factors = 1 - w
+
+    left_prods = np.prod(left_factors, axis=-2)
+    right_prod = np.prod(right_factors, axis=-1)
+    complement_prod = np.prod(complement_factors, axis=-1)
+
+    denominator = np.sum(left_prods, axis=-1) \
+                  - (n_consequents - 1) * right_prod - complement_prod
+    zero_certainty = denominator == 0
+    denominator = np.where(zero_certainty, 1.0, denominator)
+
+    combined_belief_degrees = (left_prods - right_prod[..., np.newaxis]) \
+                              / denominator[..., np.newaxis]
+
+    grad_output = np.where(zero_certainty[..., np.newaxis], 0.0, grad_output)
+    grad_y = np.sum(grad_output * combined_belief_degrees, axis=-1)
+
+    grad_left_prods = (grad_output - grad_y[..., np.newaxis]) \
+                      / denominator[..., np.newaxis]
+    grad_right_prod = ((n_consequents - 1) * grad_y \
+                       - np.sum(grad_output, axis=-1)) / denominator
+    grad_complement_prod = grad_y / denominator
+
+    # gradients w.r.t. each factor, (..., K, |D|) and (..., K)
+    grad_left_factors = grad_left_prods[..., np.newaxis, :] * np.swapaxes(
+        _exclusive_prods(np.swapaxes(left_factors, -1, -2)), -1, -2
+    )
+    grad_right_factors = grad_right_prod[..., np.newaxis] \
+                         * _exclusive_prods(right_factors)
+    grad_complement_factors = grad_complement_prod[..., np.newaxis] \
+                              * _exclusive_prods(complement_factors)
+
+    total_grad_left_factors = np.sum(grad_left_factors, axis=-1)
+
+    grad_activation_weights = np.sum(grad_left_factors * belief_degrees,
+                                     axis=-1) \
+        - total_belief_degrees * (total_grad_left_factors + grad_right_factors) \
+        - grad_complement_factors
+    grad_belief_degrees = w[..., np.newaxis] * (
+        grad_left_factors
+        - (total_grad_left_factors + grad_right_factors)[..., np.newaxis]
+    )
+
+    return grad_activation_weights, grad_belief_degrees
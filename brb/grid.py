@@ -0,0 +1,72 @@
+"""Lazy generation of the full grid of antecedents' combinations.
+
+The grid of a rule base has one row per combination of the antecedents'
+referential values, i.e., the Cartesian product of the referential values.
+Rows are identified by their position in the grid, which is decoded into the
+referential values as a mixed-radix number, so that any chunk of rows can be
+generated without generating the previous ones.
+"""
+from typing import Any, Iterator, List, Sequence
+
+import numpy as np
+
+
+def get_grid_size(A: List[Sequence[Any]]) -> int:
+    """Number of rows of the grid over the referential values `A`.
+    """
+    size = 1
+    for A_i in A:
+        size *= len(A_i)
+
+    return size
+
+def get_grid_rows(
+        A: List[Sequence[Any]],
+        start: int,
+        stop: int
+    ) -> np.ndarray:
+    """Generates the rows of the grid in [`start`, `stop`).
+
+    The last antecedent varies the fastest, as in `itertools.product`.
+
+    Args:
+        A: Referential values of each antecedent.
+        start: Position of the first row.
+        stop: Position after the last row.
+
+    Returns:
+        rows: Referential values of each row, shape (stop - start, |A|).
+    """
+    positions = np.arange(start, stop, dtype=np.int64)
+
+    rows = np.empty((len(positions), len(A)), dtype=object)
+    for i in reversed(range(len(A))):
+        radix = len(A[i])
+
+        A_i = np.empty(radix, dtype=object)
+        A_i[:] = list(A[i])
+
+        rows[:, i] = A_i[positions % radix]
+        positions = positions // radix
+
+    return rows
+
+def iter_grid(
+        A: List[Sequence[Any]],
+        chunk_size: int = 10000
+    ) -> Iterator[np.ndarray]:
+    """Iterates over the rows of the grid, `chunk_size` rows at a time.
+
+    Args:
+        A: Referential values of each antecedent.
+        chunk_size: Maximum number of rows of each chunk.
+
+    Yields:
+        rows: Referential values of each row of the chunk, see
+        `get_grid_rows`.
+    """
+    assert chunk_size > 0
+
+    size = get_grid_size(A)
+    for start in range(0, size, chunk_size):
+        yield get_grid_rows(A, start, min(start + chunk_size, size))
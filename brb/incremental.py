@@ -0,0 +1,253 @@
+r"""Incremental inference for inputs that change a few attributes at a time.
+
+Consecutive inputs of monitoring or interactive what-if tools differ in one or
+two attributes. An `IncrementalEvaluator` keeps the intermediates of the
+previous query over the compiled model (see `RuleBaseModel.compile`): the
+matchings of the input to each referential value, the matching of each
+antecedent of each rule and the rules' matching degrees and completeness.
+Given a new input, only the changed attributes are matched again, and only the
+rules that refer to them are updated.
+
+The activation weights are normalized over all the rules, thus the
+activation weights and the analytical ER algorithm are computed again for all
+the rules, as array operations over the cached \alpha.
+
+    Typical usage example:
+
+    >>> evaluator = IncrementalEvaluator(model)
+    >>> evaluator.run(X)
+    >>> evaluator.update({'A_1': 3})  # same as X, but for A_1
+    >>> evaluator.n_updated  # rules whose matching degree was updated
+    12
+"""
+from typing import Any, Dict, List, Tuple, Union, TYPE_CHECKING
+
+import numpy as np
+
+from .attr_input import AttributeInput
+from .compiled import CompiledRuleBaseModel
+from .trace import InferenceTrace
+
+if TYPE_CHECKING:
+    from .brb import RuleBaseModel
+
+
+def _is_same(X_i: Any, other_X_i: Any) -> bool:
+    """Whether two raw input values are known to be the same.
+    """
+    if X_i is other_X_i:
+        return True
+
+    try:
+        return type(X_i) is type(other_X_i) and bool(X_i == other_X_i)
+    except (TypeError, ValueError):
+        return False
+
+class IncrementalEvaluator():
+    """Stateful inference that reuses the intermediates of the last query.
+
+    The results are the same as `RuleBaseModel.run`, up to floating point
+    rounding. Changed attributes are found by comparing the values of the
+    input to the ones of the last input, thus values must not be modified in
+    place, e.g., the beliefs of a distribution. If the evaluator is created
+    from a `RuleBaseModel`, changes of its rules (see
+    `RuleBaseModel.get_version`) are noticed, and the next query is computed
+    from scratch over the compiled new rules.
+
+    Attributes:
+        model: Model evaluated, either a `RuleBaseModel` or a
+        `CompiledRuleBaseModel`.
+        X: Last input, `None` before the first query.
+        trace: Intermediates of the last query, `None` before the first one.
+        n_updated: Number of rules (rows of the compiled model) whose
+        matching degree was computed by the last query.
+    """
+    def __init__(self, model: Union['RuleBaseModel', CompiledRuleBaseModel]):
+        self.model = model
+
+        self.reset()
+
+    def reset(self):
+        """Drops the intermediates, thus the next query is computed in full.
+        """
+        self.X = None
+        self.trace = None
+        self.n_updated = 0
+
+        self._compiled = None
+        self._version = None
+
+        # intermediates of the last query, for a single input (see
+        # `CompiledRuleBaseModel.get_refs_matchings`), and its values
+        self._attr_input = None
+        self._refs_matchings = None
+        self._attr_completeness = None
+        self._matchings = None
+        self._alphas = None
+        self._completeness = None
+
+        # i => rules that refer to the i-th antecedent and their codes
+        self._antecedent_rules = dict()
+
+    def _get_compiled(self) -> CompiledRuleBaseModel:
+        """Returns the compiled model, resetting the state if outdated.
+        """
+        if isinstance(self.model, CompiledRuleBaseModel):
+            if self._compiled is None:
+                self._compiled = self.model
+        else:
+            version = self.model.get_version()
+            if self._compiled is None or version != self._version:
+                self.reset()
+                self._compiled = self.model.get_compiled()
+                self._version = version
+
+        return self._compiled
+
+    def run(self, X: AttributeInput) -> List[float]:
+        """Infer the output, updating the intermediates of the last query.
+
+        Args:
+            X: Attribute's data to be fed to the rules.
+
+        Returns:
+            belief_degrees: Resulting belief degrees, as `RuleBaseModel.run`.
+        """
+        compiled_model = self._get_compiled()
+        compiled_model.assert_input(X)
+
+        if self.X is None:
+            self._run_full(compiled_model, X)
+        else:
+            changed = [
+                i for i, U_i in enumerate(compiled_model.U)
+                if (U_i in X.attr_input) != (U_i in self._attr_input)
+                or U_i in X.attr_input
+                and not _is_same(X.attr_input[U_i], self._attr_input[U_i])
+            ]
+            self._run_changed(compiled_model, X, changed)
+
+        self.X = X
+        self._attr_input = dict(X.attr_input)
+        self.trace = self._get_trace(compiled_model)
+
+        return list(self.trace.belief_degrees[0])
+
+    def update(self, attr_values: Dict[str, Any]) -> List[float]:
+        """Infer the output for the last input with some attributes changed.
+
+        Args:
+            attr_values: New values of the changed attributes. A value of
+            `None` removes the attribute from the input.
+
+        Returns:
+            belief_degrees: Resulting belief degrees, as `RuleBaseModel.run`.
+        """
+        assert self.X is not None, 'there is no previous query'
+
+        # the unchanged attributes are not prepared again
+        X = self.X.copy()
+        for U_i, X_i in attr_values.items():
+            X.set_value(U_i, X_i)
+
+        return self.run(X)
+
+    def _run_full(self, compiled_model: CompiledRuleBaseModel,
+                  X: AttributeInput):
+        """Computes the intermediates of a query from scratch.
+        """
+        refs_matchings, attr_completeness = \
+            compiled_model.get_refs_matchings([X])
+
+        self._refs_matchings = refs_matchings
+        self._attr_completeness = attr_completeness
+        self._matchings = compiled_model.get_antecedents_matchings(
+            refs_matchings, 1
+        )
+        self._alphas = compiled_model.get_matching_degrees(self._matchings)
+        self._completeness = compiled_model.get_completeness(attr_completeness)
+
+        self.n_updated = len(compiled_model)
+
+    def _get_antecedent_rules(self, compiled_model: CompiledRuleBaseModel,
+                              i: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Rules that refer to the i-th antecedent, and their codes.
+        """
+        try:
+            return self._antecedent_rules[i]
+        except KeyError:
+            self._antecedent_rules[i] = \
+                compiled_model.get_antecedent_rules(i)
+
+            return self._antecedent_rules[i]
+
+    def _run_changed(self, compiled_model: CompiledRuleBaseModel,
+                     X: AttributeInput, changed: List[int]):
+        """Updates the intermediates of the rules that refer to `changed`.
+        """
+        changed_rules = list()
+        completeness_changed = False
+        for i in changed:
+            U_i = compiled_model.U[i]
+            refs_matchings_i = self._refs_matchings[i]
+            if refs_matchings_i is None:
+                # antecedent not used by any rule
+                continue
+
+            refs_matchings_i[0, :] = 0
+            completeness_i = 0.0
+            if U_i in X.attr_input:
+                refs_matching_i, completeness_i = compiled_model.match_refs(
+                    i, X.attr_input[U_i], X[U_i]
+                )
+                refs_matchings_i[0, :-1] = refs_matching_i
+
+            if completeness_i != self._attr_completeness[0, i]:
+                self._attr_completeness[0, i] = completeness_i
+                completeness_changed = True
+
+            rules_i, codes_i = self._get_antecedent_rules(compiled_model, i)
+            self._matchings[0, rules_i, i] = refs_matchings_i[0, codes_i]
+            changed_rules.append(rules_i)
+
+        if len(changed_rules) == 0:
+            self.n_updated = 0
+            return
+
+        rules = changed_rules[0] if len(changed_rules) == 1 \
+                else np.unique(np.concatenate(changed_rules))
+        self.n_updated = len(rules)
+
+        if 2 * len(rules) > len(compiled_model):
+            # cheaper than gathering the rules' matchings
+            self._alphas = compiled_model.get_matching_degrees(self._matchings)
+        elif len(rules) > 0:
+            self._alphas[:, rules] = compiled_model.get_matching_degrees(
+                self._matchings[:, rules],
+                rows=rules
+            )
+
+        # e.g., crisp inputs are always complete
+        if completeness_changed:
+            self._completeness = compiled_model.get_completeness(
+                self._attr_completeness
+            )
+
+    def _get_trace(self, compiled_model: CompiledRuleBaseModel
+                   ) -> InferenceTrace:
+        """Activation weights and analytical ER algorithm over all the rules.
+        """
+        theta_alphas = compiled_model.get_rows_values(compiled_model.theta) \
+                       * self._alphas
+        total_theta_alpha = np.sum(theta_alphas, axis=-1, keepdims=True)
+        total_theta_alpha[total_theta_alpha == 0] = 1
+
+        return InferenceTrace(
+            compiled_model.D,
+            compiled_model.get_rows_rules(),
+            matching_degrees=self._alphas.copy(),
+            activation_weights=theta_alphas / total_theta_alpha,
+            completeness=self._completeness.copy(),
+            beta=compiled_model.get_rows_values(compiled_model.beta),
+            log_space=compiled_model.log_space
+        )
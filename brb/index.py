@@ -0,0 +1,425 @@
+"""Indexes over the rules' referential values.
+
+Most rules of a rule base have matching degree 0 for a given input, especially
+for categorical and crisp inputs. As a rule with activation weight 0 does not
+change the analytical ER algorithm's products, only the rules that can be
+activated by the input need to be evaluated.
+"""
+from math import isnan
+from typing import List, Tuple, Any
+
+import numpy as np
+
+from .attr_input import AttributeInput, referential_kind, NUMERIC, \
+                        CATEGORICAL, INTERVAL, SET, DISTRIBUTION
+from .rule import Rule, get_alternatives
+
+
+class IntervalIndex():
+    """Static centered interval tree.
+
+    Returns the items whose (closed) interval overlaps a query interval in
+    O(log n + hits). Items can be added at any time, the tree is rebuilt on the
+    first query after additions. Bounds may be infinite.
+    """
+    def __init__(self):
+        self._intervals = list()
+        self._tree = None
+
+    def __len__(self):
+        return len(self._intervals)
+
+    def add(self, start: float, end: float, item: Any):
+        """Adds `item` over the interval [`start`, `end`].
+        """
+        self._intervals.append((start, end, item))
+        self._tree = None
+
+    @classmethod
+    def _build(cls, intervals: List[Tuple[float, float, Any]]):
+        """Builds the (sub)tree with `intervals`.
+
+        Returns:
+            node: `None` if there are no intervals, otherwise (center, left
+            subtree, right subtree, intervals containing the center sorted by
+            start, intervals containing the center sorted by end, descending).
+        """
+        if len(intervals) == 0:
+            return None
+
+        boundaries = sorted([boundary for start, end, _ in intervals
+                             for boundary in (start, end)])
+        center = boundaries[len(boundaries) // 2]
+
+        left = [itv for itv in intervals if itv[1] < center]
+        right = [itv for itv in intervals if itv[0] > center]
+        overlapping = [itv for itv in intervals
+                       if itv[0] <= center <= itv[1]]
+
+        return (
+            center,
+            cls._build(left),
+            cls._build(right),
+            sorted(overlapping, key=lambda itv: itv[0]),
+            sorted(overlapping, key=lambda itv: itv[1], reverse=True),
+        )
+
+    def query(self, start: float, end: float) -> List[Any]:
+        """Returns the items whose interval overlaps [`start`, `end`].
+        """
+        if self._tree is None:
+            self._tree = self._build(self._intervals)
+
+        items = list()
+        nodes = [self._tree]
+        while nodes:
+            node = nodes.pop()
+            if node is None:
+                continue
+
+            center, left, right, by_start, by_end = node
+            if end < center:
+                # all intervals of the node end after the query
+                for itv_start, _, item in by_start:
+                    if itv_start > end:
+                        break
+                    items.append(item)
+                nodes.append(left)
+            elif start > center:
+                # all intervals of the node start before the query
+                for _, itv_end, item in by_end:
+                    if itv_end < start:
+                        break
+                    items.append(item)
+                nodes.append(right)
+            else:
+                items += [item for _, _, item in by_start]
+                nodes.append(left)
+                nodes.append(right)
+
+        return items
+
+class ReferentialValueIndex():
+    """Index over the referential values of one antecedent.
+
+    Finds which referential values may match an input without testing all of
+    them: categorical values are looked up by value, while numerical values,
+    real-valued intervals and integer intervals are looked up through an
+    `IntervalIndex`. The few values that fit neither are always tested.
+
+    Attributes:
+        values: List of (raw, prepared) referential values. Values are
+        identified by their position in this list.
+    """
+    def __init__(self):
+        self.values = list()
+
+        self._categorical = dict()
+        self._ranges = IntervalIndex()
+        self._others = list()
+
+    def __len__(self):
+        return len(self.values)
+
+    def add(self, A_i: Any, _A_i: Any = None) -> int:
+        """Adds a new referential value.
+
+        Args:
+            A_i: Raw referential value.
+            _A_i: Prepared referential value. If `None`, `A_i` is prepared.
+
+        Returns:
+            j: Position of the new value in `values`.
+        """
+        if _A_i is None:
+            _A_i = AttributeInput.prep_referential_value(A_i)
+
+        j = len(self.values)
+        self.values.append((A_i, _A_i))
+
+        A_kind = referential_kind(_A_i)
+        bounds = self._get_bounds(_A_i, A_kind)
+        if A_kind == CATEGORICAL:
+            self._categorical.setdefault(_A_i, list()).append(j)
+        elif bounds is not None and not any(map(isnan, bounds)):
+            self._ranges.add(bounds[0], bounds[1], j)
+        else:
+            self._others.append(j)
+
+        return j
+
+    @staticmethod
+    def _get_bounds(value: Any, kind: str) -> Tuple[float, float]:
+        """Numerical boundaries of a value. `None` if not numerical.
+        """
+        try:
+            if kind == NUMERIC:
+                return float(value), float(value)
+            elif kind == INTERVAL:
+                return float(value[0][0]), float(value[-1][1])
+            elif kind == SET and len(value) > 0:
+                return float(min(value)), float(max(value))
+        except (TypeError, ValueError, IndexError):
+            pass
+
+        return None
+
+    def get_candidates(self, _X_i: Any, X_kind: str = None) -> List[int]:
+        """Returns the referential values that may match the input.
+
+        Args:
+            _X_i: Prepared input value.
+            X_kind: Kind of the input value, see `referential_kind`.
+
+        Returns:
+            candidates: Positions of the referential values in `values`.
+        """
+        if X_kind is None:
+            X_kind = referential_kind(_X_i)
+
+        candidates = list(self._others)
+        if X_kind == CATEGORICAL:
+            candidates += self._categorical.get(_X_i, list())
+        elif X_kind == DISTRIBUTION:
+            for key, certainty in _X_i.items():
+                if certainty == 0:
+                    continue
+
+                key_kind = referential_kind(key)
+                if key_kind == CATEGORICAL:
+                    candidates += self._categorical.get(key, list())
+                else:
+                    bounds = self._get_bounds(key, key_kind)
+                    if bounds is not None:
+                        candidates += self._ranges.query(*bounds)
+        elif X_kind is None:
+            # mismatching inputs, tested against all the values
+            candidates = list(range(len(self.values)))
+        else:
+            bounds = self._get_bounds(_X_i, X_kind)
+            if bounds is not None:
+                candidates += self._ranges.query(*bounds)
+
+        return candidates
+
+    def match(
+            self,
+            _X_i: Any,
+            X_i: Any = None,
+            X_kind: str = None
+        ) -> List[Tuple[int, float]]:
+        """Matches the input to the referential values.
+
+        Only the candidate values (see `get_candidates`) are tested.
+
+        Args:
+            _X_i: Prepared input value.
+            X_i: Raw input value. If `None`, `_X_i` is used.
+            X_kind: Kind of the input value, see `referential_kind`.
+
+        Returns:
+            matchings: Pairs of position of the referential value in `values`
+            and its nonzero matching to the input.
+        """
+        if X_i is None:
+            X_i = _X_i
+
+        matchings = list()
+        for j in set(self.get_candidates(_X_i, X_kind)):
+            A_i, _A_i = self.values[j]
+            match = Rule._get_antecedent_matching(_X_i, _A_i, X_i, A_i)
+
+            if match != 0:
+                matchings.append((j, match))
+
+        return matchings
+
+class RuleIndex():
+    """Maps each antecedent's referential values to the rules that use them.
+
+    The index assumes that a rule whose antecedents' matchings are all 0 has
+    matching degree 0, which holds for both 'arithmetic' and 'geometric'
+    matching degrees. Rules with custom (callable) matching degrees are always
+    evaluated.
+
+    Attributes:
+        U: Antecedents' names.
+        U_used: Antecedents referred by at least one rule.
+        n_rules: Number of rules indexed.
+    """
+    def __init__(self, U: List[str]):
+        self.U = U
+        self.U_used = set()
+        self.n_rules = 0
+
+        # referential values of each antecedent
+        self._values = {U_i: ReferentialValueIndex() for U_i in U}
+        # maps the (hashable) referential values to their position in the
+        # referential value index
+        self._codes = {U_i: dict() for U_i in U}
+        # _rules[U_i][j] = rules that use the j-th referential value of U_i
+        self._rules = {U_i: list() for U_i in U}
+        # same, as arrays of rules, see `from_store`
+        self._rules_arrays = {U_i: list() for U_i in U}
+
+        # rules that must be evaluated regardless of the input, and the same
+        # as arrays of rules
+        self._always = list()
+        self._always_arrays = list()
+
+    def __len__(self):
+        return self.n_rules
+
+    @classmethod
+    def from_store(
+            cls,
+            store: 'RuleStore',
+            codes_order: Tuple[np.ndarray, List[List[int]], np.ndarray] = None
+        ) -> 'RuleIndex':
+        """Indexes the rules of a `store.RuleStore`, without decoding them.
+
+        The rules are indexed by groups of the same referential value, through
+        the rules sorted by code (see `get_codes_order`), so indexing takes
+        time in the number of distinct referential values if `codes_order` is
+        given (e.g., loaded along with the rules, see `snapshot`).
+
+        Args:
+            store: Rules to be indexed, as the first ones of the index.
+            codes_order: As returned by `get_codes_order` for `store`. If
+            `None`, it is computed.
+        """
+        if codes_order is None:
+            codes_order = get_codes_order(store)
+        order, bounds, always = codes_order
+
+        index = cls(store.U)
+        index.n_rules = len(store)
+        index._always_arrays.append(always)
+
+        for i, U_i in enumerate(store.U):
+            if bounds[i][-1] > bounds[i][0]:
+                index.U_used.add(U_i)
+
+            for code, A_i in enumerate(store.A_refs[i]):
+                rules = order[i, bounds[i][code]:bounds[i][code + 1]]
+                if len(rules) == 0:
+                    continue
+
+                alternatives = get_alternatives(A_i)
+                if alternatives is None:
+                    alternatives = [A_i]
+                elif len(alternatives) == 0:  # WILDCARD
+                    index._always_arrays.append(rules)
+                    continue
+
+                # disjunctive antecedents are indexed by each alternative
+                for alternative in alternatives:
+                    j = index._get_position(U_i, alternative)
+                    index._rules_arrays[U_i][j].append(rules)
+
+        return index
+
+    def _get_position(self, U_i: str, A_i: Any) -> int:
+        """Position of a referential value of `U_i` in the index, added if new.
+        """
+        _A_i = AttributeInput.prep_referential_value(A_i)
+
+        key = _A_i if not isinstance(_A_i, set) else frozenset(_A_i)
+        try:
+            hash(key)
+        except TypeError:
+            key = repr(A_i)
+
+        if key not in self._codes[U_i].keys():
+            self._codes[U_i][key] = self._values[U_i].add(A_i, _A_i)
+            self._rules[U_i].append(list())
+            self._rules_arrays[U_i].append(list())
+
+        return self._codes[U_i][key]
+
+    def add_rule(self, new_rule: Rule):
+        """Indexes a new rule as the last one of the rule base.
+        """
+        k = self.n_rules
+        self.n_rules += 1
+
+        # any input may match one of the "don't care" antecedent's values
+        if callable(new_rule.matching_degree) or len(new_rule.A_values) == 0 \
+                or None in new_rule.disjunctive.values():
+            self._always.append(k)
+
+        for U_i in new_rule.A_values.keys():
+            self.U_used.add(U_i)
+
+            if U_i in new_rule.disjunctive.keys() \
+                    and new_rule.disjunctive[U_i] is None:  # WILDCARD
+                continue
+
+            # disjunctive antecedents are indexed by each alternative
+            for A_i in new_rule.get_alternatives(U_i):
+                self._rules[U_i][self._get_position(U_i, A_i)].append(k)
+
+    def get_candidates(self, X: AttributeInput) -> List[int]:
+        """Returns the rules that may have nonzero matching degree for `X`.
+
+        Returns:
+            candidates: Sorted indexes of the rules.
+        """
+        candidates = set(self._always)
+        for rules in self._always_arrays:
+            candidates.update(rules.tolist())
+
+        for U_i, X_i in X.attr_input.items():
+            if U_i not in self.U_used:
+                continue
+
+            _X_i, X_kind = X.get_prepared(U_i)
+
+            try:
+                matchings = self._values[U_i].match(_X_i, X_i, X_kind)
+            except KeyError:  # uncertain input does not cover the value
+                matchings = [
+                    (j, 1.0) for j
+                    in self._values[U_i].get_candidates(_X_i, X_kind)
+                ]
+
+            for j, _ in matchings:
+                candidates.update(self._rules[U_i][j])
+                for rules in self._rules_arrays[U_i][j]:
+                    candidates.update(rules.tolist())
+
+        return sorted(candidates)
+
+def get_codes_order(
+        store: 'RuleStore'
+    ) -> Tuple[np.ndarray, List[List[int]], np.ndarray]:
+    """Sorts the rules of a `store.RuleStore` by their referential values.
+
+    See `RuleIndex.from_store`.
+
+    Returns:
+        order: For each antecedent, the rules sorted by the code of their
+        referential value, shape (|U|, K).
+        bounds: For each antecedent, the rules whose referential value has
+        code c are `order[i, bounds[i][c]:bounds[i][c + 1]]`. The rules that
+        do not refer to the antecedent come first.
+        always: Rules that must be evaluated regardless of the input, i.e.,
+        without antecedents or whose matching degree is a function.
+    """
+    arrays = store.arrays
+    A_codes = arrays['A_codes']
+
+    order = np.argsort(A_codes.T, axis=1, kind='stable')
+    bounds = [
+        np.cumsum(np.bincount(A_codes[:, i] + 1,
+                              minlength=len(A_refs_i) + 1)).tolist()
+        for i, A_refs_i in enumerate(store.A_refs)
+    ]
+
+    callables = [code for code, matching_degree
+                 in enumerate(store.matching_degrees)
+                 if callable(matching_degree)]
+    always = np.flatnonzero(np.isin(arrays['matching_degree'], callables)
+                            | np.all(A_codes < 0, axis=1))
+
+    return order, bounds, always
@@ -0,0 +1,220 @@
+"""Columnar bulk loading of rule tables.
+
+Rule tables have one row per rule and one column per antecedent, consequent,
+and, optionally, rule weight and attribute weight. Instead of going through
+the rules one by one, the tables are read in chunks and each chunk is validated
+and encoded column by column, straight into the arrays of the compiled model
+(see `CompiledRuleBaseModel`).
+
+    Typical usage example:
+
+    >>> model = RuleBaseModel(U=['A_1', 'A_2'], D=['D_1', 'D_2'])
+    >>> load_rules(model, 'rules.parquet', chunksize=100000)
+"""
+import os
+from typing import Any, Dict, Iterator, List
+
+import numpy as np
+import pandas as pd
+
+from .compiled import CompiledRuleBaseModel
+from .rule import assert_parameters, get_alternatives
+
+
+def read_rules_table(
+        source: str,
+        chunksize: int = None,
+        **kwargs
+    ) -> Iterator[pd.DataFrame]:
+    """Reads a rules table in chunks.
+
+    The format is inferred from the file extension: '.parquet' (or '.pq') and
+    '.feather' require `pyarrow` (or `fastparquet`, for Parquet), any other
+    extension is read as csv.
+
+    Args:
+        source: Path to the table.
+        chunksize: Maximum number of rows of each chunk. If `None`, the table
+        is read at once. Feather files are always read at once.
+        kwargs: Passed to the `pandas` reading function.
+
+    Yields:
+        rules_df: Chunk of the table.
+    """
+    extension = os.path.splitext(source)[1].lower()
+
+    if extension in ('.parquet', '.pq'):
+        if chunksize is None:
+            yield pd.read_parquet(source, **kwargs)
+            return
+
+        import pyarrow.parquet as pq  # pylint: disable=import-outside-toplevel
+
+        parquet_file = pq.ParquetFile(source)
+        for batch in parquet_file.iter_batches(batch_size=chunksize,
+                                               **kwargs):
+            yield batch.to_pandas()
+    elif extension == '.feather':
+        yield pd.read_feather(source, **kwargs)
+    elif chunksize is None:
+        yield pd.read_csv(source, **kwargs)
+    else:
+        for rules_df in pd.read_csv(source, chunksize=chunksize, **kwargs):
+            yield rules_df
+
+def get_rules_columns(
+        rules_df: pd.DataFrame,
+        U: List[str],
+        D: List[Any],
+        thetas: str = None,
+        delta_cols: List[str] = None
+    ) -> Dict[str, np.ndarray]:
+    """Extracts and validates the columns of a rules table.
+
+    Validation is done over whole columns. Missing (NaN) antecedents are not
+    referred by the rule, missing belief degrees are 0 and missing weights are
+    1.
+
+    Args:
+        rules_df: Rules table.
+        U: Antecedents, i.e., the antecedents' columns.
+        D: Consequents, i.e., the belief degrees' columns.
+        thetas: Rules weights column. If `None`, all rules have weight 1.
+        delta_cols: Attribute weights' columns, one for each antecedent in
+        the same order as `U`. If `None`, all attributes have weight 1.
+
+    Returns:
+        columns: 'A' (antecedents' referential values, object array with NaN
+        for missing values, shape (N, |U|)), 'missing' (shape (N, |U|)), 'beta'
+        (shape (N, |D|)), 'theta' (shape (N,)) and 'delta' (0 for missing
+        antecedents, shape (N, |U|)).
+    """
+    for col in list(U) + list(D):
+        assert col in rules_df.columns, 'missing column `{}`'.format(col)
+
+    n_rules = rules_df.shape[0]
+
+    A = rules_df[list(U)].to_numpy(dtype=object)
+    missing = pd.isna(rules_df[list(U)]).to_numpy()
+
+    beta = rules_df[list(D)].to_numpy(dtype=float)
+    beta = np.nan_to_num(beta)
+
+    if thetas is not None:
+        theta = rules_df[thetas].to_numpy(dtype=float)
+        theta = np.where(np.isnan(theta), 1.0, theta)
+    else:
+        theta = np.ones(n_rules)
+
+    if delta_cols is not None:
+        # there must be one weight for each antecedent
+        assert len(delta_cols) == len(U)
+
+        delta = rules_df[list(delta_cols)].to_numpy(dtype=float)
+        delta = np.where(np.isnan(delta), 1.0, delta)
+    else:
+        delta = np.ones((n_rules, len(U)))
+
+    assert_parameters(beta, theta, delta)
+    delta[missing] = 0
+
+    return {'A': A, 'missing': missing, 'beta': beta, 'theta': theta,
+            'delta': delta}
+
+def compile_columns(
+        U: List[str],
+        D: List[Any],
+        columns: Dict[str, np.ndarray],
+        matching_degree: str = 'arithmetic',
+        log_space: bool = False
+    ) -> CompiledRuleBaseModel:
+    """Encodes the columns of a rules table into a compiled model.
+
+    Same as `CompiledRuleBaseModel.from_rules` over the rules of the table,
+    but encoding each antecedent's column at once.
+
+    Args:
+        U: Antecedent attributes' names.
+        D: Consequent referential values.
+        columns: As returned by `get_rules_columns`. Referential values must
+        not be disjunctive (see `Rule.disjunctive`).
+        matching_degree: Name of the (registered) matching degree of the
+        rules.
+        log_space: Whether the analytical ER algorithm is computed in log
+        space.
+
+    Returns:
+        compiled_model: Compiled model with the rules of the table.
+    """
+    A_refs = list()
+    A_codes = np.full(columns['A'].shape, -1, dtype=np.int32)
+    for i in range(len(U)):
+        # missing values are coded as -1
+        codes, uniques = pd.factorize(columns['A'][:, i])
+        A_codes[:, i] = codes
+        A_refs.append(list(uniques))
+
+    n_rules = A_codes.shape[0]
+
+    return CompiledRuleBaseModel(
+        U=U,
+        D=D,
+        A_refs=A_refs,
+        A_codes=A_codes,
+        theta=columns['theta'],
+        beta=columns['beta'],
+        delta=columns['delta'],
+        matching_degrees=[matching_degree],
+        matching_degree=np.zeros(n_rules, dtype=np.int16),
+        log_space=log_space
+    )
+
+def has_disjunctive_values(columns: Dict[str, np.ndarray]) -> bool:
+    """Checks if any referential value of the table is disjunctive.
+
+    Each distinct value is checked only once.
+    """
+    for i in range(columns['A'].shape[1]):
+        for A_i in pd.unique(columns['A'][~columns['missing'][:, i], i]):
+            if get_alternatives(A_i) is not None:
+                return True
+
+    return False
+
+def load_rules(
+        model,
+        source,
+        thetas: str = None,
+        delta_cols: List[str] = None,
+        chunksize: int = 100000,
+        **kwargs
+    ) -> int:
+    """Adds the rules of a table to the model, chunk by chunk.
+
+    Args:
+        model: `RuleBaseModel` to which the rules are added.
+        source: Either the path to the table (see `read_rules_table`) or a
+        `pandas.DataFrame`.
+        thetas: Rules weights column. If `None`, all rules have weight 1.
+        delta_cols: Attribute weights' columns, one for each antecedent in
+        the same order as `model.U`. If `None`, all attributes have weight 1.
+        chunksize: Maximum number of rows read at once.
+        kwargs: Passed to the `pandas` reading function.
+
+    Returns:
+        n_rules: Number of rules added.
+    """
+    if isinstance(source, pd.DataFrame):
+        chunks = [source]
+    else:
+        chunks = read_rules_table(source, chunksize=chunksize, **kwargs)
+
+    n_rules = 0
+    for rules_df in chunks:
+        columns = get_rules_columns(rules_df, model.U, model.D, thetas=thetas,
+                                    delta_cols=delta_cols)
+        model.add_rules_from_columns(columns)
+
+        n_rules += rules_df.shape[0]
+
+    return n_rules
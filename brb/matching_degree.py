@@ -0,0 +1,134 @@
+r"""Registry of matching degree functions.
+
+A matching degree function (\phi) aggregates the matchings of the input to each
+antecedent of a rule into the rule's matching degree. Registered functions are
+vectorized: they take the antecedents' matchings of many inputs against many
+rules at once, so that they can be used by the compiled model
+(`CompiledRuleBaseModel`) without a Python call per rule and per input.
+
+A registered function must have the signature `func(alphas, delta)`, in which
+
+    alphas: Antecedents' matchings, shape (N, K, |U|), i.e., inputs x rules x
+    antecedents.
+    delta: Attribute weights of the rules, shape (K, |U|). Antecedents not
+    referred by a rule have weight 0 (and matching 0), and must not affect the
+    rule's matching degree.
+
+and return the matching degrees, shape (N, K). It must result in 0 if all the
+matchings of a rule are 0, as rules are skipped based on that (see
+`RuleIndex`).
+
+Optionally, the gradient of the function w.r.t. the attribute weights can be
+registered along with it, so that the attribute weights can be trained (see
+`RuleBaseModel.fit`). It must have the signature `grad(alphas, delta,
+matching_degrees)`, in which `matching_degrees` is the output of the function,
+and return the gradient of each matching degree w.r.t. each attribute weight,
+shape (N, K, |U|).
+
+    Typical usage example:
+
+    >>> def weighted_min(alphas, delta):
+    ...     norm_delta = delta / np.max(delta, axis=-1, keepdims=True)
+    ...     return np.min(np.where(delta > 0, alphas ** norm_delta, 1), axis=-1)
+    >>> register_matching_degree('weighted_min', weighted_min)
+    >>> rule = Rule(A_values, beta, matching_degree='weighted_min')
+"""
+from typing import Callable
+
+import numpy as np
+
+
+_MATCHING_DEGREES = dict()
+_GRADIENTS = dict()
+
+def register_matching_degree(name: str, func: Callable, grad: Callable = None):
+    """Makes `func` available as a matching degree named `name`.
+
+    See module's documentation for the expected signatures.
+
+    Args:
+        name: Name of the matching degree, as used in `Rule.matching_degree`.
+        func: Vectorized matching degree function.
+        grad: Gradient of `func` w.r.t. the attribute weights. If `None`, the
+        attribute weights of the rules that use `func` are not trainable.
+    """
+    _MATCHING_DEGREES[name] = func
+    _GRADIENTS[name] = grad
+
+def get_matching_degree(name: str) -> Callable:
+    """Returns the matching degree function registered as `name`.
+
+    Raises:
+        KeyError: If no function was registered as `name`.
+    """
+    return _MATCHING_DEGREES[name]
+
+def get_matching_degree_grad(name: str) -> Callable:
+    """Returns the gradient of the matching degree registered as `name`.
+
+    `None` if no gradient was registered.
+    """
+    return _GRADIENTS.get(name)
+
+def is_registered(name) -> bool:
+    """Checks if there is a matching degree function registered as `name`.
+    """
+    return isinstance(name, str) and name in _MATCHING_DEGREES.keys()
+
+def arithmetic(alphas: np.ndarray, delta: np.ndarray) -> np.ndarray:
+    """Weighted arithmetic mean of the antecedents' matchings.
+    """
+    norm_delta = delta / np.sum(delta, axis=-1, keepdims=True)
+
+    return np.sum(alphas * norm_delta, axis=-1)
+
+def geometric(alphas: np.ndarray, delta: np.ndarray) -> np.ndarray:
+    """Weighted geometric mean of the antecedents' matchings.
+
+    Weights are normalized by the greatest one.
+    """
+    norm_delta = delta / np.max(delta, axis=-1, keepdims=True)
+
+    # antecedents not referred by the rule have 0 weight, and thus do not
+    # affect the product
+    return np.prod(alphas ** norm_delta, axis=-1)
+
+def arithmetic_grad(
+        alphas: np.ndarray,
+        delta: np.ndarray,
+        matching_degrees: np.ndarray
+    ) -> np.ndarray:
+    """Gradient of `arithmetic` w.r.t. the attribute weights.
+    """
+    total_delta = np.sum(delta, axis=-1, keepdims=True)
+
+    grad = (alphas - matching_degrees[..., np.newaxis]) / total_delta
+
+    # weights of antecedents not referred by the rule are fixed at 0
+    return np.where(delta > 0, grad, 0.0)
+
+def geometric_grad(
+        alphas: np.ndarray,
+        delta: np.ndarray,
+        matching_degrees: np.ndarray
+    ) -> np.ndarray:
+    """Gradient of `geometric` w.r.t. the attribute weights.
+
+    The greatest weight, which normalizes the others, is also a function of
+    the weights. The gradient is 0 where the matching degree is 0.
+    """
+    max_delta = np.max(delta, axis=-1, keepdims=True)
+    is_max = np.arange(delta.shape[-1]) == np.argmax(delta, axis=-1)[..., np.newaxis]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_alphas = np.log(alphas)
+        log_matching_degrees = np.log(matching_degrees)[..., np.newaxis]
+
+        grad = matching_degrees[..., np.newaxis] \
+               * (log_alphas - is_max * log_matching_degrees) / max_delta
+
+    return np.where((delta > 0) & (matching_degrees[..., np.newaxis] > 0),
+                    grad, 0.0)
+
+register_matching_degree('arithmetic', arithmetic, arithmetic_grad)
+register_matching_degree('geometric', geometric, geometric_grad)
@@ -0,0 +1,322 @@
+"""Hierarchical networks of rule bases.
+
+A network chains rule bases into a directed acyclic graph: the belief degrees
+that a sub-model infers over its consequent referential values `D` become an
+uncertain distribution input (see `AttributeInput`) of an antecedent of the
+sub-models that consume it. Thus, each rule base is kept small instead of a
+single rule base over all the antecedents.
+
+Each sub-model is evaluated once per input, however many sub-models consume
+its output, and the sub-models that do not depend on each other are evaluated
+concurrently by a pool of threads.
+
+    Typical usage example:
+
+    >>> network = RuleBaseNetwork()
+    >>> network.add_model('cost', cost_model)
+    >>> network.add_model('risk', risk_model)
+    >>> network.add_model('decision', decision_model,
+    ...                   inputs={'Cost': 'cost', 'Risk': 'risk'})
+    >>> network.run(X)['decision']
+    [0.7, 0.3]
+    >>> network.run_batch([X_1, X_2], outputs=['decision'])['decision']
+    array([[0.7, 0.3], [0.1, 0.9]])
+"""
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, List, Sequence, Union, \
+                   TYPE_CHECKING
+
+import numpy as np
+
+from .attr_input import AttributeInput
+from .brb import RuleBaseModel
+from .compiled import MAX_MEMORY
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+class RuleBaseNetwork():
+    """Directed acyclic graph of rule bases.
+
+    Sub-models are wired as they are added: a sub-model may only consume the
+    outputs of sub-models added before it, which guarantees that the graph is
+    acyclic and that the order of addition is a topological order.
+
+    Attributes:
+        models: Sub-models, by name, in order of addition.
+        inputs: Maps the name of each sub-model to its wired antecedents,
+        which map to the name of the sub-model whose output they consume.
+        n_workers: Maximum number of sub-models evaluated concurrently. If 1,
+        sub-models are evaluated serially, in order of addition.
+    """
+    def __init__(self, n_workers: int = None):
+        """Creates an empty network.
+
+        Args:
+            n_workers: Maximum number of sub-models evaluated concurrently. If
+            `None`, as many as `concurrent.futures.ThreadPoolExecutor`'s
+            default.
+        """
+        assert n_workers is None or n_workers > 0
+        self.n_workers = n_workers
+
+        self.models = dict()
+        self.inputs = dict()
+
+        # started on the first concurrent evaluation, see `close`
+        self._executor = None
+
+    def add_model(
+            self,
+            name: str,
+            model: RuleBaseModel,
+            inputs: Dict[str, str] = None
+        ):
+        """Adds a sub-model to the network.
+
+        Args:
+            name: Name of the sub-model, unique in the network.
+            model: Rule base of the sub-model.
+            inputs: Maps antecedents of `model` to the names of the sub-models
+            whose output they take, as a distribution over their consequent
+            referential values. The consequent referential values must be
+            referential values of the antecedent, if `model.A` is given. The
+            other antecedents are taken from the network's input.
+        """
+        assert name not in self.models, \
+            'sub-model `{}` already in the network'.format(name)
+
+        inputs = dict(inputs) if inputs is not None else dict()
+        for U_i, source in inputs.items():
+            assert U_i in model.U, \
+                '`{}` is not an antecedent of `{}`'.format(U_i, name)
+            assert source in self.models, \
+                'sub-model `{}` must be added before `{}`'.format(source, name)
+
+            if model.A is not None and U_i in model.A:
+                for D_j in self.models[source].D:
+                    assert D_j in model.A[U_i], \
+                        '`{}` is not a referential value of `{}`'.format(D_j,
+                                                                         U_i)
+
+        self.models[name] = model
+        self.inputs[name] = inputs
+
+    @property
+    def U(self) -> List[str]:
+        """Antecedents taken from the network's input, in order.
+        """
+        U = list()
+        for name, model in self.models.items():
+            for U_i in model.U:
+                if U_i not in self.inputs[name] and U_i not in U:
+                    U.append(U_i)
+
+        return U
+
+    @property
+    def outputs(self) -> List[str]:
+        """Sub-models whose output is not consumed by other sub-models.
+        """
+        sources = {source for inputs in self.inputs.values()
+                   for source in inputs.values()}
+
+        return [name for name in self.models.keys() if name not in sources]
+
+    def get_required(self, outputs: Sequence[str] = None) -> List[str]:
+        """Sub-models required to evaluate `outputs`, in order of addition.
+
+        Args:
+            outputs: Names of the sub-models. If `None`, all of them.
+        """
+        if outputs is None:
+            return list(self.models.keys())
+
+        required = set()
+        pending = list(outputs)
+        while pending:
+            name = pending.pop()
+            assert name in self.models, 'unknown sub-model `{}`'.format(name)
+
+            if name not in required:
+                required.add(name)
+                pending += self.inputs[name].values()
+
+        return [name for name in self.models.keys() if name in required]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Stops the threads of the concurrent evaluation, if any.
+
+        The network remains usable, and starts them again if needed.
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _evaluate(
+            self,
+            evaluate_model: Callable[[str, Dict[str, Any]], Any],
+            outputs: Sequence[str] = None
+        ) -> Dict[str, Any]:
+        """Evaluates the required sub-models as soon as their inputs are.
+
+        Args:
+            evaluate_model: Evaluates a sub-model, given its name and the
+            results of the sub-models evaluated so far.
+            outputs: Names of the sub-models to be evaluated, along with the
+            sub-models they depend on. If `None`, all of them.
+
+        Returns:
+            results: Results of the evaluated sub-models, by name.
+        """
+        required = self.get_required(outputs)
+
+        results = dict()
+        if self.n_workers == 1 or len(required) == 1:
+            for name in required:
+                results[name] = evaluate_model(name, results)
+
+            return results
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.n_workers)
+
+        # sub-models that wait for the results of others
+        waiting = {name: set(self.inputs[name].values()) for name in required}
+        running = dict()
+        try:
+            while waiting or running:
+                for name in [name for name, sources in waiting.items()
+                             if not sources]:
+                    del waiting[name]
+                    running[self._executor.submit(evaluate_model, name,
+                                                  results)] = name
+
+                done, _ = wait(running.keys(), return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    results[name] = future.result()
+
+                    for sources in waiting.values():
+                        sources.discard(name)
+        finally:
+            for future in running.keys():
+                future.cancel()
+
+        return {name: results[name] for name in required}
+
+    def _get_model_input(
+            self,
+            name: str,
+            X: AttributeInput,
+            distributions: Dict[str, Dict[Any, float]]
+        ) -> AttributeInput:
+        """Input of a sub-model, given the distributions of its wired inputs.
+        """
+        model = self.models[name]
+        inputs = self.inputs[name]
+
+        # the network's input is prepared only once for all sub-models
+        model_X = X.copy([U_i for U_i in model.U if U_i not in inputs])
+        for U_i, distribution in distributions.items():
+            model_X.set_value(U_i, distribution)
+
+        return model_X
+
+    def run(
+            self,
+            X: AttributeInput,
+            outputs: Sequence[str] = None
+        ) -> Dict[str, List[float]]:
+        """Infer the output of the sub-models (see `RuleBaseModel.run`).
+
+        Args:
+            X: Attribute's data to be fed to the network. Each sub-model takes
+            the antecedents it does not consume from other sub-models, the
+            others are ignored.
+            outputs: Names of the sub-models whose output is required. If
+            `None`, all of them.
+
+        Returns:
+            belief_degrees: Resulting belief degrees of the evaluated
+            sub-models, i.e., `outputs` and the sub-models they depend on, by
+            name.
+        """
+        for U_i in X.attr_input.keys():
+            X.get_prepared(U_i)
+
+        def evaluate_model(name, results):
+            distributions = {
+                U_i: dict(zip(self.models[source].D, results[source]))
+                for U_i, source in self.inputs[name].items()
+            }
+
+            return self.models[name].run(self._get_model_input(name, X,
+                                                               distributions))
+
+        return self._evaluate(evaluate_model, outputs=outputs)
+
+    def run_batch(
+            self,
+            inputs: Union[Sequence[AttributeInput], 'pd.DataFrame'],
+            outputs: Sequence[str] = None,
+            max_memory: int = MAX_MEMORY
+        ) -> Dict[str, np.ndarray]:
+        """Infer the output of the sub-models for many inputs at once.
+
+        Each sub-model evaluates the whole batch at once (see
+        `RuleBaseModel.run_batch`), once the sub-models it depends on did.
+
+        Args:
+            inputs: Either a sequence of `AttributeInput` or a `pd.DataFrame`
+            with one column per antecedent in `self.U`.
+            outputs: Names of the sub-models whose output is required. If
+            `None`, all of them.
+            max_memory: Memory budget (in bytes) for the intermediate arrays
+            of each sub-model.
+
+        Returns:
+            belief_degrees: Resulting belief degrees of the evaluated
+            sub-models, shape (N, |D|) for each, by name. The i-th row is the
+            same as `self.run(inputs[i])`.
+        """
+        is_df = hasattr(inputs, 'columns')  # pandas.DataFrame
+        if not is_df:
+            inputs = list(inputs)
+            for X in inputs:
+                for U_i in X.attr_input.keys():
+                    X.get_prepared(U_i)
+
+        def evaluate_model(name, results):
+            model = self.models[name]
+            model_inputs = self.inputs[name]
+
+            # the outputs of the sources as distributions, one per input
+            distributions = {
+                U_i: [dict(zip(self.models[source].D, belief_degrees))
+                      for belief_degrees in results[source].tolist()]
+                for U_i, source in model_inputs.items()
+            }
+
+            if is_df:
+                columns = [U_i for U_i in model.U if U_i in inputs.columns
+                           and U_i not in model_inputs]
+                batch = inputs[columns].assign(**distributions)
+            else:
+                batch = [
+                    self._get_model_input(name, X, {
+                        U_i: X_i[n] for U_i, X_i in distributions.items()
+                    })
+                    for n, X in enumerate(inputs)
+                ]
+
+            return model.run_batch(batch, max_memory=max_memory)
+
+        return self._evaluate(evaluate_model, outputs=outputs)
@@ -0,0 +1,171 @@
+"""Opt-in profiling of the inference.
+
+A `Profiler` attached to a model (see `RuleBaseModel.enable_profiling`)
+records the wall time of each stage of `RuleBaseModel.run` and
+`RuleBaseModel.run_batch` (see `STAGES`) and counts the rules evaluated and
+activated, the referential values parsed and the warnings emitted. Models
+without a profiler only check that it is `None`, once per stage.
+
+Rules are profiled while a profiler is active, i.e., during a profiled run or
+within a `with profiler:` block, e.g., to profile `Rule.get_matching_degree`
+on its own.
+
+    Typical usage example:
+
+    >>> profiler = model.enable_profiling()
+    >>> model.run(X)
+    >>> profiler.snapshot()
+    {'timings': {'parse': ..., 'matching': ..., ...}, 'counters': {...}}
+"""
+import warnings
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Callable, Dict, Union
+
+# stages of `RuleBaseModel.run` (and of the chunks of `run_batch`):
+#   parse: preparation of the input values (see `AttributeInput.get_prepared`)
+#   matching: selection of the candidate rules (or matching of the distinct
+#   referential values) and their matching degrees
+#   activation: normalization of the activation weights
+#   er: belief degrees and analytical ER algorithm
+STAGES = ('parse', 'matching', 'activation', 'er')
+
+# counters:
+#   runs: profiled runs
+#   rules_evaluated: rules (rows of the expanded disjunctive rules) evaluated
+#   rules_activated: rules (or rows) with matching degree above 0
+#   parse_calls: calls of `AttributeInput.prep_referential_value`
+#   warnings: warnings emitted by the matching of the antecedents
+COUNTERS = ('runs', 'rules_evaluated', 'rules_activated', 'parse_calls',
+            'warnings')
+
+# profiler that records the counters of the rules, if any
+_active = ContextVar('profiler', default=None)
+
+
+def get_active() -> Union['Profiler', None]:
+    """Returns the active profiler, `None` if there is none.
+    """
+    return _active.get()
+
+def count(counter: str, n: int = 1):
+    """Increases a counter of the active profiler, if any.
+    """
+    profiler = _active.get()
+    if profiler is not None:
+        profiler.count(counter, n)
+
+def warn(message: str, stacklevel: int = 1):
+    """Same as `warnings.warn`, counted by the active profiler, if any.
+    """
+    count('warnings')
+
+    warnings.warn(message, stacklevel=stacklevel + 1)
+
+class Profiler():
+    """Accumulates the stage timings and counters of the profiled runs.
+
+    A profiler is not thread-safe: concurrent runs must be profiled by
+    different profilers.
+
+    Attributes:
+        callback: If not `None`, called after each profiled run with its own
+        timings and counters, as in `snapshot`.
+        timings: Total wall time (in seconds) of each stage.
+        counters: Total of each counter.
+    """
+    def __init__(self, callback: Callable[[Dict[str, Dict]], None] = None):
+        self.callback = callback
+
+        self.reset()
+
+        # tokens of the nested `with` blocks
+        self._tokens = list()
+
+    def reset(self):
+        """Sets the timings and counters to 0.
+        """
+        self.timings = dict.fromkeys(STAGES, 0.0)
+        self.counters = dict.fromkeys(COUNTERS, 0)
+
+    def count(self, counter: str, n: int = 1):
+        self.counters[counter] = self.counters.get(counter, 0) + n
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Returns a copy of the timings and counters.
+
+        Returns:
+            snapshot: Dictionary with the timings (in seconds, by stage) and
+            the counters, respectively as 'timings' and 'counters'.
+        """
+        return {'timings': dict(self.timings), 'counters': dict(self.counters)}
+
+    def start_run(self) -> 'RunProfile':
+        """Profiles a single run, which must be used as a context manager.
+        """
+        return RunProfile(self)
+
+    def __enter__(self) -> 'Profiler':
+        self._tokens.append(_active.set(self))
+
+        return self
+
+    def __exit__(self, *exc_info):
+        _active.reset(self._tokens.pop())
+
+class RunProfile():
+    """Timings of the stages of a single run.
+
+    Within its `with` block, its profiler is active. On exit, the timings and
+    counters of the run are added to the profiler and reported to its
+    callback, unless the run failed.
+
+    Attributes:
+        profiler: Profiler of the run.
+        timings: Wall time (in seconds) of each stage of the run.
+    """
+    def __init__(self, profiler: Profiler):
+        self.profiler = profiler
+        self.timings = dict()
+
+        self._counters = None
+        self._token = None
+        self._last = None
+
+    def __enter__(self) -> 'RunProfile':
+        self._counters = dict(self.profiler.counters)
+        self._token = _active.set(self.profiler)
+        self._last = perf_counter()
+
+        return self
+
+    def lap(self, stage: str):
+        """Ends a stage, which started at the end of the previous one.
+        """
+        now = perf_counter()
+        self.timings[stage] = self.timings.get(stage, 0.0) + now - self._last
+        self._last = now
+
+    def count(self, counter: str, n: int = 1):
+        self.profiler.count(counter, n)
+
+    def __exit__(self, exc_type, *exc_info):
+        _active.reset(self._token)
+
+        if exc_type is not None:
+            return
+
+        profiler = self.profiler
+        profiler.count('runs')
+        for stage, seconds in self.timings.items():
+            profiler.timings[stage] = profiler.timings.get(stage, 0.0) \
+                                      + seconds
+
+        if profiler.callback is not None:
+            profiler.callback({
+                'timings': dict(self.timings),
+                'counters': {
+                    counter: n - self._counters.get(counter, 0)
+                    for counter, n in profiler.counters.items()
+                }
+            })
@@ -1,14 +1,317 @@
 """Models a belief rule and associated operations.
 """
 from copy import copy
-from typing import List, Dict, Any, Union, Callable
-from warnings import warn
+from functools import lru_cache
+from itertools import product
+from typing import List, Dict, Any, Tuple, Union, Callable
 
 import numpy as np
 
 from interval import interval, inf
 
-from .attr_input import AttributeInput, is_numeric
+from .attr_input import AttributeInput, referential_kind, NUMERIC, \
+                        CATEGORICAL, INTERVAL, SET, DISTRIBUTION
+from .matching_degree import get_matching_degree, is_registered
+from .profiling import warn  # counted by the active profiler, if any
+
+# Antecedent matching functions, one for each pair of input and referential
+# value kinds (see `referential_kind`). All of them take the prepared input and
+# referential value (`_X_i` and `_A_i`) and their string representations (`X_i`
+# and `A_i`), and return the match between 0.0 and 1.0.
+
+def _match_equal(_X_i, _A_i, X_i, A_i) -> float:
+    return float(_X_i == _A_i)
+
+def _match_numeric_range(_X_i, _A_i, X_i, A_i) -> float:
+    return float(_X_i in _A_i)
+
+def _get_interval_length(_X_i, X_i) -> float:
+    """Length of an interval input, warning if it is unbounded.
+    """
+    _X_i_length = _X_i[0][1] - _X_i[0][0]
+    if _X_i_length == inf:
+        warn((
+            'The use of unbounded intervals as input ({}) is not'
+            'advised, resulting match might not follow expectations.'
+        ).format(X_i))
+
+    return _X_i_length
+
+def _match_interval_nothing(_X_i, _A_i, X_i, A_i) -> float:
+    _get_interval_length(_X_i, X_i)
+
+    return 0.0
+
+def _match_interval_numeric(_X_i, _A_i, X_i, A_i) -> float:
+    _get_interval_length(_X_i, X_i)
+
+    # In this case, if the input covers the referential value, we consider it a
+    # match. We do so in a binary manner because it would be impossible to
+    # quantify how much of the input is covered by the referential value, as
+    # the latter has no measure.
+    return float(_A_i in _X_i)
+
+def _match_interval_interval(_X_i, _A_i, X_i, A_i) -> float:
+    _X_i_length = _get_interval_length(_X_i, X_i)
+
+    # For this scenario, we quantify the match as the amount of the input that
+    # is contained in the referential value.
+    intrsc = _A_i & _X_i
+    try:
+        intrsc_length = intrsc[0][1] - intrsc[0][0]
+    except IndexError:  # intersection is empty
+        return 0.0
+
+    if _X_i_length == inf:
+        if _X_i == _A_i:
+            return 1.0
+        elif intrsc_length == 0:
+            return 0.0
+        else:
+            # As no proper way of quantifying the match of infinite intervals
+            # was found, we assume that if they are not equal but have a
+            # non-empty infinite intersection, it is a 0.5 match.
+            return 0.5
+
+    return float(intrsc_length / _X_i_length)
+
+def _match_interval_set(_X_i, _A_i, X_i, A_i) -> float:
+    _get_interval_length(_X_i, X_i)
+
+    warn((
+        'The referential value ({}) will be converted to a '
+        'continuous interval to make the comparison with the input '
+        '({}). This is not advised as may result in unexpected '
+        'behavior. Please use an integer interval instead or '
+        'convert the rule\'s referential value to continuous'
+    ).format(A_i, X_i))
+    _A_i_continuous = interval[min(_A_i), max(_A_i)]
+
+    return _match_interval_interval(_X_i, _A_i_continuous, X_i, A_i)
+
+def _match_set_numeric(_X_i, _A_i, X_i, A_i) -> float:
+    # Same as the case for interval input and numeric reference.
+    return float(_A_i in _X_i) / len(_X_i)
+
+def _match_set_set(_X_i, _A_i, X_i, A_i) -> float:
+    return float(len(_X_i & _A_i) / len(_X_i))
+
+def _match_set_interval(_X_i, _A_i, X_i, A_i) -> float:
+    # Problems might occur due to the nature of the intervals, e.g., if X_i is
+    # {1,2} and A_i is [2,3], this would result in a 0.50 match, even though
+    # the intervals share only their upper boundary.
+    warn((
+        'comparison between integer interval input `{}` and '
+        'continuous interval `{}` is not advised, results might '
+        'not match the expectations.'
+    ).format(X_i, A_i))
+
+    intrsc_length = sum([
+        _X_i_element in _A_i for _X_i_element in _X_i
+    ])
+
+    return float(intrsc_length / len(_X_i))
+
+def _match_distribution_value(_X_i, _A_i, X_i, A_i) -> float:
+    # values not given in the distribution have certainty 0
+    return float(_X_i.get(_A_i, 0.0))
+
+def _match_distribution_range(_X_i, _A_i, X_i, A_i) -> float:
+    matching_certainties = [_X_i[key] for key in _X_i.keys() if key in _A_i]
+
+    return float(sum(matching_certainties))
+
+def _match_distribution_distribution(_X_i, _A_i, X_i, A_i) -> float:
+    raise NotImplementedError('Uncertain rules are not supported')
+
+def _match_nothing(_X_i, _A_i, X_i, A_i) -> float:
+    return 0.0
+
+def _match_mismatch(_X_i, _A_i, X_i, A_i) -> float:
+    warn('Input {} mismatches the referential value {}'.format(X_i, A_i))
+
+    return 0.0
+
+# _MATCHERS[_A_i kind][_X_i kind] = matching function
+_MATCHERS = {
+    A_kind: {X_kind: _match_nothing for X_kind
+             in (NUMERIC, CATEGORICAL, SET, DISTRIBUTION)}
+    for A_kind in (NUMERIC, CATEGORICAL, INTERVAL, SET, DISTRIBUTION, None)
+}
+for _A_kind in _MATCHERS.keys():
+    _MATCHERS[_A_kind][INTERVAL] = _match_interval_nothing
+    _MATCHERS[_A_kind][None] = _match_mismatch
+
+_MATCHERS[NUMERIC][NUMERIC] = _match_equal
+_MATCHERS[INTERVAL][NUMERIC] = _match_numeric_range
+_MATCHERS[SET][NUMERIC] = _match_numeric_range
+
+_MATCHERS[CATEGORICAL][CATEGORICAL] = _match_equal
+
+_MATCHERS[NUMERIC][INTERVAL] = _match_interval_numeric
+_MATCHERS[INTERVAL][INTERVAL] = _match_interval_interval
+_MATCHERS[SET][INTERVAL] = _match_interval_set
+
+_MATCHERS[NUMERIC][SET] = _match_set_numeric
+_MATCHERS[SET][SET] = _match_set_set
+_MATCHERS[INTERVAL][SET] = _match_set_interval
+
+_MATCHERS[NUMERIC][DISTRIBUTION] = _match_distribution_value
+_MATCHERS[CATEGORICAL][DISTRIBUTION] = _match_distribution_value
+_MATCHERS[INTERVAL][DISTRIBUTION] = _match_distribution_range
+_MATCHERS[SET][DISTRIBUTION] = _match_distribution_range
+_MATCHERS[DISTRIBUTION][DISTRIBUTION] = _match_distribution_distribution
+
+class AnyOf():
+    """Disjunctive (OR) referential value, which stands for its alternatives.
+
+    Disjunctive values are only given through this type (or parsed from
+    strings, see `parse_disjunctive`), thus referential values of other types
+    are always matched as they are.
+
+    Attributes:
+        alternatives: Raw referential values. If empty, the value is the
+        "don't care" one (`WILDCARD`), whose alternatives are all the
+        referential values of the antecedent.
+    """
+    __slots__ = ('alternatives', )
+
+    def __init__(self, alternatives: List[Any] = ()):
+        self.alternatives = tuple(alternatives)
+
+    def __eq__(self, other):
+        return isinstance(other, AnyOf) \
+               and self.alternatives == other.alternatives
+
+    def __hash__(self):
+        return hash((AnyOf, self.alternatives))
+
+    def __repr__(self):
+        return 'AnyOf({!r})'.format(list(self.alternatives))
+
+    def __str__(self):
+        if not self.alternatives:
+            return WILDCARD_STRING
+
+        return OR_SEPARATOR.join(str(A_ij) for A_ij in self.alternatives)
+
+# "don't care" referential value, which stands for each of the referential
+# values of the antecedent
+WILDCARD = AnyOf()
+# string forms of the disjunctive referential values, see `parse_disjunctive`
+WILDCARD_STRING = '*'
+OR_SEPARATOR = '|'
+
+# tolerance for the belief degrees of a rule to sum more than 1
+BELIEF_TOLERANCE = 1e-6
+
+def parse_disjunctive(A_i: Any) -> Any:
+    """Parses the string form of a disjunctive referential value.
+
+    Only used when asked for (see `RuleBaseModel.parse_disjunctive`), e.g.,
+    for rules tables, whose cells are strings.
+
+    Returns:
+        A_i: `WILDCARD` for `WILDCARD_STRING`, an `AnyOf` for strings of
+        alternatives separated by `OR_SEPARATOR` (e.g., 'l|m'), otherwise
+        `A_i` as it is.
+    """
+    if isinstance(A_i, str):
+        if A_i.strip() == WILDCARD_STRING:
+            return WILDCARD
+        elif OR_SEPARATOR in A_i:
+            return AnyOf([A_ij.strip() for A_ij in A_i.split(OR_SEPARATOR)])
+
+    return A_i
+
+def get_alternatives(A_i: Any) -> Union[List[Any], None]:
+    """Alternatives of a disjunctive referential value (see `AnyOf`).
+
+    Returns:
+        alternatives: Raw referential values, `None` if `A_i` is not
+        disjunctive. Empty for `WILDCARD`, whose alternatives are all the
+        referential values of the antecedent.
+    """
+    if isinstance(A_i, AnyOf):
+        return list(A_i.alternatives)
+
+    return None
+
+@lru_cache(maxsize=4096)
+def _prep_string(A_i: str):
+    """Prepared referential value and matching functions of a string value.
+
+    Rule bases repeat the same referential values over many rules, which are
+    thus parsed only once.
+    """
+    _A_i = AttributeInput.prep_referential_value(A_i)
+
+    return _A_i, _MATCHERS[referential_kind(_A_i)]
+
+def _prep_referential_value(A_i: Any):
+    """Prepared referential value and matching functions of a value.
+    """
+    if isinstance(A_i, str):
+        return _prep_string(A_i)
+
+    _A_i = AttributeInput.prep_referential_value(A_i)
+
+    return _A_i, _MATCHERS[referential_kind(_A_i)]
+
+def prep_antecedent(A_i: Any) -> Tuple[Union[List[Any], None], Any]:
+    """Parses an antecedent's referential value, as defined in a rule.
+
+    Returns:
+        alternatives: As returned by `get_alternatives`.
+        prepared: Prepared referential value and matching functions (see
+        `_prep_referential_value`), `None` if `A_i` is disjunctive.
+    """
+    alternatives = get_alternatives(A_i)
+    if alternatives is not None:
+        return alternatives, None
+
+    return None, _prep_referential_value(A_i)
+
+def _normalize_delta(
+        delta: Dict[str, float],
+        norm: Callable
+    ) -> Union[Dict[str, float], None]:
+    """Attribute weights divided by their `norm`, `None` if it is 0.
+    """
+    if not delta:
+        return None
+
+    total = norm(delta.values())
+    if total == 0:
+        return None
+
+    return {U_i: d / total for U_i, d in delta.items()}
+
+def assert_parameters(beta: Any, theta: Any, delta: Any):
+    """Checks if the parameters of one or many rules are proper.
+
+    Shared by the rules added one by one (see `RuleBaseModel.add_rule`) and
+    the rules tables (see `loader.get_rules_columns`).
+
+    Args:
+        beta: Belief degrees, shape (|D|,), or (N, |D|) for N rules.
+        theta: Rules' weights, shape () or (N,).
+        delta: Attribute weights, shape (|U|,) or (N, |U|).
+    """
+    beta = np.asarray(beta, dtype=float)
+    assert np.all(beta >= 0), 'belief degrees must not be negative'
+    assert np.all(np.sum(beta, axis=-1) <= 1 + BELIEF_TOLERANCE), \
+        'belief degrees of a rule must not sum more than 1'
+
+    assert np.all(np.asarray(theta, dtype=float) >= 0), \
+        'rules weights must not be negative'
+    assert np.all(np.asarray(delta, dtype=float) >= 0), \
+        'attribute weights must not be negative'
+
+# state of the rules that views (see `Rule.view`) load from their row
+_VIEW_STATE = frozenset(('_A_values', '_A_matchers', '_disjunctive',
+                         '_wildcards', '_delta', '_arithmetic_delta',
+                         '_geometric_delta'))
 
 class Rule():
     """A rule definition in a BRB system.
@@ -17,19 +320,42 @@ class Rule():
     the consequents. We assume that it is defined as a pure AND rule, that is,
     the only logical relation between the input attributes is the AND function.
 
+    The referential values are parsed and the attribute weights are
+    normalized once, when assigned to the rule, thus `A_values` and `delta`
+    must be replaced, instead of modified in place.
+
+    An antecedent's referential value may also be disjunctive (see `AnyOf`),
+    either an OR-set of alternatives (e.g., `AnyOf(['l', 'm'])`) or a "don't
+    care" (`WILDCARD`) value, which stands for all the referential values of
+    the antecedent. A disjunctive
+    rule is evaluated as its expanded form (see `expand`), i.e., one rule for
+    each combination of the alternatives, without creating those rules.
+
+    The rules of a model are views (see `view`) over the rows of its
+    `store.RuleStore`, which keeps the rules as arrays. Assigning to the
+    attributes of a view changes its row, while the `beta` of a view is
+    read-only, thus must be replaced instead of modified in place.
+
     Attributes:
         A_values: A^k. Dictionary that matches reference values for each
         antecedent attribute that activates the rule.
         beta: \bar{\beta}. Expected belief degrees of consequents if rule is
         delta: \delta_k. Relative weights of antecedent attributes. If not
-        provided, 1 will be set for all attributes.
+        provided, 1 will be set for all attributes. Antecedents with `WILDCARD`
+        referential values whose weight is not provided get the average of the
+        other weights, as in `expand_antecedent`.
         theta: \theta_k. Rule weight.
         matching_degree: \phi. Defines how to calculate the matching degree for
         the rule. If `Callable`, must be a function that takes `delta`,
         and `alphas_i` (dictionary that maps antecedents to their matching
         degree given input) as input. If string, must be either 'geometric'
-        (default) or 'arithmetic', which apply the respective weighted means.
+        (default) or 'arithmetic', which apply the respective weighted means,
+        or the name of a function registered through
+        `matching_degree.register_matching_degree`, which can be vectorized by
+        the compiled model.
     """
+    __slots__ = ('_store', '_k', '_theta', '_beta', '_matching_degree') \
+                + tuple(sorted(_VIEW_STATE))
 
     def __init__(
             self,
@@ -39,15 +365,18 @@ class Rule():
             theta: float = 1,
             matching_degree: Union[str, Callable] = 'arithmetic'
         ):
+        self._store = None
+        self._k = None
+
         self.A_values = A_values
 
         if delta is None:
             self.delta = {attr: 1 for attr in A_values.keys()}
         else:
             # there must exist a weight for all antecedent attributes that
-            # activate the rule
+            # activate the rule, except for the "don't care" ones
             for U_i in A_values.keys():
-                assert U_i in delta.keys()
+                assert U_i in delta.keys() or U_i in self._wildcards
             self.delta = delta
 
         self.theta = theta
@@ -55,6 +384,205 @@ class Rule():
 
         self.matching_degree = matching_degree
 
+    @classmethod
+    def view(cls, store, k: int) -> 'Rule':
+        """Returns the rule of the k-th row of a `store.RuleStore`.
+
+        The view is created in constant time, its antecedents and weights are
+        only read from the row when used. Views refer to their row by
+        position, and keep what they read: after a row is changed through
+        another view, or moved, a new view must be taken.
+        """
+        rule = cls.__new__(cls)
+        rule._store = store
+        rule._k = k
+
+        return rule
+
+    def bind(self, store, k: int):
+        """Turns the rule into the view of the k-th row of a `store.RuleStore`.
+
+        Called by the store once the rule is written into the row, so that
+        the rule keeps changing the model it was added to. As any view, the
+        rule refers to its row by position, thus to another rule once rules
+        are inserted or removed before it. Rules that are already views are
+        left as they are.
+        """
+        if self._store is not None:
+            return
+
+        # loaded from the row when used
+        for name in _VIEW_STATE | {'_theta', '_beta', '_matching_degree'}:
+            try:
+                delattr(self, name)
+            except AttributeError:
+                pass
+
+        self._store = store
+        self._k = k
+
+    def __getattr__(self, name: str):
+        # called for the state not yet loaded from the row of a view
+        if name not in _VIEW_STATE or self._store is None:
+            raise AttributeError(name)
+
+        if name == '_arithmetic_delta':
+            self._arithmetic_delta = _normalize_delta(self.delta, sum)
+        elif name == '_geometric_delta':
+            self._geometric_delta = _normalize_delta(self.delta, max)
+        else:
+            A_values, prepared, delta = self._store.get_row(self._k)
+            self._set_antecedents(A_values, prepared)
+            self._delta = delta
+
+        return getattr(self, name)
+
+    def __reduce__(self):
+        # views are copied (and pickled) as rules on their own
+        beta = self.beta
+        if self._store is not None:
+            beta = beta.tolist()
+
+        return (Rule, (self.A_values, beta, self.delta, self.theta,
+                       self.matching_degree))
+
+    def _set_row(self, **params):
+        """Replaces the row of a view, with the given attributes changed.
+        """
+        params = dict(dict(
+            A_values=self.A_values,
+            beta=self.beta,
+            delta=self.delta,
+            theta=self.theta,
+            matching_degree=self.matching_degree
+        ), **params)
+        self._store[self._k] = Rule(**params)
+
+        # loaded again when used
+        for name in _VIEW_STATE:
+            try:
+                delattr(self, name)
+            except AttributeError:
+                pass
+
+    @property
+    def A_values(self) -> Dict[str, Any]:  # pylint: disable=missing-function-docstring
+        return self._A_values
+
+    @A_values.setter
+    def A_values(self, A_values: Dict[str, Any]):
+        if self._store is not None:
+            # new antecedents get weight 1, as in `__init__`, except for the
+            # "don't care" ones
+            delta = {U_i: self.delta.get(U_i, 1) for U_i, A_i
+                     in A_values.items() if U_i in self.delta.keys()
+                     or get_alternatives(A_i) != []}
+            self._set_row(A_values=A_values, delta=delta)
+            return
+
+        self._set_antecedents(A_values, [prep_antecedent(A_i)
+                                         for A_i in A_values.values()])
+
+        # fills the weights of new "don't care" antecedents
+        if hasattr(self, '_delta'):
+            self.delta = self._delta
+
+    def _set_antecedents(self, A_values: Dict[str, Any], prepared: List):
+        """Sets the antecedents and their parsed values, see `prep_antecedent`.
+        """
+        self._A_values = A_values
+
+        # maps antecedents to their prepared referential value and to the
+        # matching functions for each kind of input
+        self._A_matchers = dict()
+        # alternatives of the disjunctive antecedents
+        self._disjunctive = dict()
+        self._wildcards = set()
+        for U_i, (alternatives, A_matchers) in zip(A_values.keys(), prepared):
+            if alternatives is None:
+                self._A_matchers[U_i] = A_matchers
+            elif len(alternatives) == 0:
+                self._disjunctive[U_i] = None
+                self._wildcards.add(U_i)
+            else:
+                self._disjunctive[U_i] = alternatives
+
+    @property
+    def disjunctive(self) -> Dict[str, Union[List[Any], None]]:
+        """Alternatives of each disjunctive antecedent.
+
+        `None` for `WILDCARD` antecedents, whose alternatives are all the
+        referential values of the antecedent.
+        """
+        return self._disjunctive
+
+    @property
+    def delta(self) -> Dict[str, float]:  # pylint: disable=missing-function-docstring
+        return self._delta
+
+    @delta.setter
+    def delta(self, delta: Dict[str, float]):
+        if self._store is not None:
+            self._set_row(delta=delta)
+            return
+
+        missing = [U_i for U_i in self._wildcards if U_i not in delta.keys()]
+        if missing:
+            delta = copy(delta)
+
+            given = list(delta.values())
+            for U_i in missing:
+                delta[U_i] = sum(given) / len(given) if given else 1
+
+        self._delta = delta
+
+        # normalized weights for the arithmetic and geometric matching
+        # degrees. `None` if they cannot be normalized.
+        self._arithmetic_delta = _normalize_delta(delta, sum)
+        self._geometric_delta = _normalize_delta(delta, max)
+
+    @property
+    def theta(self) -> float:  # pylint: disable=missing-function-docstring
+        if self._store is not None:
+            return self._store.get_field(self._k, 'theta')
+
+        return self._theta
+
+    @theta.setter
+    def theta(self, theta: float):
+        if self._store is not None:
+            self._store.set_field(self._k, 'theta', theta)
+        else:
+            self._theta = theta
+
+    @property
+    def beta(self) -> List[float]:  # pylint: disable=missing-function-docstring
+        if self._store is not None:
+            return self._store.get_field(self._k, 'beta')
+
+        return self._beta
+
+    @beta.setter
+    def beta(self, beta: List[float]):
+        if self._store is not None:
+            self._store.set_field(self._k, 'beta', beta)
+        else:
+            self._beta = beta
+
+    @property
+    def matching_degree(self) -> Union[str, Callable]:  # pylint: disable=missing-function-docstring
+        if self._store is not None:
+            return self._store.get_field(self._k, 'matching_degree')
+
+        return self._matching_degree
+
+    @matching_degree.setter
+    def matching_degree(self, matching_degree: Union[str, Callable]):
+        if self._store is not None:
+            self._store.set_field(self._k, 'matching_degree', matching_degree)
+        else:
+            self._matching_degree = matching_degree
+
     def get_antecedent_matching(self, U_i: Any, X: AttributeInput) -> float:
         """Quantifies matching of an input to the rules' referential value.
 
@@ -66,13 +594,11 @@ class Rule():
             match: Between 0-1, quantifies how much `X_i` matches the
             referential value `A_i`.
         """
-        X_i = X.attr_input[U_i]
-        A_i = self.A_values[U_i]
-
-        _X_i = X[U_i]
-        _A_i = X.prep_referential_value(A_i)
+        _A_i, matchers = self._A_matchers[U_i]
+        _X_i, X_kind = X.get_prepared(U_i)
 
-        return self._get_antecedent_matching(_X_i, _A_i, X_i, A_i)
+        return matchers[X_kind](_X_i, _A_i, X.attr_input[U_i],
+                                self.A_values[U_i])
 
     @staticmethod
     def _get_antecedent_matching(_X_i, _A_i, X_i=None, A_i=None) -> float:
@@ -97,122 +623,92 @@ class Rule():
         if A_i is None:
             A_i = _A_i
 
-        match = 0.0
-
-        if is_numeric(_X_i):
-            if is_numeric(_A_i):
-                match = float(_X_i == _A_i)
-            elif isinstance(_A_i, interval) or isinstance(_A_i, set):
-                match = float(_X_i in _A_i)
-        elif isinstance(_X_i, str):
-            if isinstance(_A_i, str):
-                match = float(_X_i == _A_i)
-        elif isinstance(_X_i, interval):
-            _X_i_length = _X_i[0][1] - _X_i[0][0]
-            if _X_i_length == inf:
-                warn((
-                    'The use of unbounded intervals as input ({}) is not'
-                    'advised, resulting match might not follow expectations.'
-                ).format(X_i))
-
-            if is_numeric(_A_i):
-                # In this case, if the input covers the referential value, we
-                # consider it a match. We do so in a binary manner because it
-                # would be impossible to quantify how much of the input is
-                # covered by the referential value, as the latter has no
-                # measure.
-                match = float(_A_i in _X_i)
-            elif isinstance(_A_i, interval):
-                # For this scenario, we quantify the match as the amount of the
-                # input that is contained in the referential value.
-                intrsc = _A_i & _X_i
-                try:
-                    intrsc_length = intrsc[0][1] - intrsc[0][0]
-
-                    if _X_i_length == inf:
-                        if _X_i == _A_i:
-                            match = 1.0
-                        elif intrsc_length == 0:
-                            match = 0.0
-                        else:
-                            # As no proper way of quantifying the match of infinite
-                            # intervals was found, we assume that if they are not
-                            # equal but have a non-empty infinite intersection, it
-                            # is a 0.5 match.
-                            match = 0.5
-                    else:
-                        match = float(intrsc_length / _X_i_length)
-                except IndexError:  # intersection is empty
-                    match = 0.0
-            elif isinstance(_A_i, set):
-                warn((
-                    'The referential value ({}) will be converted to a '
-                    'continuous interval to make the comparison with the input '
-                    '({}). This is not advised as may result in unexpected '
-                    'behavior. Please use an integer interval instead or '
-                    'convert the rule\'s referential value to continuous'
-                ).format(A_i, X_i))
-                _A_i_continuous = interval[min(_A_i), max(_A_i)]
-
-                match = Rule._get_antecedent_matching(
-                    _X_i,
-                    _A_i_continuous,
-                    X_i,
-                    A_i
-                )
-        elif isinstance(_X_i, set):
-            if is_numeric(_A_i):
-                # Same as the case for interval input and numeric reference.
-
-                match = float(_A_i in _X_i) / len(_X_i)
-            elif isinstance(_A_i, set):
-                intrsc_length = len(_X_i & _A_i)
-                _X_i_length = len(_X_i)
-
-                match = float(intrsc_length / _X_i_length)
-            elif isinstance(_A_i, interval):
-                # Problems might occur due to the nature of the intervals,
-                # e.g., if X_i is {1,2} and A_i is [2,3], this would result in a
-                # 0.50 match, even though the intervals share only their upper
-                # boundary.
-                warn((
-                    'comparison between integer interval input `{}` and '
-                    'continuous interval `{}` is not advised, results might '
-                    'not match the expectations.'
-                ).format(X_i, A_i))
-
-                intrsc_length = sum([
-                    _X_i_element in _A_i for _X_i_element in _X_i
-                ])
-                _X_i_length = len(_X_i)
-
-                match = float(intrsc_length / _X_i_length)
-        elif isinstance(_X_i, dict):
-            if isinstance(_A_i, str) or is_numeric(_A_i):
-                match = float(_X_i[_A_i])
-            elif isinstance(_A_i, interval) or isinstance(_A_i, set):
-                matching_certainties = [_X_i[key] for key in _X_i.keys()
-                                        if key in _A_i]
-
-                match = float(sum(matching_certainties))
-            elif isinstance(_A_i, dict):
-                raise NotImplementedError('Uncertain rules are not supported')
-        else:
-            warn('Input {} mismatches the referential value {}'.format(
-                X_i, A_i
-            ))
+        matcher = _MATCHERS[referential_kind(_A_i)][referential_kind(_X_i)]
+
+        return matcher(_X_i, _A_i, X_i, A_i)
 
-        assert isinstance(match, float)
+    def get_alternatives(self, U_i: str, A: dict = None) -> List[Any]:
+        """Returns the referential values that the antecedent may take.
+
+        Args:
+            U_i: Antecedent.
+            A: Dictionary that contains all possible referential values for
+            the antecedents. Required for `WILDCARD` antecedents.
 
-        return match
+        Returns:
+            alternatives: Raw referential values. Only the rule's referential
+            value, if the antecedent is not disjunctive.
+        """
+        if U_i not in self._disjunctive.keys():
+            return [self.A_values[U_i]]
+        elif U_i in self._wildcards:
+            assert A is not None and U_i in A.keys(), \
+                'referential values of `{}` must be provided'.format(U_i)
+
+            return list(A[U_i])
+
+        return self._disjunctive[U_i]
+
+    def get_n_expansions(self, A: dict = None) -> int:
+        """Number of rules of the expanded form of the rule (see `expand`).
+        """
+        n_expansions = 1
+        for U_i in self._disjunctive.keys():
+            n_expansions *= len(self.get_alternatives(U_i, A))
+
+        return n_expansions
+
+    def expand(self, A: dict = None) -> List['Rule']:
+        """Expands the disjunctive antecedents into multiple, plain rules.
+
+        Args:
+            A: Dictionary that contains all possible referential values for
+            the antecedents. Required if there are `WILDCARD` antecedents.
 
-    def get_matching_degree(self, X: AttributeInput) -> float:
+        Returns:
+            new_rules: One rule for each combination of the alternatives of
+            the disjunctive antecedents, in the order of `itertools.product`.
+        """
+        U_disjunctive = list(self._disjunctive.keys())
+
+        new_rules = list()
+        for combination in product(*[self.get_alternatives(U_i, A)
+                                     for U_i in U_disjunctive]):
+            new_A_values = copy(self.A_values)
+            new_A_values.update(zip(U_disjunctive, combination))
+
+            new_rules.append(Rule(
+                A_values=new_A_values,
+                beta=self.beta,
+                delta=copy(self.delta),
+                theta=self.theta,
+                matching_degree=self.matching_degree
+            ))
+
+        return new_rules
+
+    def get_matching_degree(
+            self,
+            X: AttributeInput,
+            A: dict = None
+        ) -> float:
         """Calculates the matching degree of the rule based on input `X`.
 
         Implementation based on the RIMER approach as proposed by _Yang et al._
         in "Belief rule-base inference methodology using the evidential
         reasoning Approach-RIMER", specifically eq. (6a).
+
+        For disjunctive rules, the greatest matching degree among the ones of
+        the expanded form (see `get_matching_degrees`).
+
+        Args:
+            X: Input.
+            A: Dictionary that contains all possible referential values for
+            the antecedents. Required if there are `WILDCARD` antecedents.
         """
+        if self._disjunctive:
+            return max(self.get_matching_degrees(X, A))
+
         self._assert_input(X)
 
         alphas_i = {
@@ -220,12 +716,80 @@ class Rule():
             for U_i in self.A_values.keys()
         }
 
-        if self.matching_degree == 'geometric':
-            return self._geometric_matching_degree(self.delta, alphas_i)
-        elif self.matching_degree == 'arithmetic':
-            return self._arithmetic_matching_degree(self.delta, alphas_i)
-        elif callable(self.matching_degree):
-            return self.matching_degree(self.delta, alphas_i)
+        return self._aggregate_matchings(alphas_i)
+
+    def get_matching_degrees(
+            self,
+            X: AttributeInput,
+            A: dict = None
+        ) -> List[float]:
+        """Matching degrees of each rule of the expanded form (see `expand`).
+
+        Each alternative of the disjunctive antecedents is matched to the input
+        only once.
+
+        Args:
+            X: Input.
+            A: Dictionary that contains all possible referential values for
+            the antecedents. Required if there are `WILDCARD` antecedents.
+        """
+        self._assert_input(X)
+
+        # matchings of each alternative of each antecedent
+        alphas = dict()
+        for U_i in self.A_values.keys():
+            if U_i not in self._disjunctive.keys():
+                alphas[U_i] = [self.get_antecedent_matching(U_i, X)]
+                continue
+
+            _X_i, X_kind = X.get_prepared(U_i)
+
+            alphas[U_i] = list()
+            for A_ij in self.get_alternatives(U_i, A):
+                _A_ij, matchers = _prep_referential_value(A_ij)
+
+                alphas[U_i].append(matchers[X_kind](
+                    _X_i, _A_ij, X.attr_input[U_i], A_ij
+                ))
+
+        return [
+            self._aggregate_matchings(dict(zip(alphas.keys(), combination)))
+            for combination in product(*alphas.values())
+        ]
+
+    def _aggregate_matchings(self, alphas_i: Dict[str, float]) -> float:
+        """Aggregates the antecedents' matchings into the matching degree.
+        """
+        matching_degree = self.matching_degree
+        if matching_degree == 'geometric':
+            if self._geometric_delta is None:
+                return self._geometric_matching_degree(self.delta, alphas_i)
+
+            weighted_alpha = [
+                alpha_i ** self._geometric_delta[U_i]
+                for U_i, alpha_i in alphas_i.items()
+            ]
+
+            return np.prod(weighted_alpha)
+        elif matching_degree == 'arithmetic':
+            if self._arithmetic_delta is None:
+                return self._arithmetic_matching_degree(self.delta, alphas_i)
+
+            weighted_alpha = [
+                alpha_i * self._arithmetic_delta[U_i]
+                for U_i, alpha_i in alphas_i.items()
+            ]
+
+            return np.sum(weighted_alpha)
+        elif is_registered(matching_degree):
+            func = get_matching_degree(matching_degree)
+
+            alphas = np.array([[list(alphas_i.values())]])
+            delta = np.array([[self.delta[U_i] for U_i in alphas_i.keys()]])
+
+            return func(alphas, delta)[0, 0]
+        elif callable(matching_degree):
+            return matching_degree(self.delta, alphas_i)
 
     @staticmethod
     def _arithmetic_matching_degree(
@@ -277,9 +841,8 @@ class Rule():
 
         Guarantees that all the necessary attributes are present in X.
         """
-        rule_attributes = set(self.A_values.keys())
-        input_attributes = set(X.attr_input.keys())
-        assert rule_attributes.intersection(input_attributes) == rule_attributes
+        for U_i in self.A_values.keys():
+            assert U_i in X.attr_input.keys()
 
     def __str__(self):
         A_values_str = ["({}:{})".format(U_i, A_i)
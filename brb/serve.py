@@ -0,0 +1,402 @@
+#!/usr/bin/env python
+"""Asynchronous HTTP inference server with dynamic micro-batching.
+
+Concurrent requests are queued and coalesced into micro-batches, each of them
+evaluated in a single vectorized pass (see `RuleBaseModel.run_batch`). A batch
+is dispatched as soon as it reaches `max_batch_size` inputs or its oldest input
+has waited for `max_wait` seconds.
+
+Endpoints:
+    POST /predict: Body is either one JSON object, mapping antecedents to
+    their values (as in `AttributeInput`), or a list of such objects. Answers
+    with the consequents (`D`) and the resulting `belief_degrees` (a list of
+    them, if a list of inputs was given).
+    GET /stats: Queue depth, number of requests and batches and latency
+    percentiles (in seconds).
+
+Note that JSON objects have string keys only, thus uncertain inputs over
+numerical referential values must be given as intervals (e.g., '1:1').
+
+Use it as:
+    $ python -m brb.serve rules_file.csv --port 8000
+
+or, to skip parsing the rules on startup, over a snapshot saved by
+`RuleBaseModel.save`:
+    $ python -m brb.serve model_snapshot/ --port 8000
+"""
+import asyncio
+import json
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+
+import click
+import numpy as np
+
+from .attr_input import AttributeInput
+from .brb import RuleBaseModel
+from .cli import load_model
+
+
+class MicroBatcher():
+    """Coalesces concurrent inference requests into batches.
+
+    Must be started (see `start`) from within a running event loop. The batches
+    are evaluated one at a time in a worker thread, so the event loop keeps
+    accepting requests in the meantime.
+
+    Attributes:
+        model: Model used for the inference.
+        max_batch_size: Maximum number of inputs per batch.
+        max_wait: Maximum time (in seconds) an input waits for the batch to
+        fill up.
+        n_requests: Number of inputs evaluated.
+        n_batches: Number of batches evaluated.
+    """
+    def __init__(
+            self,
+            model: RuleBaseModel,
+            max_batch_size: int = 64,
+            max_wait: float = 0.005,
+            latency_window: int = 10000
+        ):
+        assert max_batch_size > 0
+        assert max_wait >= 0
+
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+
+        self.n_requests = 0
+        self.n_batches = 0
+
+        # latencies of the most recent requests
+        self._latencies = deque(maxlen=latency_window)
+
+        self._queue = None
+        self._in_flight = 0
+        self._task = None
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def start(self):
+        """Starts dispatching batches in the running event loop.
+        """
+        self._queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._dispatch())
+
+    async def stop(self):
+        """Stops dispatching batches. Queued requests are cancelled.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        while self._queue is not None and not self._queue.empty():
+            _, future, _ = self._queue.get_nowait()
+            future.cancel()
+
+        self._executor.shutdown(wait=False)
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of inputs waiting for (or under) evaluation.
+        """
+        queued = self._queue.qsize() if self._queue is not None else 0
+
+        return queued + self._in_flight
+
+    async def submit(self, X: AttributeInput) -> List[float]:
+        """Queues `X` for inference and waits for its belief degrees.
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((X, future, time.perf_counter()))
+
+        return await future
+
+    async def _next_batch(self) -> List[Tuple]:
+        """Waits for the next batch of requests.
+        """
+        batch = [await self._queue.get()]
+
+        deadline = batch[0][2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+
+            try:
+                batch.append(
+                    await asyncio.wait_for(self._queue.get(), timeout)
+                )
+            except asyncio.TimeoutError:
+                break
+
+        # takes whatever arrived in the meantime, if there is room
+        while len(batch) < self.max_batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+
+        return batch
+
+    def _run_batch(self, inputs: List[AttributeInput]) -> List[Tuple]:
+        """Evaluates the inputs, isolating the ones that fail.
+
+        Returns:
+            results: Pairs of belief degrees and exception (`None` if
+            successful) for each input.
+        """
+        try:
+            return [(list(belief_degrees), None) for belief_degrees
+                    in self.model.run_batch(inputs)]
+        except Exception:  # at least one bad input, evaluated one by one
+            results = list()
+            for X in inputs:
+                try:
+                    results.append((self.model.run_batch([X])[0].tolist(),
+                                    None))
+                except Exception as e:
+                    results.append((None, e))
+
+            return results
+
+    async def _dispatch(self):
+        """Evaluates the batches as the requests arrive.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            self._in_flight = len(batch)
+
+            try:
+                results = await loop.run_in_executor(
+                    self._executor,
+                    self._run_batch,
+                    [X for X, _, _ in batch]
+                )
+            finally:
+                self._in_flight = 0
+
+            end = time.perf_counter()
+            for (_, future, start), (belief_degrees, e) in zip(batch, results):
+                self._latencies.append(end - start)
+
+                if future.cancelled():
+                    continue
+                elif e is not None:
+                    future.set_exception(e)
+                else:
+                    future.set_result(belief_degrees)
+
+            self.n_requests += len(batch)
+            self.n_batches += 1
+
+    def get_stats(self) -> dict:
+        """Returns the current queue depth and the server statistics.
+
+        Latency percentiles (in seconds) are computed over the most recent
+        requests, from queueing to the end of their batch's evaluation.
+        """
+        stats = {
+            'queue_depth': self.queue_depth,
+            'n_requests': self.n_requests,
+            'n_batches': self.n_batches,
+            'mean_batch_size': self.n_requests / max(self.n_batches, 1),
+        }
+
+        latencies = np.array(self._latencies)
+        for p in [50, 90, 99]:
+            stats['latency_p{}'.format(p)] = float(np.percentile(latencies, p)) \
+                                             if len(latencies) > 0 else None
+
+        return stats
+
+class InferenceServer():
+    """Minimal HTTP/1.1 server over a `MicroBatcher`.
+
+    Attributes:
+        batcher: Batcher that evaluates the requests.
+        host: Interface the server listens on.
+        port: Port the server listens on. If 0, a free port is chosen on
+        `start`.
+    """
+    def __init__(
+            self,
+            model: RuleBaseModel,
+            host: str = '127.0.0.1',
+            port: int = 8000,
+            max_batch_size: int = 64,
+            max_wait: float = 0.005
+        ):
+        self.batcher = MicroBatcher(model, max_batch_size=max_batch_size,
+                                    max_wait=max_wait)
+        self.host = host
+        self.port = port
+
+        self._server = None
+
+    async def start(self):
+        """Starts listening and dispatching batches.
+        """
+        self.batcher.start()
+        self._server = await asyncio.start_server(self._handle_connection,
+                                                  self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        """Stops listening and dispatching batches.
+        """
+        self._server.close()
+        await self._server.wait_closed()
+        await self.batcher.stop()
+
+    async def serve_forever(self):
+        """Starts the server and serves until cancelled.
+        """
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def _handle_connection(self, reader, writer):
+        """Serves the (keep-alive) requests of a connection.
+        """
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+
+                try:
+                    method, path, version = request_line.decode().split()
+                except ValueError:
+                    await self._respond(writer, 400, {'error': 'bad request'})
+                    break
+
+                headers = dict()
+                try:
+                    while True:
+                        line = await reader.readline()
+                        if line in (b'\r\n', b'\n', b''):
+                            break
+                        name, _, value = line.decode().partition(':')
+                        headers[name.strip().lower()] = value.strip()
+
+                    content_length = int(headers.get('content-length', 0))
+                    if content_length < 0:
+                        raise ValueError(content_length)
+                except ValueError:  # also, undecodable headers
+                    await self._respond(writer, 400, {'error': 'bad request'})
+                    break
+
+                body = await reader.readexactly(content_length)
+
+                try:
+                    status, response = await self._route(method, path, body)
+                except Exception as e:  # answered, instead of dropped
+                    status, response = 500, {
+                        'error': 'internal error: {!r}'.format(e)
+                    }
+
+                keep_alive = headers.get('connection', '').lower() != 'close' \
+                             and version == 'HTTP/1.1'
+                await self._respond(writer, status, response, keep_alive)
+
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method: str, path: str, body: bytes):
+        """Handles one request.
+
+        Returns:
+            status: HTTP status code.
+            response: JSON-serializable response.
+        """
+        if path == '/stats' and method == 'GET':
+            return 200, self.batcher.get_stats()
+        elif path != '/predict':
+            return 404, {'error': 'not found'}
+        elif method != 'POST':
+            return 405, {'error': 'method not allowed'}
+
+        try:
+            payload = json.loads(body)
+
+            if isinstance(payload, list):
+                inputs = [AttributeInput(attr_input) for attr_input in payload]
+            else:
+                inputs = [AttributeInput(payload)]
+        except (ValueError, TypeError, AttributeError) as e:
+            return 400, {'error': 'invalid input: {}'.format(e)}
+
+        try:
+            belief_degrees = await asyncio.gather(
+                *[self.batcher.submit(X) for X in inputs]
+            )
+        except (AssertionError, KeyError, ValueError, TypeError) as e:
+            return 422, {'error': 'inference failed: {!r}'.format(e)}
+
+        if not isinstance(payload, list):
+            belief_degrees = belief_degrees[0]
+
+        return 200, {'D': [str(D_j) for D_j in self.batcher.model.D],
+                     'belief_degrees': belief_degrees}
+
+    @staticmethod
+    async def _respond(writer, status: int, response: dict,
+                       keep_alive: bool = False):
+        """Writes a JSON response.
+        """
+        reasons = {200: 'OK', 400: 'Bad Request', 404: 'Not Found',
+                   405: 'Method Not Allowed', 422: 'Unprocessable Entity',
+                   500: 'Internal Server Error'}
+
+        body = json.dumps(response).encode()
+        head = '\r\n'.join([
+            'HTTP/1.1 {} {}'.format(status, reasons[status]),
+            'Content-Type: application/json',
+            'Content-Length: {}'.format(len(body)),
+            'Connection: {}'.format('keep-alive' if keep_alive else 'close'),
+        ])
+
+        writer.write(head.encode() + b'\r\n\r\n' + body)
+        await writer.drain()
+
+@click.command()
+@click.argument('rules', type=click.Path(exists=True))
+@click.option('--antecedent-prefix', type=click.STRING, default='A_')
+@click.option('--consequent-prefix', type=click.STRING, default='D_')
+@click.option('--deltas-prefix', type=click.STRING, default=None)
+@click.option('--host', type=click.STRING, default='127.0.0.1')
+@click.option('--port', type=click.INT, default=8000)
+@click.option('--max-batch-size', type=click.INT, default=64)
+@click.option('--max-wait', type=click.FLOAT, default=0.005,
+              help='Maximum time (in seconds) to fill up a batch.')
+def main(rules, antecedent_prefix, consequent_prefix, deltas_prefix, host,
+         port, max_batch_size, max_wait):
+    """Serves a BRB model, from rules defined in a csv file or from a model
+    snapshot directory, over HTTP.
+    """
+    model = load_model(rules, antecedent_prefix, consequent_prefix,
+                       deltas_prefix)
+
+    server = InferenceServer(model, host=host, port=port,
+                             max_batch_size=max_batch_size, max_wait=max_wait)
+
+    print('Serving {} rules on http://{}:{}'.format(len(model.rules), host,
+                                                    port))
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()  # pylint: disable=no-value-for-parameter
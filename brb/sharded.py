@@ -0,0 +1,248 @@
+r"""Inference over a rule base sharded across worker processes.
+
+The analytical ER algorithm only depends on the rules through products of one
+factor per rule (see `er.er_partials`), except for the normalization of the
+activation weights, which requires the sum of the weighted matching degrees of
+all rules. Thus, each worker process holds a compiled shard of the rules, and
+the inference is done in two rounds:
+
+    1. each shard matches the inputs and returns its sum of \theta \alpha;
+    2. given the global sum, each shard returns its partials of the analytical
+    ER algorithm, which are merged into the belief degrees of the whole rule
+    base.
+
+    Typical usage example:
+
+    >>> with model.shard(n_shards=4) as sharded_model:
+    ...     sharded_model.run(X)
+    ...     sharded_model.run_batch([X_1, X_2, X_3])
+"""
+import multiprocessing as mp
+from typing import List, Dict, Any
+
+import numpy as np
+
+from .attr_input import AttributeInput
+from .compiled import CompiledRuleBaseModel, MAX_MEMORY
+from .er import er_partials, merge_er_partials, combine_er_partials
+from .rule import Rule
+
+
+def _shard_worker(conn, compiled_model: CompiledRuleBaseModel):
+    r"""Serves the requests for one shard of the rule base.
+
+    Messages are pairs of (command, payload). 'match' takes the inputs and
+    answers the shard's sum of \theta \alpha for each input, keeping the
+    intermediate arrays for the following 'combine', which takes the global
+    sums and answers the shard's ER partials.
+    """
+    state = None
+    while True:
+        try:
+            command, payload = conn.recv()
+        except EOFError:
+            break
+
+        if command == 'close':
+            break
+
+        try:
+            if command == 'match':
+                refs_matchings, attr_completeness = \
+                    compiled_model.get_refs_matchings(payload)
+                state = compiled_model.get_weighted_matchings(
+                    refs_matchings,
+                    attr_completeness
+                )
+
+                result = np.sum(state[0], axis=-1)
+            elif command == 'combine':
+                theta_alphas, belief_degrees = state
+                state = None
+
+                result = er_partials(
+                    theta_alphas / payload[:, np.newaxis],
+                    belief_degrees,
+                    log_space=compiled_model.log_space
+                )
+            else:
+                raise ValueError('Unknown command `{}`'.format(command))
+        except Exception as e:  # forwarded to the main process
+            conn.send(('error', e))
+        else:
+            conn.send(('ok', result))
+
+    conn.close()
+
+class ShardedRuleBaseModel():
+    """Rule base partitioned across worker processes.
+
+    Each shard is a `CompiledRuleBaseModel` over a contiguous part of the
+    rules, held by a dedicated process for the lifetime of the model. Results
+    are the same as `RuleBaseModel.run`, up to floating point rounding.
+
+    Custom matching degree functions must be available to the workers, which
+    holds for registered functions and callables under the 'fork' start
+    method, but requires the registration to happen on import under 'spawn'.
+
+    Attributes:
+        U: Antecedent attributes' names.
+        D: Consequent referential values.
+        n_shards: Number of shards (and worker processes).
+        log_space: Whether the analytical ER algorithm is computed in log
+        space.
+    """
+    def __init__(
+            self,
+            U: List[str],
+            D: List[Any],
+            rules: List[Rule],
+            n_shards: int = None,
+            log_space: bool = False,
+            mp_context: str = None,
+            A: Dict[str, List[Any]] = None
+        ):
+        """Compiles the shards and starts their worker processes.
+
+        Args:
+            U: Antecedent attributes' names.
+            D: Consequent referential values.
+            rules: Rules of the rule base.
+            n_shards: Number of shards. If `None`, one per CPU. There is at
+            most one shard per rule.
+            log_space: Whether the analytical ER algorithm is computed in log
+            space.
+            mp_context: Start method of the worker processes (see
+            `multiprocessing.get_context`). If `None`, the platform's default.
+            A: Dictionary that contains all possible referential values for
+            the antecedents. Required if there are "don't care" antecedents.
+        """
+        self.U = list(U)
+        self.D = list(D)
+        self.log_space = log_space
+
+        if n_shards is None:
+            n_shards = mp.cpu_count()
+        assert n_shards > 0
+        self.n_shards = max(1, min(n_shards, len(rules)))
+
+        ctx = mp.get_context(mp_context)
+
+        self._shards_sizes = list()
+        self._conns = list()
+        self._workers = list()
+        for shard in np.array_split(np.arange(len(rules)), self.n_shards):
+            compiled_shard = CompiledRuleBaseModel.from_rules(
+                self.U,
+                self.D,
+                [rules[k] for k in shard],
+                log_space=log_space,
+                A=A
+            )
+
+            conn, worker_conn = ctx.Pipe()
+            worker = ctx.Process(target=_shard_worker,
+                                 args=(worker_conn, compiled_shard),
+                                 daemon=True)
+            worker.start()
+            worker_conn.close()
+
+            if not self._workers:
+                # the first shard is the largest one, thus the one that bounds
+                # the chunk size
+                self._get_chunk_size = compiled_shard.get_chunk_size
+
+            self._shards_sizes.append(len(shard))
+            self._conns.append(conn)
+            self._workers.append(worker)
+
+    def __len__(self):
+        return sum(self._shards_sizes)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Stops the worker processes.
+        """
+        for conn, worker in zip(self._conns, self._workers):
+            try:
+                conn.send(('close', None))
+            except (BrokenPipeError, OSError):
+                pass
+            conn.close()
+            worker.join()
+
+        self._conns = list()
+        self._workers = list()
+
+    def _broadcast(self, command: str, payload: Any) -> List[Any]:
+        """Sends the same request to every shard and gathers the answers.
+        """
+        assert len(self._conns) > 0, 'model is closed'
+
+        for conn in self._conns:
+            conn.send((command, payload))
+
+        results = [conn.recv() for conn in self._conns]
+        for status, result in results:
+            if status == 'error':
+                raise result
+
+        return [result for _, result in results]
+
+    def _run_chunk(self, inputs) -> np.ndarray:
+        """Runs the inference for a chunk of inputs over all the shards.
+        """
+        # 3. activation weight, normalized over all shards
+        total_theta_alpha = np.sum(self._broadcast('match', inputs), axis=0)
+        total_theta_alpha[total_theta_alpha == 0] = 1
+
+        # 5. analytical ER algorithm
+        partials = merge_er_partials(
+            self._broadcast('combine', total_theta_alpha),
+            log_space=self.log_space
+        )
+
+        return combine_er_partials(partials, log_space=self.log_space)
+
+    def run(self, X: AttributeInput) -> List[float]:
+        """Infer the output based on the RIMER approach.
+
+        Same as `RuleBaseModel.run`, but computed over the shards.
+
+        Args:
+            X: Attribute's data to be fed to the rules.
+        """
+        return list(self.run_batch([X])[0])
+
+    def run_batch(self, inputs, max_memory: int = MAX_MEMORY) -> np.ndarray:
+        """Infer the output for many inputs at once.
+
+        Args:
+            inputs: Either a sequence of `AttributeInput` or a
+            `pandas.DataFrame` with one column per antecedent.
+            max_memory: Memory budget (in bytes) for the intermediate arrays
+            of each shard.
+
+        Returns:
+            belief_degrees: Resulting belief degrees, shape (N, |D|).
+        """
+        n_inputs = len(inputs)
+        chunk_size = self._get_chunk_size(max_memory)
+
+        belief_degrees = np.empty((n_inputs, len(self.D)))
+        for start in range(0, n_inputs, chunk_size):
+            chunk = slice(start, start + chunk_size)
+
+            if hasattr(inputs, 'iloc'):  # pandas.DataFrame
+                chunk_inputs = inputs.iloc[chunk]
+            else:
+                chunk_inputs = inputs[chunk]
+
+            belief_degrees[chunk] = self._run_chunk(chunk_inputs)
+
+        return belief_degrees
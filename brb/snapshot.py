@@ -0,0 +1,352 @@
+"""Binary, memory-mappable snapshots of rule base models.
+
+A snapshot is a directory with the rules encoded as NumPy arrays (one `.npy`
+file each) and a JSON file with the model settings and the tables of distinct
+referential values that the arrays' codes refer to:
+
+    metadata.json: Format version, model settings (`U`, `D`, `A`, ...) and,
+    for each antecedent, its distinct referential values.
+    rules_*.npy: Rules as defined, one row per rule (see `encode_rules`).
+    compiled_*.npy: Rows of the compiled model (see `CompiledRuleBaseModel`)
+    if they differ from the rules', i.e., if there are disjunctive rules, and
+    the arrays derived from them. The parameters of the rules are the same
+    for both.
+    index_*.npy: Rules sorted by referential value, which `index.RuleIndex`
+    is built from (see `index.get_codes_order`).
+
+Everything derived from the rules is computed when saving. Loading
+memory-maps the arrays, so that processes that load the same snapshot share
+one physical copy of them, and the rules are stored over them (see
+`store.RuleStore`), as views created only when accessed. Thus, besides the
+pages of the arrays read by the OS, loading time depends on the number of
+distinct referential values rather than on the number of rules, as long as
+`mmap` is `True`. Otherwise, the arrays are read into memory.
+
+    Typical usage example:
+
+    >>> model.save('model_snapshot')
+    >>> model = RuleBaseModel.load('model_snapshot')
+    >>> model.run_batch([X_1, X_2, X_3])
+"""
+import json
+import os
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from interval import interval
+
+from .compiled import CompiledRuleBaseModel, _hashable
+from .index import RuleIndex, get_codes_order
+from .matching_degree import is_registered
+from .rule import AnyOf, Rule
+from .store import ARRAYS, RuleStore
+
+# version of the snapshot format, increased on incompatible changes
+FORMAT_VERSION = 3
+
+METADATA_FILENAME = 'metadata.json'
+
+# arrays of the encoded rules, see `encode_rules`
+RULES_ARRAYS = ARRAYS
+# arrays of the rows of the compiled model, whose parameters are the ones of
+# the encoded rules. Only the ones derived from the rows are saved if rows
+# and rules are the same
+COMPILED_ARRAYS = ('A_codes', 'rules_ids', 'n_antecedents', 'used')
+# arrays of the rules sorted by referential value, see `get_codes_order`
+INDEX_ARRAYS = ('order', 'always')
+
+
+def _encode_value(value: Any) -> Any:
+    """Converts a referential value into a JSON-serializable one.
+
+    Strings and numbers are kept, while sets, intervals and disjunctive
+    values (see `AnyOf`) are tagged, e.g., `{'set': [1, 2]}`.
+    """
+    if isinstance(value, np.generic):
+        value = value.item()
+
+    if isinstance(value, (str, int, float)) or value is None:
+        return value
+    elif isinstance(value, (set, frozenset)):
+        return {'set': [_encode_value(v) for v in sorted(value)]}
+    elif isinstance(value, interval):
+        return {'interval': [list(component) for component in value]}
+    elif isinstance(value, AnyOf):
+        return {'or': [_encode_value(v) for v in value.alternatives]}
+
+    raise ValueError('Referential value `{}` cannot be saved'.format(value))
+
+def _decode_value(value: Any) -> Any:
+    """Inverse of `_encode_value`.
+    """
+    if not isinstance(value, dict):
+        return value
+
+    (tag, values), = value.items()
+    if tag == 'set':
+        return set(_decode_value(v) for v in values)
+    elif tag == 'interval':
+        return interval(*[tuple(component) for component in values])
+    elif tag == 'or':
+        return AnyOf([_decode_value(v) for v in values])
+
+    raise ValueError('Unknown referential value tag `{}`'.format(tag))
+
+def encode_rules(
+        U: List[str],
+        D: List[Any],
+        rules: List[Rule]
+    ) -> Tuple[List[List[Any]], Dict[str, np.ndarray], List[str]]:
+    """Encodes the rules, as defined, into arrays.
+
+    Same encoding as `CompiledRuleBaseModel.from_rules`, but disjunctive
+    referential values are encoded as they are, instead of expanded. Rules
+    stored in a `RuleStore` are already encoded.
+
+    Returns:
+        A_refs: For each antecedent, list of the distinct referential values
+        used by the rules.
+        arrays: `RULES_ARRAYS`, one row per rule.
+        matching_degrees: Names of the matching degree functions of the
+        rules, indexed by the 'matching_degree' array.
+    """
+    if isinstance(rules, RuleStore):
+        # arbitrary functions cannot be saved
+        for matching_degree in rules.matching_degrees:
+            if not is_registered(matching_degree):
+                raise ValueError(
+                    'Matching degree `{}` is not registered, thus cannot be '
+                    'saved'.format(matching_degree)
+                )
+
+        return rules.A_refs, rules.arrays, list(rules.matching_degrees)
+
+    n_rules = len(rules)
+
+    A_refs = [list() for _ in U]
+    A_refs_codes = [dict() for _ in U]
+    arrays = {
+        'A_codes': np.full((n_rules, len(U)), -1, dtype=np.int32),
+        'theta': np.empty(n_rules),
+        'beta': np.zeros((n_rules, len(D))),
+        'delta': np.zeros((n_rules, len(U))),
+        'matching_degree': np.empty(n_rules, dtype=np.int16),
+    }
+    matching_degrees = list()
+
+    for k, rule in enumerate(rules):
+        for i, U_i in enumerate(U):
+            if U_i not in rule.A_values.keys():
+                continue
+
+            A_i = rule.A_values[U_i]
+            A_i_key = _hashable(A_i)
+            if isinstance(A_i, list):
+                A_i_key = tuple(A_i)
+            if A_i_key not in A_refs_codes[i].keys():
+                A_refs_codes[i][A_i_key] = len(A_refs[i])
+                A_refs[i].append(A_i)
+
+            arrays['A_codes'][k, i] = A_refs_codes[i][A_i_key]
+            arrays['delta'][k, i] = rule.delta[U_i]
+
+        arrays['theta'][k] = rule.theta
+        arrays['beta'][k] = rule.beta
+
+        # arbitrary functions cannot be saved
+        if not is_registered(rule.matching_degree):
+            raise ValueError(
+                'Matching degree `{}` is not registered, thus cannot be '
+                'saved'.format(rule.matching_degree)
+            )
+        if rule.matching_degree not in matching_degrees:
+            matching_degrees.append(rule.matching_degree)
+        arrays['matching_degree'][k] = matching_degrees.index(
+            rule.matching_degree
+        )
+
+    return A_refs, arrays, matching_degrees
+
+def _save_arrays(path: str, prefix: str, arrays: Dict[str, np.ndarray]):
+    for name, array in arrays.items():
+        np.save(os.path.join(path, '{}_{}.npy'.format(prefix, name)),
+                np.ascontiguousarray(array))
+
+def _load_arrays(
+        path: str,
+        prefix: str,
+        names: Tuple[str, ...],
+        mmap: bool
+    ) -> Dict[str, np.ndarray]:
+    return {
+        name: np.load(os.path.join(path, '{}_{}.npy'.format(prefix, name)),
+                      mmap_mode='r' if mmap else None)
+        for name in names
+    }
+
+def save_model(model, path: str):
+    """Saves a `RuleBaseModel` as a snapshot directory.
+
+    The directory is created if it does not exist, and its snapshot files
+    are overwritten.
+
+    Args:
+        model: Model to be saved. The matching degree functions of its rules
+        must be registered (see `matching_degree.register_matching_degree`).
+        path: Path of the snapshot directory.
+    """
+    U, D = list(model.U), list(model.D)
+    A_refs, rules_arrays, matching_degrees = encode_rules(U, D, model.rules)
+
+    os.makedirs(path, exist_ok=True)
+
+    _save_arrays(path, 'rules', rules_arrays)
+
+    # disjunctive rules are compiled into more rows than rules
+    if isinstance(model.rules, RuleStore):
+        expanded = bool(model.rules.get_disjunctive())
+    else:
+        expanded = any(rule.disjunctive for rule in model.rules)
+    if expanded:
+        compiled_model = model.get_compiled()
+        compiled_arrays = {
+            'A_codes': compiled_model.A_codes,
+            'rules_ids': compiled_model.rules_ids,
+            'n_antecedents': compiled_model.n_antecedents,
+            'used': compiled_model.used,
+        }
+    else:
+        present = rules_arrays['A_codes'] >= 0
+        compiled_arrays = {
+            'n_antecedents': present.sum(axis=1),
+            'used': present.any(axis=0),
+        }
+    # `None` if rows and rules are the same
+    compiled_arrays = {name: array for name, array in compiled_arrays.items()
+                       if array is not None}
+    _save_arrays(path, 'compiled', compiled_arrays)
+
+    store = model.rules if isinstance(model.rules, RuleStore) \
+            else RuleStore(U, D, A_refs, rules_arrays, matching_degrees)
+    order, bounds, always = get_codes_order(store)
+    _save_arrays(path, 'index', {'order': order, 'always': always})
+
+    if model.A is None:
+        A = None
+    else:
+        A = {U_i: [_encode_value(A_i) for A_i in A_values]
+             for U_i, A_values in model.A.items()}
+
+    metadata = {
+        'format_version': FORMAT_VERSION,
+        'U': U,
+        'D': [_encode_value(D_j) for D_j in D],
+        'A': A,
+        'log_space': model.log_space,
+        'utilities': None if model.utilities is None \
+                     else [float(u) for u in model.utilities],
+        'missing_as_wildcard': model.missing_as_wildcard,
+        'parse_disjunctive': model.parse_disjunctive,
+        'n_rules': len(model.rules),
+        'rules': {
+            'A_refs': [[_encode_value(A_i) for A_i in A_refs_i]
+                       for A_refs_i in A_refs],
+            'matching_degrees': matching_degrees,
+        },
+        'compiled': {
+            'A_refs': None,
+            'arrays': list(compiled_arrays.keys()),
+        },
+        'index': {
+            'bounds': bounds,
+        },
+    }
+    if expanded:
+        metadata['compiled']['A_refs'] = [
+            [_encode_value(A_i) for A_i in A_refs_i]
+            for A_refs_i in compiled_model.A_refs
+        ]
+
+    # written last, so that incomplete snapshots cannot be loaded
+    with open(os.path.join(path, METADATA_FILENAME), 'w') as f:
+        json.dump(metadata, f)
+
+def read_snapshot(
+        path: str,
+        mmap: bool = True
+    ) -> Tuple[dict, RuleStore, CompiledRuleBaseModel, RuleIndex]:
+    """Reads a snapshot saved by `save_model`.
+
+    Args:
+        path: Path of the snapshot directory.
+        mmap: If `True`, the arrays are memory-mapped (read-only) instead of
+        read into memory.
+
+    Returns:
+        settings: Keyword arguments of `RuleBaseModel`.
+        rules: Rules of the model, stored over the arrays.
+        compiled_model: Compiled version of the model.
+        index: Index of the rules by referential value.
+
+    Raises:
+        ValueError: In case the snapshot format is not supported.
+    """
+    with open(os.path.join(path, METADATA_FILENAME)) as f:
+        metadata = json.load(f)
+
+    if metadata.get('format_version') != FORMAT_VERSION:
+        raise ValueError('Unsupported snapshot format version `{}`'.format(
+            metadata.get('format_version')
+        ))
+
+    U = metadata['U']
+    D = [_decode_value(D_j) for D_j in metadata['D']]
+
+    A = metadata['A']
+    if A is not None:
+        A = {U_i: [_decode_value(A_i) for A_i in A_values]
+             for U_i, A_values in A.items()}
+
+    settings = {
+        'U': U,
+        'D': D,
+        'A': A,
+        'log_space': metadata['log_space'],
+        'utilities': metadata['utilities'],
+        'missing_as_wildcard': metadata['missing_as_wildcard'],
+        'parse_disjunctive': metadata['parse_disjunctive'],
+    }
+
+    rules_A_refs = [[_decode_value(A_i) for A_i in A_refs_i]
+                    for A_refs_i in metadata['rules']['A_refs']]
+    rules_arrays = _load_arrays(path, 'rules', RULES_ARRAYS, mmap)
+    rules = RuleStore(U, D, rules_A_refs, rules_arrays,
+                      metadata['rules']['matching_degrees'])
+
+    # the rows of the compiled model are the rules' unless saved
+    compiled_A_refs = rules_A_refs
+    if metadata['compiled']['A_refs'] is not None:
+        compiled_A_refs = [[_decode_value(A_i) for A_i in A_refs_i]
+                           for A_refs_i in metadata['compiled']['A_refs']]
+    compiled_arrays = dict(rules_arrays, **_load_arrays(
+        path, 'compiled', tuple(metadata['compiled']['arrays']), mmap
+    ))
+
+    compiled_model = CompiledRuleBaseModel(
+        U=U,
+        D=D,
+        A_refs=compiled_A_refs,
+        matching_degrees=metadata['rules']['matching_degrees'],
+        log_space=metadata['log_space'],
+        **compiled_arrays
+    )
+
+    index_arrays = _load_arrays(path, 'index', INDEX_ARRAYS, mmap)
+    index = RuleIndex.from_store(rules, codes_order=(
+        index_arrays['order'],
+        metadata['index']['bounds'],
+        index_arrays['always']
+    ))
+
+    return settings, rules, compiled_model, index
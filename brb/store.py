@@ -0,0 +1,549 @@
+"""Struct-of-arrays storage of the rules of a model.
+
+`RuleBaseModel` keeps its rules as parallel arrays, one row per rule, instead
+of one `Rule` object (and its dictionaries) per rule. The referential values
+are encoded as codes into tables of the distinct referential values of each
+antecedent, which are parsed only once.
+
+The store is a sequence of rules all the same: indexing or iterating it
+returns views over its rows (see `Rule.view`), created on access. Rules added
+to the store are encoded into its arrays, and become views of their row (see
+`Rule.bind`), thus changing them changes the store, as with a list.
+
+    Typical usage example:
+
+    >>> store = RuleStore(U=['A_1', 'A_2'], D=['good', 'bad'])
+    >>> store.append(Rule(A_values={'A_1': 'l', 'A_2': 'h'}, beta=[1, 0]))
+    >>> store[0].A_values
+    {'A_1': 'l', 'A_2': 'h'}
+    >>> store.arrays['A_codes']
+    array([[0, 0]], dtype=int32)
+"""
+from collections.abc import MutableSequence
+from copy import copy
+from typing import Any, Callable, Dict, Iterator, List, Tuple, Union
+
+import numpy as np
+
+from .compiled import CompiledRuleBaseModel, _hashable
+from .matching_degree import is_registered
+from .rule import Rule, prep_antecedent
+
+# arrays of the rules, one row per rule, see `RuleStore`
+ARRAYS = ('A_codes', 'theta', 'beta', 'delta', 'matching_degree')
+
+# maximum number of views kept, along with what they read from their row
+MAX_VIEWS = 4096
+
+
+def _get_key(A_i: Any) -> Any:
+    """Hashable version of a referential value, as defined in a rule.
+    """
+    key = _hashable(A_i)
+    if isinstance(A_i, list):
+        key = tuple(A_i)
+
+    try:
+        hash(key)
+    except TypeError:
+        key = repr(A_i)
+
+    return key
+
+class RuleStore(MutableSequence):
+    """Rules stored as parallel arrays, one row per rule.
+
+    The arrays (see `arrays`) are:
+        A_codes: Code of the referential value of each antecedent, i.e., its
+        index in `A_refs`, -1 if the rule does not refer to the antecedent,
+        shape (K, |U|).
+        theta: Rules' weights, shape (K,).
+        beta: Belief degrees, shape (K, |D|).
+        delta: Attribute weights, 0 for the antecedents that the rule does
+        not refer to, shape (K, |U|).
+        matching_degree: Matching degree of each rule, as its index in
+        `matching_degrees`, shape (K,).
+
+    The arrays are allocated with room for more rows, so that adding rules
+    one by one takes amortized constant time. Read-only (e.g., memory-mapped)
+    arrays are copied before the first change.
+
+    Up to `MAX_VIEWS` views are kept, so that the rules used over and over
+    (e.g., by `RuleBaseModel.run`) are not decoded each time. They are
+    dropped when the rows change.
+
+    Views refer to their row by position, as `Rule.view`: once rules are
+    inserted, removed or reversed, the views taken before (and the rules
+    added to the store) refer to whichever rule is now at their position,
+    thus new views must be taken.
+
+    Attributes:
+        U: Antecedents' names.
+        D: Consequent referential values.
+        A_refs: For each antecedent, the distinct referential values, as
+        defined in the rules (e.g., `AnyOf(['l', 'm'])`), that the codes
+        refer to.
+        matching_degrees: Distinct matching degrees (names or functions) that
+        the 'matching_degree' array refers to.
+        version: Number of changes of the rows so far, e.g., to invalidate
+        the results computed from them.
+    """
+    def __init__(
+            self,
+            U: List[str],
+            D: List[Any],
+            A_refs: List[List[Any]] = None,
+            arrays: Dict[str, np.ndarray] = None,
+            matching_degrees: List[Union[str, Callable]] = None
+        ):
+        """Creates an empty store, or one over already encoded rules.
+
+        Args:
+            U: Antecedents' names.
+            D: Consequent referential values.
+            A_refs: Distinct referential values of each antecedent.
+            arrays: `ARRAYS` of the encoded rules, used as they are.
+            matching_degrees: Distinct matching degrees of the rules.
+        """
+        self.U = list(U)
+        self.D = list(D)
+
+        if arrays is None:
+            arrays = {
+                'A_codes': np.full((0, len(U)), -1, dtype=np.int32),
+                'theta': np.empty(0),
+                'beta': np.empty((0, len(D))),
+                'delta': np.empty((0, len(U))),
+                'matching_degree': np.empty(0, dtype=np.int16),
+            }
+        self._arrays = dict(arrays)
+        self._n_rules = arrays['theta'].shape[0]
+
+        if A_refs is None:
+            A_refs = [list() for _ in U]
+        self.A_refs = [list(A_refs_i) for A_refs_i in A_refs]
+        self.matching_degrees = list() if matching_degrees is None \
+                                else list(matching_degrees)
+
+        # maps the hashable referential values to their code
+        self._codes = [{_get_key(A_i): code
+                        for code, A_i in enumerate(A_refs_i)}
+                       for A_refs_i in self.A_refs]
+        # parsed referential values (see `prep_antecedent`), `None` until
+        # first used
+        self._prepared = [len(A_refs_i) * [None, ] for A_refs_i in self.A_refs]
+
+        # views of the rows, see `__getitem__`
+        self._views = dict()
+
+        self.version = 0
+
+    @classmethod
+    def from_rules(cls, U: List[str], D: List[Any], rules: List[Rule]):
+        """Encodes `rules` into a new store.
+        """
+        store = cls(U, D)
+        store._reserve(len(rules))
+        # the rules are not bound to the new store, see `append`
+        for k, rule in enumerate(rules):
+            store._write(k, store._read(rule))
+        store._n_rules = len(rules)
+
+        return store
+
+    @property
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """`ARRAYS` of the rules, as views of the store's rows.
+        """
+        return {name: array[:self._n_rules]
+                for name, array in self._arrays.items()}
+
+    def _reserve(self, n_rows: int):
+        """Makes room for `n_rows` rows, and makes the arrays writable.
+
+        Called before each change of the rows, thus increases `version`.
+        """
+        self.version += 1
+
+        capacity = self._arrays['theta'].shape[0]
+        if n_rows <= capacity and all(array.flags.writeable
+                                      for array in self._arrays.values()):
+            return
+
+        if n_rows > capacity:
+            capacity = max(n_rows, 2 * capacity)
+
+        for name, array in self._arrays.items():
+            new_array = np.empty((capacity, ) + array.shape[1:],
+                                 dtype=array.dtype)
+            new_array[:self._n_rules] = array[:self._n_rules]
+            self._arrays[name] = new_array
+
+    def _get_code(self, i: int, A_i: Any) -> int:
+        """Code of a referential value of the i-th antecedent, added if new.
+        """
+        key = _get_key(A_i)
+        try:
+            return self._codes[i][key]
+        except KeyError:
+            code = len(self.A_refs[i])
+            self._codes[i][key] = code
+            self.A_refs[i].append(A_i)
+            self._prepared[i].append(None)
+
+            return code
+
+    def _get_prepared(self, i: int, code: int) -> Tuple:
+        """Parsed referential value of the i-th antecedent, see `_get_code`.
+        """
+        prepared = self._prepared[i][code]
+        if prepared is None:
+            prepared = prep_antecedent(self.A_refs[i][code])
+            self._prepared[i][code] = prepared
+
+        return prepared
+
+    def _get_matching_degree_code(
+            self,
+            matching_degree: Union[str, Callable]
+        ) -> int:
+        if matching_degree not in self.matching_degrees:
+            self.matching_degrees.append(matching_degree)
+
+        return self.matching_degrees.index(matching_degree)
+
+    @staticmethod
+    def _read(rule: Rule) -> Tuple:
+        """Reads the attributes of a rule, before any row is changed.
+        """
+        beta = rule.beta
+        if isinstance(beta, np.ndarray):
+            beta = beta.copy()
+
+        return (rule.A_values, rule.delta, rule.theta, beta,
+                rule.matching_degree)
+
+    def _write(self, k: int, values: Tuple):
+        """Encodes the attributes of a rule (see `_read`) into the k-th row.
+        """
+        A_values, delta, theta, beta, matching_degree = values
+
+        self._views.pop(k, None)
+
+        A_codes = self._arrays['A_codes'][k]
+        A_codes[:] = -1
+        weights = self._arrays['delta'][k]
+        weights[:] = 0
+        n_antecedents = 0
+        for i, U_i in enumerate(self.U):
+            if U_i in A_values.keys():
+                A_codes[i] = self._get_code(i, A_values[U_i])
+                weights[i] = delta[U_i]
+                n_antecedents += 1
+
+        # all reference values must be related to an attribute
+        assert n_antecedents == len(A_values)
+
+        self._arrays['theta'][k] = theta
+        self._arrays['beta'][k] = beta
+        self._arrays['matching_degree'][k] = self._get_matching_degree_code(
+            matching_degree
+        )
+
+    def get_row(self, k: int) -> Tuple[Dict[str, Any], List, Dict[str, float]]:
+        """Decodes the antecedents and attribute weights of the k-th rule.
+
+        Returns:
+            A_values: Referential value of each antecedent of the rule, in the
+            order of `U`.
+            prepared: Parsed `A_values`, see `prep_antecedent`.
+            delta: Attribute weight of each antecedent of the rule.
+        """
+        A_values = dict()
+        prepared = list()
+        delta = dict()
+
+        weights = self._arrays['delta'][k].tolist()
+        for i, code in enumerate(self._arrays['A_codes'][k].tolist()):
+            if code >= 0:
+                U_i = self.U[i]
+                A_values[U_i] = self.A_refs[i][code]
+                prepared.append(self._prepared[i][code]
+                                or self._get_prepared(i, code))
+                delta[U_i] = weights[i]
+
+        return A_values, prepared, delta
+
+    def get_field(self, k: int, name: str) -> Any:
+        """Returns the theta, beta or matching degree of the k-th rule.
+
+        beta is returned as a read-only view of the row, thus changes must go
+        through `set_field`, which increases `version`.
+        """
+        value = self._arrays[name][k]
+        if name == 'theta':
+            return float(value)
+        elif name == 'matching_degree':
+            return self.matching_degrees[value]
+
+        value = value.view()
+        value.setflags(write=False)
+
+        return value
+
+    def set_field(self, k: int, name: str, value: Any):
+        """Sets the theta, beta or matching degree of the k-th rule.
+        """
+        self._reserve(self._n_rules)
+
+        if name == 'matching_degree':
+            value = self._get_matching_degree_code(value)
+        self._arrays[name][k] = value
+
+    def set_parameters(
+            self,
+            rules: np.ndarray,
+            theta: np.ndarray,
+            beta: np.ndarray,
+            delta: np.ndarray
+        ):
+        """Sets the parameters of many rules at once, e.g., once trained.
+
+        Args:
+            rules: Rules to be changed, shape (R,).
+            theta: Rules' weights, shape (R,).
+            beta: Belief degrees, shape (R, |D|).
+            delta: Attribute weights, shape (R, |U|). Only the weights of the
+            antecedents that each rule refers to are set.
+        """
+        self._reserve(self._n_rules)
+        self._views.clear()
+
+        self._arrays['theta'][rules] = theta
+        self._arrays['beta'][rules] = beta
+        self._arrays['delta'][rules] = np.where(
+            self._arrays['A_codes'][rules] >= 0, delta, 0
+        )
+
+    def extend_columns(
+            self,
+            A: np.ndarray,
+            missing: np.ndarray,
+            beta: np.ndarray,
+            delta: np.ndarray,
+            theta: np.ndarray,
+            matching_degree: Union[str, Callable]
+        ):
+        """Encodes the rules of a rules table at once, given by columns.
+
+        Args:
+            A: Referential values, shape (K, |U|).
+            missing: Whether each rule does not refer to each antecedent,
+            shape (K, |U|).
+            beta: Belief degrees, shape (K, |D|).
+            delta: Attribute weights, shape (K, |U|).
+            theta: Rules' weights, shape (K,).
+            matching_degree: Matching degree of all the rules.
+        """
+        n_new = A.shape[0]
+        rows = slice(self._n_rules, self._n_rules + n_new)
+        self._reserve(rows.stop)
+
+        A_codes = self._arrays['A_codes'][rows]
+        for i in range(len(self.U)):
+            present = ~missing[:, i]
+            A_codes[:, i] = -1
+            A_codes[present, i] = [self._get_code(i, A_i)
+                                   for A_i in A[present, i]]
+
+        self._arrays['delta'][rows] = np.where(missing, 0, delta)
+        self._arrays['theta'][rows] = theta
+        self._arrays['beta'][rows] = beta
+        self._arrays['matching_degree'][rows] = \
+            self._get_matching_degree_code(matching_degree)
+
+        self._n_rules = rows.stop
+
+    def get_disjunctive(self, rows: slice = slice(None)) -> Dict[str, bool]:
+        """Antecedents with disjunctive referential values in the given rows.
+
+        Returns:
+            disjunctive: Maps each antecedent with disjunctive referential
+            values to whether any of them is a "don't care" one.
+        """
+        A_codes = self.arrays['A_codes'][rows]
+
+        disjunctive = dict()
+        for i, U_i in enumerate(self.U):
+            codes = [code for code in range(len(self.A_refs[i]))
+                     if self._get_prepared(i, code)[0] is not None]
+            used = [code for code in codes if (A_codes[:, i] == code).any()]
+            if used:
+                disjunctive[U_i] = any(
+                    len(self._get_prepared(i, code)[0]) == 0 for code in used
+                )
+
+        return disjunctive
+
+    def compile(
+            self,
+            log_space: bool = False,
+            A: Dict[str, List[Any]] = None
+        ) -> CompiledRuleBaseModel:
+        """Compiles the rules, see `CompiledRuleBaseModel.from_rules`.
+
+        Unless there are disjunctive rules or matching degrees that are not
+        registered, the arrays of the compiled model are copies of the
+        store's.
+        """
+        if self.get_disjunctive() or not all(
+                is_registered(matching_degree)
+                for matching_degree in self.matching_degrees):
+            return CompiledRuleBaseModel.from_rules(self.U, self.D, self,
+                                                    log_space=log_space, A=A)
+
+        arrays = self.arrays
+
+        return CompiledRuleBaseModel(
+            U=self.U,
+            D=self.D,
+            A_refs=[list(A_refs_i) for A_refs_i in self.A_refs],
+            matching_degrees=list(self.matching_degrees),
+            log_space=log_space,
+            **{name: array.copy() for name, array in arrays.items()}
+        )
+
+    def expand(self, A: Dict[str, List[Any]]) -> 'RuleStore':
+        """Expands the rules with empty antecedents.
+
+        Same as `RuleBaseModel.expand_rules`: the new antecedents' weight is
+        the average of the rule's weights.
+
+        Returns:
+            expanded: New store with the expanded rules, in the same order as
+            `RuleBaseModel.expand_rules`.
+        """
+        expanded = RuleStore(self.U, self.D, A_refs=self.A_refs,
+                             arrays={name: array.copy() for name, array
+                                     in self.arrays.items()},
+                             matching_degrees=self.matching_degrees)
+
+        arrays = expanded._arrays
+        for i, U_i in enumerate(self.U):
+            codes_i = np.array([expanded._get_code(i, A_i) for A_i in A[U_i]],
+                               dtype=np.int32)
+
+            # rules without the antecedent are repeated once per value
+            present = arrays['A_codes'] >= 0
+            missing = ~present[:, i]
+            counts = np.where(missing, len(codes_i), 1)
+            starts = np.cumsum(counts) - counts
+
+            mean_delta = np.sum(arrays['delta'], axis=1) \
+                         / np.maximum(present.sum(axis=1), 1)
+            mean_delta[~present.any(axis=1)] = 1
+
+            arrays = {name: np.repeat(array, counts, axis=0)
+                      for name, array in arrays.items()}
+
+            missing = np.repeat(missing, counts)
+            positions = np.arange(len(missing)) - np.repeat(starts, counts)
+            arrays['A_codes'][missing, i] = codes_i[positions[missing]]
+            arrays['delta'][missing, i] = \
+                np.repeat(mean_delta, counts)[missing]
+
+        expanded._arrays = arrays
+        expanded._n_rules = arrays['theta'].shape[0]
+
+        return expanded
+
+    def __len__(self):
+        return self._n_rules
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[k] for k in range(*index.indices(len(self)))]
+
+        k = range(len(self))[index]
+        try:
+            return self._views[k]
+        except KeyError:
+            pass
+
+        if len(self._views) >= MAX_VIEWS:
+            self._views.clear()
+
+        rule = Rule.view(self, k)
+        self._views[k] = rule
+
+        return rule
+
+    def __iter__(self) -> Iterator[Rule]:
+        for k in range(len(self)):
+            yield self[k]
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            # views of the changed rows are copied first
+            rules = [copy(rule) for rule in value]
+            rows = range(*index.indices(len(self)))
+            if len(rows) != len(rules):
+                assert index.step in (None, 1), \
+                    'extended slices must keep the number of rules'
+                del self[index]
+                for offset, rule in enumerate(rules):
+                    self.insert(rows.start + offset, rule)
+                return
+
+            self._reserve(self._n_rules)
+            for k, rule in zip(rows, rules):
+                self._write(k, self._read(rule))
+            return
+
+        k = range(len(self))[index]
+
+        values = self._read(value)
+        self._reserve(self._n_rules)
+        self._write(k, values)
+        value.bind(self, k)
+
+    def __delitem__(self, index):
+        keep = np.ones(self._n_rules, dtype=bool)
+        keep[index] = False
+
+        self._reserve(self._n_rules)
+        self._views.clear()
+        for array in self._arrays.values():
+            array[:keep.sum()] = array[:self._n_rules][keep]
+
+        self._n_rules = int(keep.sum())
+
+    def insert(self, index, value):
+        # same positions as `list.insert`
+        if index < 0:
+            index = max(len(self) + index, 0)
+        index = min(index, len(self))
+
+        values = self._read(value)
+        self._reserve(self._n_rules + 1)
+        self._views.clear()
+        for array in self._arrays.values():
+            array[index + 1:self._n_rules + 1] = \
+                array[index:self._n_rules].copy()
+        self._n_rules += 1
+
+        self._write(index, values)
+        value.bind(self, index)
+
+    def append(self, value):
+        values = self._read(value)
+        self._reserve(self._n_rules + 1)
+        self._write(self._n_rules, values)
+        self._n_rules += 1
+        value.bind(self, self._n_rules - 1)
+
+    def reverse(self):
+        self._reserve(self._n_rules)
+        self._views.clear()
+        for array in self._arrays.values():
+            array[:self._n_rules] = array[:self._n_rules][::-1].copy()
@@ -0,0 +1,128 @@
+r"""Intermediate results of the inference.
+
+An `InferenceTrace` keeps, as arrays, what the inference computes on the way
+to the belief degrees: the rules' matching degrees, activation weights and
+completeness factors, and the productories of the analytical ER algorithm.
+Thus, explaining a result (e.g., listing the most activated rules) does not
+require matching the input to the rules again.
+
+    Typical usage example:
+
+    >>> trace = model.run_trace(X)
+    >>> trace.belief_degrees
+    >>> rules, activation_weights = trace.get_top_rules(3)
+"""
+from typing import Any, List, Tuple
+
+import numpy as np
+
+from .er import er_partials, combine_er_partials
+from .utility import top_k
+
+
+class InferenceTrace():
+    r"""Belief degrees and intermediates of the inference.
+
+    The rules evaluated are given as rows, which are the rules themselves
+    except for disjunctive rules (see `Rule.disjunctive`), evaluated as one row
+    for each rule of their expanded form. The leading dimensions (...) are the
+    inputs', empty for a single input.
+
+    Attributes:
+        D: Consequent referential values.
+        belief_degrees: Combined belief degrees, shape (..., |D|).
+        rules: Rule (index in `RuleBaseModel.rules`) of each row, shape (K,).
+        matching_degrees: \alpha. Matching degree of each row, shape (..., K).
+        activation_weights: w. Activation weight of each row, shape (..., K).
+        completeness: Input completeness over the antecedents of each row,
+        which scales its belief degrees, shape (..., K).
+        left_prods: L_j. Productories of the analytical ER algorithm that
+        depend on the consequent, shape (..., |D|), see `er.er_partials`.
+        right_prod: R. Productory of the complement of the rules' weighted
+        total belief degrees, shape (...).
+        complement_prod: P. Productory of the complement of the activation
+        weights, shape (...).
+        mu: \mu. Normalization factor of the analytical ER algorithm, shape
+        (...).
+    """
+    def __init__(
+            self,
+            D: List[Any],
+            rules: np.ndarray,
+            matching_degrees: np.ndarray,
+            activation_weights: np.ndarray,
+            completeness: np.ndarray,
+            beta: np.ndarray,
+            log_space: bool = False
+        ):
+        """Combines the rows through the analytical ER algorithm.
+
+        Args:
+            D: Consequent referential values.
+            rules: Rule of each row, shape (K,).
+            matching_degrees: Matching degree of each row, shape (..., K).
+            activation_weights: Activation weight of each row, shape (..., K).
+            completeness: Input completeness over the antecedents of each row,
+            shape (..., K).
+            beta: Belief degrees of each row, shape (K, |D|).
+            log_space: Whether the analytical ER algorithm is computed in log
+            space.
+        """
+        self.D = D
+        self.rules = rules
+        self.matching_degrees = matching_degrees
+        self.activation_weights = activation_weights
+        self.completeness = completeness
+
+        # 4. degrees of belief
+        belief_degrees = beta * completeness[..., np.newaxis]
+
+        # 5. analytical ER algorithm
+        partials = er_partials(activation_weights, belief_degrees,
+                               log_space=log_space)
+        self.belief_degrees = combine_er_partials(partials,
+                                                  log_space=log_space)
+
+        self.left_prods, self.right_prod, self.complement_prod = partials[:3]
+        with np.errstate(divide='ignore'):
+            self.mu = 1 / (np.sum(self.left_prods, axis=-1)
+                           - (len(D) - 1) * self.right_prod)
+
+    def get_rules_activations(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Sums the activation weights of the rows of each rule.
+
+        Returns:
+            rules: Distinct rules evaluated, sorted, shape (R,).
+            activation_weights: Activation weight of each of the rules, i.e.,
+            of its expanded form, shape (..., R).
+        """
+        rules, rows_rules = np.unique(self.rules, return_inverse=True)
+        if len(rules) == len(self.rules):
+            return rules, self.activation_weights[..., np.argsort(self.rules)]
+
+        activation_weights = np.zeros(self.activation_weights.shape[:-1]
+                                      + (len(rules), ))
+        np.add.at(np.moveaxis(activation_weights, -1, 0), rows_rules,
+                  np.moveaxis(self.activation_weights, -1, 0))
+
+        return rules, activation_weights
+
+    def get_top_rules(self, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the `k` most activated rules, most activated first.
+
+        Only the `k` most activated rules are sorted (see `utility.top_k`).
+        Rules with activation weight 0 are returned if less than `k` rules
+        are activated.
+
+        Returns:
+            rules: Rules (indexes in `RuleBaseModel.rules`), shape
+            (..., min(k, R)).
+            activation_weights: Activation weights of `rules`, shape
+            (..., min(k, R)).
+        """
+        rules, activation_weights = self.get_rules_activations()
+
+        positions = top_k(activation_weights, k)
+
+        return rules[positions], np.take_along_axis(activation_weights,
+                                                    positions, axis=-1)
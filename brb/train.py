@@ -0,0 +1,322 @@
+r"""Parameter training for belief rule bases.
+
+Learns the rules' belief degrees (\beta), rule weights (\theta) and attribute
+weights (\delta) from labeled data, by minimizing the squared error between the
+inferred and the expected belief degrees through L-BFGS-B. The loss and its
+gradient are computed over the whole dataset with the compiled model's arrays
+(see `CompiledRuleBaseModel`), the gradient being analytical (see
+`er.analytical_er_gradients`).
+
+Constraints are kept through bounds and normalization: the belief degrees of
+each rule are parametrized by non-negative values normalized to sum 1, while
+the rule weights and attribute weights are bounded to [0, 1]. As both the
+activation weights and the matching degrees are invariant to the scale of the
+weights, the initial weights are scaled to fit the bounds.
+
+    Typical usage example:
+
+    >>> result = model.fit(inputs, targets, params=['beta', 'theta'])
+"""
+from typing import List, Tuple, Sequence
+
+import numpy as np
+
+from .compiled import CompiledRuleBaseModel, MAX_MEMORY, CALLABLE
+from .er import analytical_er, analytical_er_gradients
+from .matching_degree import get_matching_degree_grad
+
+# trainable parameters
+PARAMETERS = ('beta', 'theta', 'delta')
+
+# lower bound of the attribute weights, which cannot all be 0
+MIN_DELTA = 1e-6
+
+
+def get_targets(targets, D: List) -> np.ndarray:
+    """Converts the targets into belief degrees.
+
+    Args:
+        targets: Either belief degrees, shape (N, |D|), or a sequence of
+        consequent referential values, one-hot encoded.
+        D: Consequent referential values.
+
+    Returns:
+        targets: Expected belief degrees, shape (N, |D|).
+    """
+    targets = list(targets)
+    if len(targets) > 0 and np.ndim(targets[0]) == 0:
+        one_hot = np.zeros((len(targets), len(D)))
+        for n, target in enumerate(targets):
+            one_hot[n, list(D).index(target)] = 1
+
+        return one_hot
+
+    targets = np.asarray(targets, dtype=float)
+    assert targets.ndim == 2 and targets.shape[1] == len(D)
+
+    return targets
+
+class _Objective():
+    """Loss and gradient over the (packed) trainable parameters.
+
+    The inputs are matched to the referential values only once. The
+    antecedents' matchings are expanded to the rules chunk by chunk at each
+    evaluation, so that the intermediate arrays fit into `max_memory`.
+    """
+    def __init__(
+            self,
+            compiled_model: CompiledRuleBaseModel,
+            inputs,
+            targets: np.ndarray,
+            params: Sequence[str],
+            max_memory: int
+        ):
+        self.model = compiled_model
+        self.targets = targets
+        self.params = params
+
+        self.refs_matchings, self.attr_completeness = \
+            compiled_model.get_refs_matchings(inputs)
+        self.chunk_size = compiled_model.get_chunk_size(max_memory)
+
+        # only the attribute weights of referred antecedents, for rules whose
+        # matching degree has a gradient, are trainable
+        self.delta_grads = [get_matching_degree_grad(name)
+                            for name in compiled_model.matching_degrees]
+        trainable_rules = np.array([
+            code != CALLABLE and self.delta_grads[code] is not None
+            for code in compiled_model.matching_degree
+        ], dtype=bool)
+        present = np.zeros(compiled_model.delta.shape, dtype=bool)
+        present[compiled_model.get_rows_rules()] = compiled_model.A_codes >= 0
+        self.delta_mask = present & trainable_rules[:, np.newaxis]
+
+    def _to_rules(self, values: np.ndarray) -> np.ndarray:
+        """Sums per-row gradients into per-rule ones.
+
+        Rows of the same (disjunctive) rule share its parameters.
+        """
+        if self.model.rules_ids is None:
+            return values
+
+        rules_values = np.zeros((self.model.n_rules, ) + values.shape[1:])
+        np.add.at(rules_values, self.model.rules_ids, values)
+
+        return rules_values
+
+    def pack(
+            self,
+            theta: np.ndarray,
+            beta: np.ndarray,
+            delta: np.ndarray
+        ) -> Tuple[np.ndarray, list]:
+        """Packs the trainable parameters of the rules into a vector.
+
+        Args:
+            theta: Rules' weights, shape (R,).
+            beta: Rules' belief degrees, shape (R, |D|).
+            delta: Attribute weights, shape (R, |U|).
+
+        Returns:
+            x: Trainable parameters.
+            bounds: Bounds of each parameter.
+        """
+        x = list()
+        bounds = list()
+        if 'theta' in self.params:
+            x.append(theta)
+            bounds += x[-1].size * [(0, 1)]
+        if 'beta' in self.params:
+            x.append(beta.ravel())
+            bounds += x[-1].size * [(0, 1)]
+        if 'delta' in self.params:
+            x.append(delta[self.delta_mask])
+            bounds += x[-1].size * [(MIN_DELTA, 1)]
+
+        return np.concatenate(x), bounds
+
+    def unpack(self, x: np.ndarray) -> Tuple[np.ndarray, ...]:
+        """Unpacks the trainable parameters over the model's ones.
+
+        Returns:
+            theta: Rules' weights, shape (R,).
+            beta: Rules' unnormalized belief degrees, shape (R, |D|).
+            delta: Attribute weights, shape (R, |U|).
+        """
+        theta = self.model.theta
+        beta = self.model.beta
+        delta = self.model.delta
+
+        n_rules = self.model.n_rules
+
+        start = 0
+        if 'theta' in self.params:
+            theta = x[start:start + n_rules]
+            start += n_rules
+        if 'beta' in self.params:
+            size = n_rules * beta.shape[1]
+            beta = x[start:start + size].reshape(n_rules, -1)
+            start += size
+        if 'delta' in self.params:
+            delta = delta.copy()
+            delta[self.delta_mask] = x[start:]
+
+        return theta, beta, delta
+
+    def __call__(self, x: np.ndarray) -> Tuple[float, np.ndarray]:
+        """Computes the mean squared error and its gradient.
+        """
+        theta, beta, delta = self.unpack(x)
+
+        # trained belief degrees are kept in the simplex
+        total_beta = np.ones((beta.shape[0], 1))
+        if 'beta' in self.params:
+            total_beta = np.sum(beta, axis=-1, keepdims=True)
+            total_beta[total_beta == 0] = 1
+        norm_beta = beta / total_beta
+
+        # the matching degree kernels read the attribute weights from the model
+        self.model.delta = delta
+
+        # parameters of each row, see `CompiledRuleBaseModel.get_rows_values`
+        rows_theta = self.model.get_rows_values(theta)
+        rows_norm_beta = self.model.get_rows_values(norm_beta)
+        rows_delta = self.model.get_rows_values(delta)
+        rows_matching_degree = self.model.get_rows_values(
+            self.model.matching_degree
+        )
+
+        n_inputs = self.attr_completeness.shape[0]
+
+        loss = 0.0
+        grad_theta = np.zeros_like(rows_theta)
+        grad_norm_beta = np.zeros_like(rows_norm_beta)
+        grad_delta = np.zeros_like(rows_delta)
+        for start in range(0, n_inputs, self.chunk_size):
+            chunk = slice(start, start + self.chunk_size)
+
+            attr_completeness = self.attr_completeness[chunk]
+            matchings = self.model.get_antecedents_matchings(
+                [None if refs_matchings_i is None else refs_matchings_i[chunk]
+                 for refs_matchings_i in self.refs_matchings],
+                attr_completeness.shape[0]
+            )
+            alphas = self.model.get_matching_degrees(matchings)
+            completeness = self.model.get_completeness(attr_completeness)
+
+            # forward pass
+            theta_alphas = rows_theta * alphas
+            total_theta_alpha = np.sum(theta_alphas, axis=-1, keepdims=True)
+            total_theta_alpha[total_theta_alpha == 0] = 1
+            activation_weights = theta_alphas / total_theta_alpha
+
+            belief_degrees = rows_norm_beta * completeness[..., np.newaxis]
+
+            residuals = analytical_er(activation_weights, belief_degrees) \
+                        - self.targets[chunk]
+            loss += np.sum(residuals ** 2)
+
+            # backward pass
+            grad_activation_weights, grad_belief_degrees = \
+                analytical_er_gradients(activation_weights, belief_degrees,
+                                        2 * residuals / n_inputs)
+
+            grad_theta_alphas = (
+                grad_activation_weights
+                - np.sum(grad_activation_weights * activation_weights,
+                         axis=-1, keepdims=True)
+            ) / total_theta_alpha
+
+            grad_theta += np.sum(grad_theta_alphas * alphas, axis=0)
+            grad_norm_beta += np.sum(
+                grad_belief_degrees * completeness[..., np.newaxis],
+                axis=0
+            )
+
+            if 'delta' in self.params:
+                grad_alphas = grad_theta_alphas * rows_theta
+                for code, grad in enumerate(self.delta_grads):
+                    if grad is None:
+                        continue
+
+                    rows = np.flatnonzero(rows_matching_degree == code)
+                    grad_delta[rows] += np.sum(
+                        grad_alphas[:, rows, np.newaxis] * grad(
+                            matchings[:, rows],
+                            rows_delta[rows],
+                            alphas[:, rows]
+                        ),
+                        axis=0
+                    )
+
+        grad_norm_beta = self._to_rules(grad_norm_beta)
+        grad_beta = (
+            grad_norm_beta
+            - np.sum(grad_norm_beta * norm_beta, axis=-1, keepdims=True)
+        ) / total_beta
+
+        grad, _ = self.pack(self._to_rules(grad_theta), grad_beta,
+                            self._to_rules(grad_delta))
+
+        return loss / n_inputs, grad
+
+def fit(
+        compiled_model: CompiledRuleBaseModel,
+        inputs,
+        targets: np.ndarray,
+        params: Sequence[str] = PARAMETERS,
+        max_iter: int = 100,
+        tol: float = None,
+        max_memory: int = MAX_MEMORY
+    ):
+    """Trains the parameters of a compiled model.
+
+    The compiled model's `theta`, `beta` and `delta` are replaced by the
+    trained ones. Note that the trained belief degrees of each rule sum to 1.
+
+    Args:
+        compiled_model: Model to be trained.
+        inputs: Either a sequence of `AttributeInput` or a `pandas.DataFrame`
+        with one column per antecedent.
+        targets: Expected belief degrees for each input, shape (N, |D|).
+        params: Parameters to be trained, any of `PARAMETERS`.
+        max_iter: Maximum number of iterations of the optimizer.
+        tol: Tolerance for termination (see `scipy.optimize.minimize`).
+        max_memory: Memory budget (in bytes) for the intermediate arrays.
+
+    Returns:
+        result: Optimization result, as returned by `scipy.optimize.minimize`.
+    """
+    from scipy.optimize import minimize  # pylint: disable=import-outside-toplevel
+
+    for param in params:
+        assert param in PARAMETERS, 'unknown parameter `{}`'.format(param)
+
+    objective = _Objective(compiled_model, inputs, targets, params,
+                           max_memory)
+
+    # weights are scaled to the bounds, which does not change the model
+    theta = compiled_model.theta / max(np.max(compiled_model.theta,
+                                              initial=0), 1)
+    delta = compiled_model.delta / np.maximum(
+        np.max(compiled_model.delta, axis=-1, keepdims=True), 1
+    )
+
+    x0, bounds = objective.pack(theta, compiled_model.beta, delta)
+    x0 = np.clip(x0, [lower for lower, _ in bounds],
+                 [upper for _, upper in bounds])
+
+    result = minimize(objective, x0, jac=True, method='L-BFGS-B',
+                      bounds=bounds, tol=tol, options={'maxiter': max_iter})
+
+    theta, beta, delta = objective.unpack(result.x)
+    if 'beta' in params:
+        total_beta = np.sum(beta, axis=-1, keepdims=True)
+        total_beta[total_beta == 0] = 1
+        beta = beta / total_beta
+
+    compiled_model.theta = np.array(theta)
+    compiled_model.beta = np.array(beta)
+    compiled_model.delta = np.array(delta)
+
+    return result
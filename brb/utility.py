@@ -0,0 +1,79 @@
+r"""Utility-based evaluation of the inferred belief degrees.
+
+Given a utility u(D_j) for each consequent referential value, the belief
+degrees of an alternative are summarized by its expected utility. As the belief
+degrees may not sum to 1 (incomplete input or rules), the unassigned belief
+mass could go to any consequent, which bounds the utility between
+
+    u_min = \sum_j \beta_j u(D_j) + (1 - \sum_j \beta_j) min_j u(D_j)
+    u_max = \sum_j \beta_j u(D_j) + (1 - \sum_j \beta_j) max_j u(D_j),
+
+the expected utility being their average, as in "Belief Rule-Base Inference
+Methodology Using the Evidential Reasoning Approach - RIMER", by _Yang et al._.
+"""
+from typing import Tuple
+
+import numpy as np
+
+
+def get_utilities(
+        belief_degrees: np.ndarray,
+        utilities: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Computes the utility of each set of belief degrees.
+
+    Args:
+        belief_degrees: Combined belief degrees, shape (..., |D|).
+        utilities: Utility of each consequent referential value, shape (|D|,).
+
+    Returns:
+        expected_utility: Average of the utility bounds, shape (...).
+        min_utility: Utility if the unassigned mass goes to the least
+        preferred consequent, shape (...).
+        max_utility: Utility if the unassigned mass goes to the most
+        preferred consequent, shape (...).
+    """
+    utilities = np.asarray(utilities, dtype=float)
+    assert utilities.shape == belief_degrees.shape[-1:]
+
+    assigned_utility = belief_degrees @ utilities
+    unassigned = np.clip(1 - np.sum(belief_degrees, axis=-1), 0, None)
+
+    min_utility = assigned_utility + unassigned * np.min(utilities)
+    max_utility = assigned_utility + unassigned * np.max(utilities)
+
+    return (min_utility + max_utility) / 2, min_utility, max_utility
+
+def top_k(scores: np.ndarray, k: int, largest: bool = True) -> np.ndarray:
+    """Returns the positions of the `k` best scores, best first.
+
+    Only the `k` best scores are sorted, after they are selected through a
+    partial sort (`np.argpartition`), which is linear in the number of scores.
+
+    Args:
+        scores: Scores to rank, shape (..., N). Higher dimensional scores are
+        ranked along the last axis, e.g., row by row.
+        k: Number of positions. If greater than N, all positions are returned.
+        largest: If `True`, the greatest scores are the best ones.
+
+    Returns:
+        positions: Positions of the `k` best scores, shape (..., min(k, N)).
+    """
+    scores = np.asarray(scores)
+    if not largest:
+        scores = -scores
+
+    k = min(k, scores.shape[-1])
+    if k <= 0:
+        return np.empty(scores.shape[:-1] + (0, ), dtype=int)
+
+    if k < scores.shape[-1]:
+        positions = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    else:
+        positions = np.broadcast_to(np.arange(scores.shape[-1]),
+                                    scores.shape).copy()
+
+    order = np.argsort(-np.take_along_axis(scores, positions, axis=-1),
+                       axis=-1, kind='stable')
+
+    return np.take_along_axis(positions, order, axis=-1)
@@ -1,4 +1,13 @@
 import os
+import sys
+import subprocess
+import itertools
+import tempfile
+import asyncio
+import json
+import pickle
+import urllib.request
+import warnings
 import numpy as np
 import pandas as pd
 
@@ -7,7 +16,16 @@ from interval import interval, inf
 
 from brb.attr_input import AttributeInput, str2interval
 from brb.brb import RuleBaseModel, csv2BRB
-from brb.rule import Rule
+from brb.cli import main as cli_main
+from brb.rule import Rule, AnyOf, WILDCARD
+from brb.compiled import CompiledRuleBaseModel
+from brb.store import RuleStore
+from brb.network import RuleBaseNetwork
+from brb.incremental import IncrementalEvaluator
+from brb.index import IntervalIndex, RuleIndex
+from brb.matching_degree import register_matching_degree
+from brb.serve import InferenceServer
+from brb.utility import top_k
 
 if __name__ == "__main__":
     # setup for simple tests
@@ -380,6 +398,10 @@ if __name__ == "__main__":
     # referential values
     assert len(new_rules) == np.prod(list(map(len, A.values())))
 
+    # expanded rules are a list, as before they were stored as arrays
+    assert isinstance(new_rules, list)
+    assert len(new_rules + [model.rules[0]]) == len(new_rules) + 1
+
     new_model = RuleBaseModel(model.U, model.D)
 
     for rule in new_rules:
@@ -396,4 +418,853 @@ if __name__ == "__main__":
     n_matches = len([matching_degree for matching_degree in new_matching_degrees if matching_degree > 0])
     assert n_matches <= 1
 
+    # compiled model
+    compiled_model = csv_model.compile()
+
+    assert len(compiled_model) == len(csv_model.rules)
+
+    inputs = [
+        AttributeInput(dict(zip(csv_model.U, ['Yes', '1:2', 1.5]))),
+        AttributeInput(dict(zip(csv_model.U, ['No', 2, '3.5:4.5']))),
+        AttributeInput(dict(zip(csv_model.U, [{'Yes':0.5, 'No':0.3}, '0:1', '0.5:1.5']))),
+        AttributeInput(dict(zip(csv_model.U, [{'Yes':0.0, 'No':0.0}, 10, -1]))),
+    ]
+    for X in inputs:
+        assert np.allclose(compiled_model.run(X), csv_model.run(X), equal_nan=True)
+
+    compiled_model = new_model.compile()
+    inputs = [
+        AttributeInput({'A_1': 'm', 'A_2': 'm', 'A_3': {'l':0, 'm':0,'h':0}}),
+        AttributeInput({'A_1': 'm', 'A_2': 'l', 'A_3': {'l':0.2, 'm':0.8,'h':0}}),
+        AttributeInput({'A_1': {'l':0.5, 'm':0.5, 'h':0.0}, 'A_2': 'h', 'A_3': 'h'}),
+    ]
+    for X in inputs:
+        assert np.allclose(compiled_model.run(X), new_model.run(X), equal_nan=True)
+
+    # rules without antecedents are rejected by both engines
+    empty_model = RuleBaseModel(U=['A_1'], D=['Y', 'N'])
+    for add_empty_rule in [
+            lambda: empty_model.add_rule(Rule(A_values={}, beta=[1, 0])),
+            lambda: empty_model.add_rules_from_df(pd.DataFrame({'A_1': [None], 'Y': [1], 'N': [0]})),
+            lambda: CompiledRuleBaseModel.from_rules(['A_1'], ['Y', 'N'],
+                                                     [Rule(A_values={}, beta=[1, 0])])]:
+        try:
+            add_empty_rule()
+            assert False, 'rules without antecedents must be rejected'
+        except AssertionError as e:
+            assert 'at least one antecedent' in str(e)
+    assert len(empty_model.rules) == 0
+
+    # compiled model with custom matching degree function
+    model = RuleBaseModel(U=['A_1', 'A_2'], D=['Y', 'N'])
+    model.add_rule(Rule(A_values={'A_1': 'a', 'A_2': 'b'}, beta=[0.8, 0.2],
+                        delta={'A_1': 1, 'A_2': 2}, theta=0.5,
+                        matching_degree='geometric'))
+    model.add_rule(Rule(A_values={'A_1': 'b'}, beta=[0.1, 0.7],
+                        matching_degree=lambda delta, alphas_i: min(alphas_i.values())))
+    model.add_rule(Rule(A_values={'A_2': 'a'}, beta=[0.0, 1.0]))
+    compiled_model = model.compile()
+    X = AttributeInput({'A_1': {'a': 0.6, 'b': 0.4}, 'A_2': {'a': 0.3, 'b': 0.7}})
+    assert np.allclose(compiled_model.run(X), model.run(X))
+
+    # batch inference
+    inputs = [
+        AttributeInput(dict(zip(csv_model.U, ['Yes', '1:2', 1.5]))),
+        AttributeInput(dict(zip(csv_model.U, ['No', 2, '3.5:4.5']))),
+        AttributeInput(dict(zip(csv_model.U, [{'Yes':0.5, 'No':0.3}, '0:1', '0.5:1.5']))),
+        AttributeInput(dict(zip(csv_model.U, [{'Yes':0.0, 'No':0.0}, 10, -1]))),
+        AttributeInput(dict(zip(csv_model.U, ['Yes', '1:2', 1.5]))),
+    ]
+    belief_degrees = csv_model.run_batch(inputs)
+    assert belief_degrees.shape == (len(inputs), len(csv_model.D))
+    for X, belief_degrees_X in zip(inputs, belief_degrees):
+        assert np.allclose(belief_degrees_X, csv_model.run(X))
+
+    # tiny memory budget forces one input per chunk
+    assert np.allclose(csv_model.run_batch(inputs, max_memory=1), belief_degrees)
+
+    df_inputs = pd.DataFrame([X.attr_input for X in inputs])
+    assert np.allclose(csv_model.run_batch(df_inputs), belief_degrees)
+
+    # log-space ER
+    for _model in [csv_model, new_model]:
+        log_model = RuleBaseModel(U=_model.U, D=_model.D, log_space=True)
+        for rule in _model.rules:
+            log_model.add_rule(rule)
+
+        X = AttributeInput(dict(zip(_model.U, [{'l': 0.2, 'm': 0.5, 'h': 0.3}, 'm', 'l'])))
+        if _model is csv_model:
+            X = AttributeInput(dict(zip(_model.U, [{'Yes':0.5, 'No':0.3}, '0:1', '0.5:1.5'])))
+        assert np.allclose(log_model.run(X), _model.run(X))
+        assert np.allclose(log_model.run_batch([X]), _model.run_batch([X]))
+
+    # weakly activated rules lose precision in the direct products
+    log_model = RuleBaseModel(U=['Antecedent'], D=['good', 'bad'], log_space=True)
+    log_model.add_rule(good_rule)
+    log_model.add_rule(bad_rule)
+    X = AttributeInput({'Antecedent': {'good': 1e-12, 'bad': 2e-12}})
+    belief_degrees = log_model.run(X)
+    assert np.isclose(belief_degrees[0], 9 / 7 * 1e-12, rtol=1e-9, atol=0)
+    assert np.isclose(belief_degrees[1], 18 / 7 * 1e-12, rtol=1e-9, atol=0)
+
+    X = AttributeInput({'Antecedent': {'good': 0.0, 'bad': 0.0}})
+    assert all(np.isclose(log_model.run(X), [0.0, 0.0]))
+    X = AttributeInput({'Antecedent': {'good': 1.0, 'bad': 0.0}})
+    assert all(np.isclose(log_model.run(X), [1.0, 0.0]))
+
+    # only the rules that may be activated are evaluated
+    X = AttributeInput(dict(zip(csv_model.U, ['Yes', 1, 3])))
+    assert csv_model.get_candidate_rules(X) == [0, 2, 3]
+    assert np.allclose(csv_model.run(X), csv_model.compile().run(X))
+
+    X = AttributeInput(dict(zip(csv_model.U, [{'Yes': 0.0, 'No': 0.0}, 10, -1])))
+    assert csv_model.get_candidate_rules(X) == [3]
+
+    X = AttributeInput({'A_1': 'm', 'A_2': 'm', 'A_3': {'l':0, 'm':0,'h':0}})
+    assert new_model.get_candidate_rules(X) == [
+        k for k, rule in enumerate(new_model.rules)
+        if rule.A_values['A_1'] == 'm' or rule.A_values['A_2'] == 'm'
+    ]
+
+    # referential values missing from an uncertain input have certainty 0
+    X = AttributeInput({'A_1': {'l': 0.6, 'h': 0.4}, 'A_2': 'h', 'A_3': 'm'})
+    assert np.allclose(new_model.run(X), new_model.run_batch([X])[0])
+
+    # AttributeInput values are prepared only once
+    X = AttributeInput({'A_1': '1:2', 'A_2': "{'y': 0.5, 'n': 0.25}"})
+    assert X['A_1'] is X['A_1']
+    assert X.get_completeness(['A_2']) == 0.75
+    X.attr_input['A_1'] = '3'
+    assert X['A_1'] == 3
+
+    # already typed input
+    X = AttributeInput({'A_1': '1:2'}, prepared=True)
+    assert X['A_1'] == '1:2'
+
+    X = AttributeInput(dict(zip(csv_model.U, ['Yes', '1:2', '1.0:2.0'])))
+    typed_X = AttributeInput(dict(zip(csv_model.U, ['Yes', {1, 2}, interval[1.0, 2.0]])),
+                             prepared=True)
+    assert np.allclose(csv_model.run(X), csv_model.run(typed_X))
+    assert np.allclose(csv_model.run_batch([X]), csv_model.run_batch([typed_X]))
+
+    # referential values and attribute weights are prepared on assignment
+    rule = Rule(A_values={'A_1': '1:2', 'A_2': 'a'}, beta=[1, 0])
+    X = AttributeInput({'A_1': '2:3', 'A_2': 'a'})
+    assert rule.get_matching_degree(X) == 0.75
+    rule.delta = {'A_1': 3, 'A_2': 1}
+    assert rule.get_matching_degree(X) == 0.625
+    rule.A_values = {'A_1': '2:3', 'A_2': 'b'}
+    assert rule.get_matching_degree(X) == 0.75
+
+    # interval index
+    intervals = [(0, 1), (0.5, 2), (2, 3), (-inf, 0), (2.5, inf), (1, 1), (-inf, inf)]
+    interval_index = IntervalIndex()
+    for item, (start, end) in enumerate(intervals):
+        interval_index.add(start, end, item)
+    for start, end in [(0, 0), (1, 1), (1.5, 1.7), (-5, -4), (10, 10), (-inf, 0.2), (2.2, 2.7)]:
+        expected_items = [item for item, (itv_start, itv_end) in enumerate(intervals)
+                          if itv_start <= end and itv_end >= start]
+        assert sorted(interval_index.query(start, end)) == expected_items
+
+    # numeric and interval inputs against many interval referential values
+    model = RuleBaseModel(U=['A_1', 'A_2'], D=['Y', 'N'])
+    for i in range(100):
+        model.add_rule(Rule(A_values={'A_1': '{}:{}'.format(i / 10, (i + 1) / 10), 'A_2': i % 4},
+                            beta=[i / 100, 1 - i / 100]))
+    model.add_rule(Rule(A_values={'A_1': '>10.0'}, beta=[0, 1]))
+    model.add_rule(Rule(A_values={'A_1': '<0.0', 'A_2': '0:1'}, beta=[1, 0]))
+
+    inputs = [
+        AttributeInput({'A_1': 5.05, 'A_2': 3}),
+        AttributeInput({'A_1': '4.95:5.25', 'A_2': {0: 0.0, 1: 0.0, 2: 0.5, 3: 0.5}}),
+        AttributeInput({'A_1': 35, 'A_2': '1:2'}),
+        AttributeInput({'A_1': '-1:0.05', 'A_2': 7}),
+    ]
+    for X in inputs:
+        assert np.allclose(model.run(X), model.compile().run(X))
+
+    X = AttributeInput({'A_1': 5.05, 'A_2': 7})
+    assert model.get_candidate_rules(X) == [50]
+
+    # registered matching degree function
+    def weighted_min(alphas, delta):
+        norm_delta = delta / np.max(delta, axis=-1, keepdims=True)
+        return np.min(np.where(delta > 0, alphas ** norm_delta, 1), axis=-1)
+    register_matching_degree('weighted_min', weighted_min)
+
+    model = RuleBaseModel(U=['A_1', 'A_2'], D=['Y', 'N'])
+    model.add_rule(Rule(A_values={'A_1': 'a', 'A_2': 'b'}, beta=[0.8, 0.2],
+                        delta={'A_1': 1, 'A_2': 4}, matching_degree='weighted_min'))
+    model.add_rule(Rule(A_values={'A_1': 'b'}, beta=[0.1, 0.7],
+                        matching_degree='weighted_min'))
+    model.add_rule(Rule(A_values={'A_2': 'a'}, beta=[0.0, 1.0], matching_degree='arithmetic'))
+    X = AttributeInput({'A_1': {'a': 0.6, 'b': 0.4}, 'A_2': {'a': 0.3, 'b': 0.7}})
+    assert np.isclose(model.rules[0].get_matching_degree(X), min(0.6 ** 0.25, 0.7))
+    assert np.allclose(model.compile().run(X), model.run(X))
+    assert np.allclose(model.run_batch([X, X]), [model.run(X)] * 2)
+
+    # sharded rule base
+    inputs = [
+        AttributeInput(dict(zip(csv_model.U, ['Yes', '1:2', 1.5]))),
+        AttributeInput(dict(zip(csv_model.U, ['No', 2, '3.5:4.5']))),
+        AttributeInput(dict(zip(csv_model.U, [{'Yes':0.5, 'No':0.3}, '0:1', '0.5:1.5']))),
+        AttributeInput(dict(zip(csv_model.U, [{'Yes':0.0, 'No':0.0}, 10, -1]))),
+    ]
+    for log_space in [False, True]:
+        csv_model.log_space = log_space
+        with csv_model.shard(n_shards=3) as sharded_model:
+            assert len(sharded_model) == len(csv_model.rules)
+            assert np.allclose(sharded_model.run_batch(inputs), csv_model.run_batch(inputs))
+            assert np.allclose(sharded_model.run_batch(inputs, max_memory=1),
+                               csv_model.run_batch(inputs))
+            for X in inputs:
+                assert np.allclose(sharded_model.run(X), csv_model.run(X))
+    csv_model.log_space = False
+
+    # inference server
+    async def serve_requests(server, payloads):
+        await server.start()
+        url = 'http://127.0.0.1:{}'.format(server.port)
+
+        def request(path, payload=None):
+            data = None if payload is None else json.dumps(payload).encode()
+            try:
+                with urllib.request.urlopen(url + path, data=data, timeout=10) as response:
+                    return json.loads(response.read())
+            except urllib.error.HTTPError as e:
+                return e.code
+
+        loop = asyncio.get_running_loop()
+        responses = await asyncio.gather(*[loop.run_in_executor(None, request, '/predict', payload)
+                                           for payload in payloads])
+        stats = await loop.run_in_executor(None, request, '/stats')
+        await server.stop()
+
+        return responses, stats
+
+    payloads = [dict(zip(csv_model.U, ['Yes', '1:2', 1.5])),
+                dict(zip(csv_model.U, ['No', 2, '3.5:4.5']))] * 8
+    payloads += [[dict(zip(csv_model.U, [{'Yes':0.5, 'No':0.3}, '0:1', '0.5:1.5']))] * 2,
+                 {'A_1': 'Yes'}]
+    server = InferenceServer(csv_model, port=0, max_batch_size=4, max_wait=0.05)
+    responses, stats = asyncio.run(serve_requests(server, payloads))
+    for payload, response in zip(payloads[:16], responses):
+        assert np.allclose(response['belief_degrees'], csv_model.run(AttributeInput(payload)))
+    assert len(responses[16]['belief_degrees']) == 2
+    assert responses[17] == 422  # missing antecedents
+    assert stats['n_requests'] == 19 and stats['queue_depth'] == 0
+    assert stats['n_batches'] < stats['n_requests']
+
+    # malformed requests and unexpected failures are answered, not dropped
+    async def send_raw_requests(server, requests):
+        await server.start()
+        status_lines = list()
+        for raw_request in requests:
+            reader, writer = await asyncio.open_connection('127.0.0.1', server.port)
+            writer.write(raw_request)
+            await writer.drain()
+            status_lines.append((await reader.readline()).decode())
+            writer.close()
+        await server.stop()
+
+        return status_lines
+
+    def failing_matching_degree(delta, alphas_i):
+        raise RuntimeError('failing matching degree')
+
+    failing_model = RuleBaseModel(U=['A_1'], D=['Y', 'N'])
+    failing_model.add_rule(Rule(A_values={'A_1': 'a'}, beta=[1, 0],
+                                matching_degree=failing_matching_degree))
+    body = json.dumps({'A_1': 'a'}).encode()
+    status_lines = asyncio.run(send_raw_requests(
+        InferenceServer(failing_model, port=0),
+        [b'POST /predict HTTP/1.1\r\nContent-Length: abc\r\n\r\n',
+         b'POST /predict HTTP/1.1\r\nConnection: close\r\nContent-Length: '
+         + str(len(body)).encode() + b'\r\n\r\n' + body]
+    ))
+    assert status_lines[0].startswith('HTTP/1.1 400')
+    assert status_lines[1].startswith('HTTP/1.1 500')
+
+    # parameter training
+    def get_training_model(betas, thetas, deltas):
+        model = RuleBaseModel(U=['A_1', 'A_2'], D=['Y', 'N'])
+        for A_values, beta, theta, delta, matching_degree in zip(
+                [{'A_1': 'l', 'A_2': 'l'}, {'A_1': 'l', 'A_2': 'h'}, {'A_1': 'h', 'A_2': 'l'},
+                 {'A_1': 'h', 'A_2': 'h'}, {'A_1': 'm'}],
+                betas, thetas, deltas, ['arithmetic', 'geometric'] * 3):
+            model.add_rule(Rule(A_values=A_values, beta=beta, theta=theta,
+                                delta={U_i: d for U_i, d in zip(['A_1', 'A_2'], delta)
+                                       if U_i in A_values.keys()},
+                                matching_degree=matching_degree))
+        return model
+
+    true_model = get_training_model([[1, 0], [0.7, 0.3], [0.2, 0.8], [0, 1], [0.5, 0.5]],
+                                    [1.0, 0.5, 0.8, 0.3, 0.6], [[1, 0.5], [0.3, 1], [1, 1], [0.2, 0.9], [1, 1]])
+    inputs = [AttributeInput({'A_1': {'l': p, 'm': q * (1 - p), 'h': (1 - q) * (1 - p)},
+                              'A_2': {'l': q, 'h': 1 - q}})
+              for p in np.linspace(0, 1, 7) for q in np.linspace(0, 1, 5)]
+    targets = true_model.run_batch(inputs)
+
+    model = get_training_model([[0.5, 0.5]] * 5, [1.0] * 5, [[1, 1]] * 5)
+    initial_loss = np.mean(np.sum((model.run_batch(inputs) - targets) ** 2, axis=-1))
+    result = model.fit(inputs, targets, max_iter=500)
+    assert result.fun < initial_loss / 100
+    assert np.isclose(result.fun, np.mean(np.sum((model.run_batch(inputs) - targets) ** 2, axis=-1)))
+    for rule in model.rules:
+        assert np.isclose(sum(rule.beta), 1) and 0 <= rule.theta <= 1
+        assert all(0 < d <= 1 for d in rule.delta.values())
+    assert np.allclose(model.run(inputs[3]), model.run_batch(inputs)[3])
+
+    # labels as targets, only the belief degrees are trained
+    model = get_training_model([[0.5, 0.5]] * 5, [1.0] * 5, [[1, 1]] * 5)
+    labels = ['Y' if beta_Y > 0.5 else 'N' for beta_Y, _ in targets]
+    model.fit(inputs, labels, params=['beta'], max_memory=1)
+    assert [rule.theta for rule in model.rules] == [1.0] * 5
+    assert model.rules[0].beta[0] > 0.5 and model.rules[3].beta[1] > 0.5
+
+    # utilities
+    model = RuleBaseModel(U=['A_1'], D=['low', 'medium', 'high'], utilities=[0, 0.5, 1])
+    model.add_rule(Rule(A_values={'A_1': 'a'}, beta=[1, 0, 0]))
+    model.add_rule(Rule(A_values={'A_1': 'b'}, beta=[0, 0.5, 0.5]))
+    model.add_rule(Rule(A_values={'A_1': 'c'}, beta=[0, 0, 0.6]))
+    inputs = [AttributeInput({'A_1': A_1}) for A_1 in ['a', 'b', 'c', {'a': 0, 'b': 0, 'c': 0}]]
+    expected_utility, min_utility, max_utility = model.get_utilities(inputs)
+    assert np.allclose(min_utility, [0, 0.75, 0.6, 0])
+    assert np.allclose(max_utility, [0, 0.75, 1.0, 1])
+    assert np.allclose(expected_utility, [0, 0.75, 0.8, 0.5])
+
+    positions, utilities = model.rank(inputs, k=2)
+    assert list(positions) == [2, 1] and np.allclose(utilities, [0.8, 0.75])
+    positions, _ = model.rank(inputs, k=2, by='min')
+    assert list(positions) == [1, 2]
+    assert len(model.rank(inputs, k=10)[0]) == len(inputs)
+
+    scores = np.random.rand(1000)
+    assert list(top_k(scores, 10)) == list(np.argsort(-scores)[:10])
+    assert list(top_k(scores, 10, largest=False)) == list(np.argsort(scores)[:10])
+
+    # rules grid
+    model = RuleBaseModel(U=['A_1', 'A_2', 'A_3'], D=['D_1', 'D_2'])
+    A = {'A_3': ['l', 'm', 'h'], 'A_1': [1, 2], 'A_2': ['x', 'y', 'z', 'w']}
+    chunks = list(model.get_rules_grid(A, chunk_size=5))
+    assert [len(chunk) for chunk in chunks] == [5, 5, 5, 5, 4]
+    rules_grid = pd.concat(chunks)
+    assert list(rules_grid.columns) == ['A_1', 'A_2', 'A_3', 'D_1', 'D_2']
+    assert list(map(tuple, rules_grid[model.U].values)) == \
+        list(itertools.product(A['A_1'], A['A_2'], A['A_3']))
+    assert rules_grid[model.D].isna().all().all()
+    assert list(rules_grid.index) == list(range(24))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        grid_filepath = os.path.join(tmp_dir, 'grid.csv')
+        assert model.rules_grid_to_csv(A, grid_filepath, chunk_size=7) == 24
+
+        # experts fill the belief degrees
+        rules_grid = pd.read_csv(grid_filepath)
+        rules_grid['D_1'] = (rules_grid['A_1'] == 1).astype(float)
+        rules_grid['D_2'] = 1 - rules_grid['D_1']
+        rules_grid.to_csv(grid_filepath, index=False)
+
+        grid_model = csv2BRB(grid_filepath, antecedents_prefix='A_', consequents_prefix='D_')
+    assert len(grid_model.rules) == 24
+    assert grid_model.rules[13].A_values == {'A_1': 2, 'A_2': 'x', 'A_3': 'm'}
+    assert list(grid_model.rules[13].beta) == [0, 1]
+
+    # "don't care" antecedents
+    df_rules = pd.read_csv(os.path.join(os.curdir, 'test_rules3.csv'), index_col='rule_id')
+    U = ['A_1', 'A_2', 'A_3']
+    D = ['D_1', 'D_2']
+    A = {U_i: df_rules[U_i].dropna().unique() for U_i in U}
+
+    model = RuleBaseModel(U=U, D=D)
+    model.add_rules_from_df(rules_df=df_rules)
+    expanded_model = RuleBaseModel(U=U, D=D)
+    for rule in model.expand_rules(A):
+        expanded_model.add_rule(rule)
+
+    wildcard_model = RuleBaseModel(U=U, D=D, A=A, missing_as_wildcard=True)
+    wildcard_model.add_rules_from_df(rules_df=df_rules)
+    assert len(wildcard_model.rules) == 9 and len(expanded_model.rules) == 27
+    assert wildcard_model.rules[0].A_values == {'A_1': 'l', 'A_2': WILDCARD, 'A_3': WILDCARD}
+    assert wildcard_model.rules[0].get_n_expansions(A) == 9
+
+    inputs = [
+        AttributeInput({'A_1': 'm', 'A_2': 'm', 'A_3': {'l': 0, 'm': 0, 'h': 0}}),
+        AttributeInput({'A_1': 'm', 'A_2': 'l', 'A_3': {'l': 0.2, 'm': 0.8, 'h': 0}}),
+        AttributeInput({'A_1': {'l': 0.5, 'm': 0.5, 'h': 0.0}, 'A_2': 'h', 'A_3': 'h'}),
+        AttributeInput({'A_1': 'l', 'A_2': 'x', 'A_3': {'l': 0.3, 'm': 0.3, 'h': 0.2}}),
+    ]
+    belief_degrees = expanded_model.run_batch(inputs)
+    for X, belief_degrees_X in zip(inputs, belief_degrees):
+        assert np.allclose(wildcard_model.run(X), belief_degrees_X)
+    assert np.allclose(wildcard_model.run_batch(inputs), belief_degrees)
+    assert len(wildcard_model.compile()) == 9
+    # only the codes are expanded, the parameters are kept per rule
+    assert wildcard_model.compile().A_codes.shape[0] == 27
+    assert wildcard_model.compile().theta.shape == (9, )
+    assert wildcard_model.compile().beta.shape == (9, 2)
+    with wildcard_model.shard(n_shards=2) as sharded_model:
+        assert np.allclose(sharded_model.run_batch(inputs), belief_degrees)
+
+    # OR-sets of referential values
+    model = RuleBaseModel(U=U, D=D)
+    model.add_rule(Rule(A_values={'A_1': AnyOf(['l', 'm']), 'A_2': 'h'}, beta=[0.8, 0.2],
+                        delta={'A_1': 2, 'A_2': 1}, matching_degree='geometric'))
+    model.add_rule(Rule(A_values={'A_1': AnyOf(['h']), 'A_2': AnyOf(('l', 'm'))},
+                        beta=[0.1, 0.9], theta=0.5))
+    expanded_model = RuleBaseModel(U=U, D=D)
+    for rule in model.rules:
+        for expanded_rule in rule.expand():
+            expanded_model.add_rule(expanded_rule)
+    assert len(expanded_model.rules) == 4
+
+    inputs = [
+        AttributeInput({'A_1': 'm', 'A_2': {'l': 0.2, 'm': 0.1, 'h': 0.7}, 'A_3': 'l'}),
+        AttributeInput({'A_1': {'l': 0.2, 'm': 0.4, 'h': 0.4}, 'A_2': 'm', 'A_3': 'l'}),
+        AttributeInput({'A_1': 'x', 'A_2': 'x', 'A_3': 'l'}),
+    ]
+    belief_degrees = expanded_model.run_batch(inputs)
+    for X, belief_degrees_X in zip(inputs, belief_degrees):
+        assert np.allclose(model.run(X), belief_degrees_X)
+    assert np.allclose(model.run_batch(inputs), belief_degrees)
+    X = AttributeInput({'A_1': 'm', 'A_2': 'h', 'A_3': 'l'})
+    assert model.get_candidate_rules(X) == [0]
+    assert model.rules[0].get_matching_degree(X) == 1.0
+
+    # strings are only disjunctive when asked for
+    literal_model = RuleBaseModel(U=['A_1'], D=D)
+    literal_model.add_rule(Rule(A_values={'A_1': '*'}, beta=[1, 0]))
+    literal_model.add_rule(Rule(A_values={'A_1': 'l|m'}, beta=[0, 1]))
+    assert not any(rule.disjunctive for rule in literal_model.rules)
+    assert literal_model.run(AttributeInput({'A_1': '*'})) == [1.0, 0.0]
+    assert literal_model.run(AttributeInput({'A_1': 'l'})) == [0.0, 0.0]
+    parsed_model = RuleBaseModel(U=['A_1', 'A_2'], D=D, A={'A_2': ['l', 'h']},
+                                 parse_disjunctive=True)
+    parsed_model.add_rule(Rule(A_values={'A_1': 'l|m', 'A_2': '*'}, beta=[0, 1]))
+    parsed_model.load_rules(pd.DataFrame({'A_1': ['h'], 'A_2': ['*'], 'D_1': [1], 'D_2': [0]}))
+    assert [rule.A_values for rule in parsed_model.rules] \
+           == [{'A_1': AnyOf(['l', 'm']), 'A_2': WILDCARD}, {'A_1': 'h', 'A_2': WILDCARD}]
+    X = AttributeInput({'A_1': 'm', 'A_2': 'h'})
+    assert np.allclose(parsed_model.run_batch([X])[0], parsed_model.run(X))
+
+    # parameters are shared by the expanded form of a rule
+    model.fit(inputs, belief_degrees[::-1], max_iter=5)
+    assert np.allclose(model.run_batch(inputs), model.compile().run_batch(inputs))
+
+    # columnar bulk loading
+    rules_filepath = os.path.join(os.curdir, 'test_rules.csv')
+    inputs = [
+        AttributeInput(dict(zip(csv_model.U, ['Yes', '1:2', 1.5]))),
+        AttributeInput(dict(zip(csv_model.U, ['No', 2, '3.5:4.5']))),
+        AttributeInput(dict(zip(csv_model.U, [{'Yes':0.5, 'No':0.3}, '0:1', '0.5:1.5']))),
+    ]
+    chunked_model = csv2BRB(rules_filepath, antecedents_prefix='A_', consequents_prefix='D_',
+                            chunksize=2)
+    assert len(chunked_model.rules) == len(csv_model.rules)
+    assert chunked_model._compiled is not None  # encoded while loading
+    assert np.allclose(chunked_model.run_batch(inputs), chunked_model.compile().run_batch(inputs))
+    assert np.allclose(chunked_model.run_batch(inputs), csv_model.run_batch(inputs))
+
+    df_rules = pd.read_csv(os.path.join(os.curdir, 'test_rules3.csv'))
+    df_rules['rule_weight'] = np.linspace(0.1, 0.9, len(df_rules))
+    for U_i, delta_i in zip(['A_1', 'A_2', 'A_3'], [1, 2, 0.5]):
+        df_rules['W_' + U_i] = delta_i
+    model = RuleBaseModel(U=['A_1', 'A_2', 'A_3'], D=['D_1', 'D_2'])
+    model.load_rules(df_rules, thetas='rule_weight', delta_cols=['W_A_1', 'W_A_2', 'W_A_3'])
+    assert model.rules[1].A_values == {'A_1': 'm', 'A_2': 'l'}
+    assert model.rules[1].delta == {'A_1': 1, 'A_2': 2}
+    assert model.rules[8].theta == 0.9
+    X = AttributeInput({'A_1': {'l': 0.2, 'm': 0.8, 'h': 0}, 'A_2': 'm', 'A_3': 'h'})
+    assert np.allclose(model.run_batch([X])[0], model.compile().run(X))
+    assert np.allclose(model.run_batch([X])[0], model.run(X))
+
+    df_rules.loc[3, 'D_1'] = -0.1
+    try:
+        model.load_rules(df_rules)
+        assert False, 'negative belief degrees must be rejected'
+    except AssertionError as e:
+        assert 'negative' in str(e)
+
+    # rules added one by one are checked as the rules tables
+    n_rules = len(model.rules)
+    for invalid_rule, message in [
+            (Rule(A_values={'A_1': 'l'}, beta=[-0.1, 0.5]), 'negative'),
+            (Rule(A_values={'A_1': 'l'}, beta=[0.6, 0.5]), 'sum more than 1'),
+            (Rule(A_values={'A_1': 'l'}, beta=[0.5, 0.5], theta=-1), 'negative'),
+            (Rule(A_values={'A_1': 'l'}, beta=[0.5, 0.5], delta={'A_1': -1}), 'negative'),
+        ]:
+        try:
+            model.add_rule(invalid_rule)
+            assert False, 'invalid rules must be rejected'
+        except AssertionError as e:
+            assert message in str(e)
+    assert len(model.rules) == n_rules
+
+    wildcard_inputs = [
+        AttributeInput({'A_1': 'm', 'A_2': 'l', 'A_3': {'l': 0.2, 'm': 0.8, 'h': 0}}),
+        AttributeInput({'A_1': {'l': 0.5, 'm': 0.5, 'h': 0.0}, 'A_2': 'h', 'A_3': 'h'}),
+    ]
+
+    # rules indexed from the store's arrays, or rule by rule
+    for indexed_model, model_inputs in [(chunked_model, inputs),
+                                        (wildcard_model, wildcard_inputs)]:
+        index = RuleIndex(indexed_model.U)
+        for rule in indexed_model.rules:
+            index.add_rule(rule)
+        store_index = RuleIndex.from_store(indexed_model.rules)
+        assert store_index.U_used == index.U_used
+        for X in model_inputs:
+            assert store_index.get_candidates(X) == index.get_candidates(X)
+
+    # binary snapshots
+    with tempfile.TemporaryDirectory() as tmpdir:
+        chunked_model.save(os.path.join(tmpdir, 'csv_model'))
+        loaded_model = RuleBaseModel.load(os.path.join(tmpdir, 'csv_model'))
+        assert isinstance(loaded_model._compiled.theta, np.memmap)
+        # arrays derived from the rules are loaded, not computed
+        assert loaded_model._compiled.rules_ids is None
+        assert isinstance(loaded_model._compiled.n_antecedents, np.memmap)
+        assert loaded_model._index_version == loaded_model.get_version()
+        assert np.allclose(loaded_model.run_batch(inputs), chunked_model.run_batch(inputs))
+        for X in inputs:
+            assert np.allclose(loaded_model.run(X), chunked_model.run(X))
+        assert [rule.A_values for rule in loaded_model.rules] \
+               == [rule.A_values for rule in chunked_model.rules]
+
+        wildcard_model.save(os.path.join(tmpdir, 'wildcard_model'))
+        loaded_model = RuleBaseModel.load(os.path.join(tmpdir, 'wildcard_model'), mmap=False)
+        assert loaded_model.A == wildcard_model.A and loaded_model.missing_as_wildcard
+        assert len(loaded_model._compiled.rules_ids) == 27
+        assert np.allclose(loaded_model.run_batch(wildcard_inputs),
+                           wildcard_model.run_batch(wildcard_inputs))
+        assert loaded_model.rules[-1].A_values == wildcard_model.rules[-1].A_values
+        for X in wildcard_inputs:
+            assert np.allclose(loaded_model.run(X), wildcard_model.run(X))
+
+        # rules added after loading
+        loaded_model.add_rule(Rule(A_values={'A_1': AnyOf(['h', 'm'])}, beta=[0.5, 0.5]))
+        assert loaded_model.rules[-1].A_values \
+               == {'A_1': AnyOf(['h', 'm']), 'A_2': WILDCARD, 'A_3': WILDCARD}
+        assert np.allclose(loaded_model.run_batch(wildcard_inputs),
+                           [loaded_model.run(X) for X in wildcard_inputs])
+
+        with open(os.path.join(tmpdir, 'csv_model', 'metadata.json')) as f:
+            metadata = json.load(f)
+        metadata['format_version'] += 1
+        with open(os.path.join(tmpdir, 'csv_model', 'metadata.json'), 'w') as f:
+            json.dump(metadata, f)
+        try:
+            RuleBaseModel.load(os.path.join(tmpdir, 'csv_model'))
+            assert False, 'newer snapshot formats must be rejected'
+        except ValueError:
+            pass
+
+    # heavy dependencies are imported lazily
+    imported = subprocess.run(
+        [sys.executable, '-c', 'import sys, brb; print(sorted(sys.modules))'],
+        stdout=subprocess.PIPE, check=True, universal_newlines=True
+    ).stdout
+    for module in ['pandas', 'scipy', 'click']:
+        assert "'{}'".format(module) not in imported
+
+    # streaming batch mode of the cli
+    from click.testing import CliRunner
+    scores = np.array([[0.1, 0.5, 0.3], [0.7, 0.2, 0.9]])
+    assert top_k(scores, 2).tolist() == [[1, 2], [2, 0]]
+    assert top_k(scores, 5, largest=False).tolist() == [[0, 2, 1], [1, 0, 2]]
+
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        inputs_filepath = os.path.join(tmpdir, 'inputs.csv')
+        with open(inputs_filepath, 'w') as f:
+            f.write('key,A_1,A_2,A_3\n')
+            f.write('a,Yes,1:2,1.5\n')
+            f.write('b,No,2,3.5:4.5\n')
+            f.write('c,No,2,\n')
+        csv_model.save(os.path.join(tmpdir, 'model'))
+
+        runner = CliRunner()
+        result = runner.invoke(cli_main, [
+            'batch', os.path.join(tmpdir, 'model'), inputs_filepath,
+            '--id-column', 'key', '--explain', '2', '--chunk-size', '2',
+            '--output-format', 'jsonl'
+        ])
+        assert result.exit_code == 0
+        records = [json.loads(line) for line in result.output.splitlines()
+                   if line.startswith('{')]
+        assert [record['id'] for record in records] == ['a', 'b', 'c']
+
+        expected = csv_model.run(AttributeInput({'A_1': 'Yes', 'A_2': '1:2', 'A_3': 1.5}))
+        assert np.allclose(list(records[0]['belief_degrees'].values()), expected)
+        assert records[0]['activated_rules'][0]['rule'] == 2
+        assert np.isclose(records[0]['activated_rules'][0]['activation_weight'], 0.5)
+        assert len(records[1]['activated_rules']) == 2
+
+        # inputs that cannot be evaluated do not interrupt the others
+        jsonl_filepath = os.path.join(tmpdir, 'inputs.jsonl')
+        with open(jsonl_filepath, 'w') as f:
+            f.write(json.dumps({'A_1': 'Yes', 'A_2': '1:2', 'A_3': 1.5, 'other': 0}) + '\n')
+            f.write(json.dumps({'A_1': 'No'}) + '\n')
+        output_filepath = os.path.join(tmpdir, 'output.csv')
+        result = runner.invoke(cli_main, [
+            'batch', rules_filepath, jsonl_filepath, '-o', output_filepath,
+            '--workers', '2'
+        ])
+        assert result.exit_code == 0
+        output = pd.read_csv(output_filepath)
+        assert np.allclose(output.loc[0, ['D_1', 'D_2']].astype(float), expected)
+        assert output['error'].isna().tolist() == [True, False]
+
+        # as well as lines that are not JSON objects
+        with open(jsonl_filepath, 'w') as f:
+            f.write('[1, 2]\n{"A_1": \n')
+            f.write(json.dumps({'A_1': 'Yes', 'A_2': '1:2', 'A_3': 1.5}) + '\n')
+        for workers in ['1', '2']:
+            result = runner.invoke(cli_main, [
+                'batch', rules_filepath, jsonl_filepath, '-o', output_filepath,
+                '--workers', workers, '--chunk-size', '2'
+            ])
+            assert result.exit_code == 0
+            output = pd.read_csv(output_filepath)
+            assert output['error'][0] == 'line 1: not a JSON object'
+            assert output['error'][1].startswith('line 2: invalid JSON')
+            assert np.allclose(output.loc[2, ['D_1', 'D_2']].astype(float), expected)
+
+    # inference traces
+    for X in wildcard_inputs:
+        trace = wildcard_model.run_trace(X)
+        assert np.allclose(trace.belief_degrees, wildcard_model.run(X))
+        assert np.allclose(trace.activation_weights,
+                           trace.matching_degrees / trace.matching_degrees.sum())
+        assert np.allclose(trace.mu * (trace.left_prods - trace.right_prod)
+                           / (1 - trace.mu * trace.complement_prod),
+                           trace.belief_degrees)
+
+        # rows of the expanded forms are summed per rule
+        rules, activation_weights = trace.get_rules_activations()
+        assert len(trace.rules) > len(rules) and np.isclose(activation_weights.sum(), 1)
+        top_rules, top_weights = trace.get_top_rules(2)
+        assert top_weights[0] == activation_weights.max() and top_weights[0] >= top_weights[1]
+        assert top_rules[0] == rules[np.argmax(activation_weights)]
+        assert np.isclose(wildcard_model.rules[top_rules[0]].get_matching_degree(X, A),
+                          trace.matching_degrees[trace.rules == top_rules[0]].max())
+
+    compiled_model = wildcard_model.compile()
+    trace = compiled_model.trace(wildcard_inputs)
+    assert trace.activation_weights.shape == (len(wildcard_inputs), 27)
+    assert np.allclose(trace.belief_degrees, wildcard_model.run_batch(wildcard_inputs))
+    top_rules, top_weights = trace.get_top_rules(3)
+    assert top_rules.shape == (len(wildcard_inputs), 3)
+    for n, X in enumerate(wildcard_inputs):
+        single_trace = wildcard_model.run_trace(X)
+        single_top_rules, single_top_weights = single_trace.get_top_rules(3)
+        assert np.allclose(top_weights[n], single_top_weights)
+        assert np.allclose(trace.mu[n], single_trace.mu)
+
+    # profiling
+    runs = list()
+    profiler = wildcard_model.enable_profiling(callback=runs.append)
+    for X in wildcard_inputs:
+        trace = wildcard_model.run_trace(X)
+        assert runs[-1]['counters']['rules_evaluated'] == len(trace.rules)
+        assert runs[-1]['counters']['rules_activated'] \
+               == np.count_nonzero(trace.matching_degrees)
+    snapshot = profiler.snapshot()
+    assert snapshot['counters']['runs'] == len(runs) == len(wildcard_inputs)
+    assert set(snapshot['timings'].keys()) == {'parse', 'matching', 'activation', 'er'}
+    assert np.isclose(snapshot['timings']['er'], sum(run['timings']['er'] for run in runs))
+    wildcard_model.disable_profiling()
+    wildcard_model.run(wildcard_inputs[0])
+    assert profiler.snapshot()['counters']['runs'] == len(runs)
+
+    # rules are profiled within `with` blocks, e.g., parse calls and warnings
+    interval_rule = Rule(A_values={'A_1': '1:2'}, beta=[1, 0])
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        with profiler:
+            interval_rule.get_matching_degree(AttributeInput({'A_1': '1.5:2.5'}))
+        interval_rule.get_matching_degree(AttributeInput({'A_1': '1.5:2.5'}))
+    assert profiler.snapshot()['counters']['warnings'] \
+           == snapshot['counters']['warnings'] + 1
+    assert profiler.snapshot()['counters']['parse_calls'] \
+           == snapshot['counters']['parse_calls'] + 1
+
+    # batches are profiled as one run, over all the rows of the compiled model
+    wildcard_model.enable_profiling(callback=runs.append)
+    belief_degrees = wildcard_model.run_batch(wildcard_inputs, max_memory=1)
+    assert len(runs) == len(wildcard_inputs) + 1
+    assert set(runs[-1]['timings'].keys()) == {'parse', 'matching', 'activation', 'er'}
+    assert runs[-1]['counters']['rules_evaluated'] \
+           == len(wildcard_inputs) * wildcard_model.get_compiled().A_codes.shape[0]
+    assert runs[-1]['counters']['rules_activated'] \
+           == sum(np.count_nonzero(wildcard_model.run_trace(X).matching_degrees)
+                  for X in wildcard_inputs)
+    assert np.allclose(belief_degrees, [wildcard_model.run(X) for X in wildcard_inputs])
+    wildcard_model.disable_profiling()
+
+    # rules are stored as arrays, `Rule`s are views of their rows
+    store = wildcard_model.rules
+    assert isinstance(store, RuleStore)
+    view = store[0]
+    assert view is store[0] and store.index(view) == 0
+    standalone = pickle.loads(pickle.dumps(view))
+    assert standalone.A_values == view.A_values and standalone.beta == list(view.beta)
+    rules_store = RuleStore(['A_1', 'A_2'], ['y', 'n'])
+    rules_store.append(Rule(A_values={'A_1': 'a'}, beta=[1, 0]))
+    rules_store.insert(0, Rule(A_values={'A_2': 'b'}, beta=[0, 1], theta=2))
+    rules_store[0].theta = 3
+    rules_store[1].beta = [0.5, 0.5]
+    assert rules_store[0].theta == 3 and list(rules_store[1].beta) == [0.5, 0.5]
+    expanded_store = rules_store.expand({'A_1': ['a', 'b'], 'A_2': ['b', 'c']})
+    assert isinstance(expanded_store, RuleStore) and len(expanded_store) == 4
+    assert [rule.A_values for rule in expanded_store[:2]] \
+           == [{'A_1': 'a', 'A_2': 'b'}, {'A_1': 'b', 'A_2': 'b'}]
+    rules_store.reverse()
+    assert rules_store[0].A_values == {'A_1': 'a'} and rules_store[1].theta == 3
+    del rules_store[0]
+    assert len(rules_store) == 1 and rules_store[0].A_values == {'A_2': 'b'}
+    # rules changed in place are noticed by `run`
+    inplace_model = RuleBaseModel(U=['A'], D=['y', 'n'])
+    inplace_model.add_rule(Rule(A_values={'A': 'a'}, beta=[1, 0]))
+    inplace_model.add_rule(Rule(A_values={'A': 'b'}, beta=[0, 1]))
+    X = AttributeInput({'A': 'a'})
+    assert inplace_model.run(X) == [1.0, 0.0]
+    inplace_model.rules[1].A_values = {'A': 'a'}
+    assert np.allclose(inplace_model.run(X), [0.5, 0.5])
+    assert np.allclose(inplace_model.run(X), inplace_model.compile().run(X))
+    inplace_model.rules[0] = Rule(A_values={'A': 'b'}, beta=[1, 0])
+    assert np.allclose(inplace_model.run(X), [0.0, 1.0])
+    assert np.allclose(inplace_model.run(X), inplace_model.compile().run(X))
+
+    # the belief degrees of the rules are replaced, not modified in place
+    inplace_model.enable_cache()
+    assert np.allclose(inplace_model.run_batch([X]), [[0.0, 1.0]])
+    try:
+        inplace_model.rules[1].beta[0] = 0.5
+        assert False, 'beta must be read-only'
+    except ValueError:
+        pass
+    inplace_model.rules[1].beta = [0.5, 0.5]
+    assert np.allclose(inplace_model.run(X), [0.5, 0.5])
+    assert np.allclose(inplace_model.run_batch([X]), [[0.5, 0.5]])
+    inplace_model.disable_cache()
+
+    # rules added to the model keep changing it
+    added_rule = Rule(A_values={'A': 'a'}, beta=[1, 0])
+    inplace_model.add_rule(added_rule)
+    added_rule.theta = 0
+    assert inplace_model.rules[2].theta == 0
+    assert np.allclose(inplace_model.run(X), [0.5, 0.5])
+    added_rule.A_values = {'A': 'b'}
+    assert inplace_model.rules[2].A_values == {'A': 'b'}
+    assert np.allclose(inplace_model.run_batch([X]), [[0.5, 0.5]])
+
+    # hierarchical networks, the outputs of sub-models are inputs of others
+    cost_model = RuleBaseModel(U=['A_1'], D=['l', 'h'])
+    cost_model.add_rule(Rule(A_values={'A_1': 1}, beta=[1, 0]))
+    cost_model.add_rule(Rule(A_values={'A_1': 2}, beta=[0.2, 0.8]))
+    risk_model = RuleBaseModel(U=['A_2'], D=['l', 'h'])
+    risk_model.add_rule(Rule(A_values={'A_2': 'x'}, beta=[0.8, 0.2]))
+    risk_model.add_rule(Rule(A_values={'A_2': 'y'}, beta=[0.1, 0.9]))
+    decision_model = RuleBaseModel(U=['Cost', 'Risk', 'A_3'], D=['go', 'stop'],
+                                   A={'Cost': ['l', 'h'], 'Risk': ['l', 'h'], 'A_3': ['u']})
+    for n, (cost, risk) in enumerate(itertools.product(['l', 'h'], ['l', 'h'])):
+        decision_model.add_rule(Rule(A_values={'Cost': cost, 'Risk': risk, 'A_3': 'u'},
+                                     beta=[1 - n / 3, n / 3]))
+    network_inputs = [
+        AttributeInput({'A_1': 1, 'A_2': {'x': 0.5, 'y': 0.5}, 'A_3': 'u'}),
+        AttributeInput({'A_1': 2, 'A_2': 'y', 'A_3': 'u'}),
+    ]
+    for n_workers in [None, 1]:
+        with RuleBaseNetwork(n_workers=n_workers) as network:
+            network.add_model('cost', cost_model)
+            network.add_model('risk', risk_model)
+            network.add_model('decision', decision_model,
+                              inputs={'Cost': 'cost', 'Risk': 'risk'})
+            assert network.U == ['A_1', 'A_2', 'A_3'] and network.outputs == ['decision']
+            assert network.get_required(['risk']) == ['risk']
+
+            batch_results = network.run_batch(network_inputs)
+            for n, X in enumerate(network_inputs):
+                results = network.run(X)
+                assert list(results.keys()) == ['cost', 'risk', 'decision']
+                expected = decision_model.run(AttributeInput({
+                    'Cost': dict(zip(cost_model.D, cost_model.run(AttributeInput({'A_1': X['A_1']})))),
+                    'Risk': dict(zip(risk_model.D, risk_model.run(AttributeInput({'A_2': X['A_2']})))),
+                    'A_3': 'u',
+                }))
+                assert np.allclose(results['decision'], expected)
+                assert np.allclose(batch_results['decision'][n], expected)
+            df_results = network.run_batch(pd.DataFrame({
+                'A_1': [1, 2], 'A_2': [{'x': 0.5, 'y': 0.5}, 'y'], 'A_3': ['u', 'u']
+            }), outputs=['decision'])
+            assert np.allclose(df_results['decision'], batch_results['decision'])
+    try:
+        network.add_model('loop', cost_model, inputs={'A_1': 'unknown'})
+        assert False
+    except AssertionError as e:
+        assert 'must be added before' in str(e)
+
+    # result cache, keyed by the prepared inputs
+    cached_model = RuleBaseModel(U=['A_1', 'A_2'], D=['y', 'n'])
+    cached_model.add_rule(Rule(A_values={'A_1': 1, 'A_2': 'x'}, beta=[1, 0]))
+    cached_model.add_rule(Rule(A_values={'A_1': 2, 'A_2': 'y'}, beta=[0, 1]))
+    expected = cached_model.run(AttributeInput({'A_1': 1, 'A_2': {'x': 0.4, 'y': 0.6}}))
+    cache = cached_model.enable_cache(max_size=2)
+    assert cached_model.run(AttributeInput({'A_1': 1, 'A_2': {'x': 0.4, 'y': 0.6}})) == expected
+    assert cached_model.run(AttributeInput({'A_2': {'y': 0.6, 'x': 0.4}, 'A_1': '1'})) == expected
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+    cached_model.run(AttributeInput({'A_1': 2, 'A_2': 'y'}))
+    cached_model.run(AttributeInput({'A_1': '1:2', 'A_2': 'y'}))
+    assert cache.stats()['evictions'] == 1 and len(cache) == 2
+    # changes of the rules drop the cached outputs
+    cached_model.rules[0].beta = [0, 1]
+    assert cached_model.run(AttributeInput({'A_1': 1, 'A_2': {'x': 0.4, 'y': 0.6}})) != expected
+    assert len(cache) == 1
+    cached_model.add_rule(Rule(A_values={'A_1': 3}, beta=[1, 0]))
+    cached_model.run(AttributeInput({'A_1': 3, 'A_2': 'x'}))
+    assert len(cache) == 1 and cache.stats()['hits'] == 1
+    cached_model.disable_cache()
+
+    # copies of inputs share their prepared values, changed values are prepared again
+    X = AttributeInput({'A_1': '1:2', 'A_2': 'x'})
+    prepared_A_1 = X['A_1']
+    X_copy = X.copy(['A_1'])
+    assert X_copy.attr_input == {'A_1': '1:2'} and X_copy['A_1'] is prepared_A_1
+    X_copy.set_value('A_1', '3')
+    X_copy.set_value('A_3', 'y')
+    assert X_copy['A_1'] == 3 and X['A_1'] is prepared_A_1
+    X_copy.set_value('A_3')
+    assert X_copy.attr_input == {'A_1': '3'} and 'A_3' not in X.attr_input
+
+    # incremental inference, only the rules of the changed attributes are updated
+    incremental_model = RuleBaseModel(U=['A_1', 'A_2', 'A_3'], D=['y', 'n'],
+                                      A={'A_1': ['l', 'h'], 'A_2': ['l', 'h'], 'A_3': [1, 2]})
+    incremental_model.add_rule(Rule(A_values={'A_1': 'l', 'A_2': 'h'}, beta=[1, 0]))
+    incremental_model.add_rule(Rule(A_values={'A_1': 'h', 'A_2': 'l'}, beta=[0, 1],
+                                    matching_degree='geometric'))
+    incremental_model.add_rule(Rule(A_values={'A_2': 'l', 'A_3': '1:2'}, beta=[0.5, 0.5],
+                                    matching_degree=lambda delta, alphas_i: min(alphas_i.values())))
+    incremental_model.add_rule(Rule(A_values={'A_3': 2}, beta=[0.2, 0.8]))
+    incremental_model.add_rule(Rule(A_values={'A_1': WILDCARD, 'A_3': 1}, beta=[0.9, 0.1]))
+    evaluator = IncrementalEvaluator(incremental_model)
+    X = AttributeInput({'A_1': 'l', 'A_2': {'l': 0.3, 'h': 0.7}, 'A_3': 1})
+    assert np.allclose(evaluator.run(X), incremental_model.run(X))
+    assert evaluator.n_updated == len(incremental_model.compile())
+    for changes, n_updated in [({'A_3': 2}, 4), ({'A_2': {'l': 0.5, 'h': 0.2}}, 3),
+                               ({'A_1': 'h', 'A_3': '1:2'}, 6), ({}, 0)]:
+        belief_degrees = evaluator.update(changes)
+        assert evaluator.n_updated == n_updated
+        assert np.allclose(belief_degrees, incremental_model.run(evaluator.X))
+        assert np.allclose(evaluator.trace.matching_degrees,
+                           incremental_model.compile().trace([evaluator.X]).matching_degrees)
+    # changes of the rules are noticed
+    incremental_model.rules[0].beta = [0, 1]
+    assert np.allclose(evaluator.update({'A_1': 'l'}), incremental_model.run(evaluator.X))
+    assert evaluator.n_updated == len(incremental_model.compile())
+    # the model's compiled model is shared, and kept while the rules do not change
+    compiled_model = incremental_model.get_compiled()
+    assert incremental_model.get_compiled() is compiled_model
+    assert evaluator._get_compiled() is compiled_model
+
     print('Success!')